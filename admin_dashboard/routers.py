@@ -5,6 +5,7 @@ from fastapi.responses import HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
+from api import resilience
 from core.config import settings
 from core.db import get_session
 from core.models import User, Payment
@@ -28,6 +29,13 @@ async def metrics(session: AsyncSession = Depends(get_session)):
     ).scalar() or 0
     payments_count = (await session.execute(select(func.count(Payment.id)))).scalar() or 0
 
+    providers_html = "".join(
+        f"<li>{name}: {st['state']}, отказов {st['failure_rate']:.0%}, размыканий {st['opened']}, "
+        f"отклонено без сети {st['short_circuited'] + st['rejected']:.0f}, "
+        f"ожиданий лимита {st['throttled']:.0f} ({st['throttle_wait_ms']:.0f} мс), квота {st['quota']}</li>"
+        for name, st in resilience.stats().items()
+    ) or "<li>Нет данных</li>"
+
     html = f"""
     <h2>Метрики</h2>
     <ul>
@@ -35,6 +43,8 @@ async def metrics(session: AsyncSession = Depends(get_session)):
       <li>Активные премиум: {active_premium}</li>
       <li>Платежей всего: {payments_count}</li>
     </ul>
+    <h3>Внешние провайдеры</h3>
+    <ul>{providers_html}</ul>
     """
     return HTMLResponse(html)
 
@@ -4,12 +4,14 @@ import logging
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
-import httpx
-
+from api import food_cache, http_client, resilience
+from api.singleflight import SingleFlight
 from core.config import settings
 
 log = logging.getLogger(__name__)
 
+_flight = SingleFlight("edamam")
+
 _METHOD_HINTS = {
     "boiled": ["boiled", "cooked"],
     "fried": ["fried", "pan-fried", "sauteed"],
@@ -51,15 +53,31 @@ def _score_label(label: str, query_en: str, method: Optional[str]) -> int:
 
 async def lookup_food(query_ru: str, method: Optional[str] = None, *, limit: int = 5) -> List[Dict[str, Any]]:
     """
-    Поиск вариантов продукта в Edamam Food Database.
+    Поиск вариантов продукта в Edamam Food Database (через кэш api.food_cache).
     Возвращает список словарей c ключами: title, kcal100, p100, f100, c100, source="api".
     В случае отсутствия кредов/ошибки — [] без исключений.
     """
+    # Одинаковые одновременные запросы ждут один общий (singleflight)
+    key = (food_cache.make_key("edamam", query_ru, method), limit)
+    rows = await _flight.do(
+        key,
+        lambda: food_cache.cached_lookup(
+            "edamam", query_ru, method, limit,
+            lambda: _fetch(query_ru, method, limit=limit),
+        ),
+    )
+    return [dict(r) for r in rows]
+
+
+async def _fetch(query_ru: str, method: Optional[str], *, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Непосредственный запрос в Edamam без кэша.
+    None — ответа нет (нет кредов/ошибка), [] — Edamam ответил, но ничего не нашёл.
+    """
     app_id = settings.edamam_app_id
     app_key = settings.edamam_app_key
     if not app_id or not app_key:
         log.info("Edamam: no creds; skip")
-        return []
+        return None
 
     query = _hinted_query(query_ru, method)
 
@@ -72,13 +90,14 @@ async def lookup_food(query_ru: str, method: Optional[str] = None, *, limit: int
     url = "https://api.edamam.com/api/food-database/v2/parser?" + urlencode(params)
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(8.0)) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            data = r.json()
+        r = await resilience.request("edamam", http_client.get_client(url), "GET", url)
+        data = r.json()
+    except resilience.ProviderUnavailable as e:
+        log.info("Edamam skipped: %s", e)
+        return None
     except Exception as e:
         log.warning("Edamam request error: %s", e)
-        return []
+        return None
 
     hints = data.get("hints") or []
     rows: List[Dict[str, Any]] = []
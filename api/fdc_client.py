@@ -4,12 +4,14 @@ import logging
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
-import httpx
-
+from api import food_cache, http_client, local_index, resilience
+from api.singleflight import SingleFlight
 from core.config import settings
 
 log = logging.getLogger(__name__)
 
+_flight = SingleFlight("fdc")
+
 _METHOD_HINTS = {
     "boiled": ["boiled", "cooked"],
     "fried": ["fried", "pan fried"],
@@ -28,12 +30,35 @@ def _hinted_query(query_ru: str, method: Optional[str]) -> str:
 async def lookup_food(query_ru: str, method: Optional[str] = None, *, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Поиск по USDA FDC. Возвращает такой же формат, как edamam_client.lookup_food().
-    При отсутствии API-ключа или ошибке возвращает пустой список.
+    Если выгрузка FDC импортирована (scripts/import_fdc.py) — отвечаем из локального
+    индекса без сети. При отсутствии API-ключа или ошибке возвращает пустой список.
+    Результаты API кэшируются через api.food_cache.
+    """
+    await local_index.ensure_loaded()
+    offline = local_index.lookup_fdc(query_ru, method, limit=limit)
+    if offline:
+        return offline
+
+    # Одинаковые одновременные запросы ждут один общий (singleflight)
+    key = (food_cache.make_key("fdc", query_ru, method), limit)
+    rows = await _flight.do(
+        key,
+        lambda: food_cache.cached_lookup(
+            "fdc", query_ru, method, limit,
+            lambda: _fetch(query_ru, method, limit=limit),
+        ),
+    )
+    return [dict(r) for r in rows]
+
+
+async def _fetch(query_ru: str, method: Optional[str], *, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Непосредственный запрос в FDC без кэша.
+    None — ответа нет (нет ключа/ошибка), [] — FDC ответил, но ничего не нашёл.
     """
     api_key = settings.fdc_api_key
     if not api_key:
         log.info("FDC: no API key; skip")
-        return []
+        return None
 
     query = _hinted_query(query_ru, method)
     params = {
@@ -44,13 +69,14 @@ async def lookup_food(query_ru: str, method: Optional[str] = None, *, limit: int
     url = "https://api.nal.usda.gov/fdc/v1/foods/search?" + urlencode(params)
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(8.0)) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            data = r.json()
+        r = await resilience.request("fdc", http_client.get_client(url), "GET", url)
+        data = r.json()
+    except resilience.ProviderUnavailable as e:
+        log.info("FDC skipped: %s", e)
+        return None
     except Exception as e:
         log.warning("FDC request error: %s", e)
-        return []
+        return None
 
     foods = data.get("foods") or []
     out: List[Dict[str, Any]] = []
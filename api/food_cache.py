@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete
+
+from core.config import settings
+from core.db import SessionLocal
+from core.models import FoodCache
+
+log = logging.getLogger(__name__)
+
+Rows = List[Dict[str, Any]]
+# None — провайдер не ответил (нет ключа/ошибка), [] — ответил «ничего не найдено»
+Fetcher = Callable[[], Awaitable[Optional[Rows]]]
+
+# (fresh_until, stale_until, limit, rows); rows == [] — негативная запись
+_Item = Tuple[datetime, datetime, int, Rows]
+
+_lru: "OrderedDict[str, _Item]" = OrderedDict()
+_refreshing: Dict[str, asyncio.Task] = {}
+_stats: Dict[str, int] = {
+    "hit": 0, "miss": 0, "stale": 0, "db_hit": 0, "refresh": 0, "purged": 0,
+    # negative_hit — запросы, не ушедшие к провайдеру благодаря негативной записи
+    "negative_hit": 0, "negative_stored": 0,
+}
+
+
+def is_enabled() -> bool:
+    return not settings.disable_food_cache
+
+
+def normalize_query(text: str) -> str:
+    """Нормализация запроса для ключа кэша: регистр, ё→е, пробелы."""
+    t = (text or "").strip().lower().replace("ё", "е")
+    return re.sub(r"\s+", " ", t)
+
+
+def make_key(provider: str, query: str, method: Optional[str]) -> str:
+    key = f"{provider}|{method or '-'}|{normalize_query(query)}"
+    if len(key) > 255:
+        # food_key — String(255); длинные запросы хэшируем
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        key = f"{provider}|{method or '-'}|#{digest}"
+    return key
+
+
+# ----------------------------- LRU -----------------------------
+
+def _lru_get(key: str) -> Optional[_Item]:
+    item = _lru.get(key)
+    if item is not None:
+        _lru.move_to_end(key)
+    return item
+
+
+def _lru_put(key: str, item: _Item) -> None:
+    _lru[key] = item
+    _lru.move_to_end(key)
+    while len(_lru) > max(1, settings.food_cache_lru_size):
+        _lru.popitem(last=False)
+
+
+# ----------------------------- DB -----------------------------
+
+async def _db_get(key: str) -> Optional[_Item]:
+    try:
+        async with SessionLocal() as session:
+            row = await session.get(FoodCache, key)
+    except Exception as e:
+        log.warning("FoodCache read error: %s", e)
+        return None
+    if not row or row.ttl_until <= datetime.utcnow():
+        return None
+    try:
+        payload = json.loads(row.json_payload)
+        fresh_until = datetime.fromisoformat(payload["fresh_until"])
+        return fresh_until, row.ttl_until, int(payload.get("limit") or 0), list(payload.get("rows") or [])
+    except Exception as e:
+        log.warning("FoodCache payload broken for %s: %s", key, e)
+        return None
+
+
+async def _db_put(key: str, item: _Item) -> None:
+    fresh_until, stale_until, limit, rows = item
+    payload = json.dumps(
+        {"fresh_until": fresh_until.isoformat(), "limit": limit, "rows": rows},
+        ensure_ascii=False,
+    )
+    try:
+        async with SessionLocal() as session:
+            await session.merge(FoodCache(food_key=key, json_payload=payload, ttl_until=stale_until))
+            await session.commit()
+    except Exception as e:
+        log.warning("FoodCache write error: %s", e)
+
+
+async def _store(key: str, limit: int, rows: Rows) -> None:
+    now = datetime.utcnow()
+    if rows:
+        fresh_until = now + timedelta(hours=settings.food_cache_ttl_hours)
+        stale_until = fresh_until + timedelta(hours=settings.food_cache_stale_hours)
+    else:
+        # «ничего не найдено» живёт меньше и без stale-периода
+        fresh_until = stale_until = now + timedelta(minutes=settings.food_cache_negative_minutes)
+        _stats["negative_stored"] += 1
+    item: _Item = (fresh_until, stale_until, limit, [dict(r) for r in rows])
+    _lru_put(key, item)
+    await _db_put(key, item)
+
+
+# ----------------------------- refresh -----------------------------
+
+async def _refresh(key: str, limit: int, fetch: Fetcher) -> None:
+    try:
+        rows = await fetch()
+        # пустой ответ при обновлении не затирает найденные ранее варианты
+        if rows:
+            await _store(key, limit, rows)
+            _stats["refresh"] += 1
+    except Exception as e:
+        log.warning("FoodCache refresh error for %s: %s", key, e)
+    finally:
+        _refreshing.pop(key, None)
+
+
+def _schedule_refresh(key: str, limit: int, fetch: Fetcher) -> None:
+    if key in _refreshing:
+        return
+    _refreshing[key] = asyncio.create_task(_refresh(key, limit, fetch))
+
+
+# ----------------------------- public API -----------------------------
+
+async def cached_lookup(
+    provider: str,
+    query: str,
+    method: Optional[str],
+    limit: int,
+    fetch: Fetcher,
+) -> Rows:
+    """
+    Read-through кэш поверх провайдера: LRU → food_cache → fetch().
+    Свежие записи отдаются сразу; устаревшие (но не просроченные) — тоже сразу,
+    с фоновым обновлением (stale-while-revalidate). Ответ «ничего не найдено»
+    запоминается на FOOD_CACHE_NEGATIVE_MINUTES (негативный кэш), ошибки — не кэшируются.
+    Возвращает копии строк — вызывающий код может их менять.
+    """
+    if not is_enabled():
+        return await fetch() or []
+
+    key = make_key(provider, query, method)
+    now = datetime.utcnow()
+
+    item = _lru_get(key)
+    if item is None:
+        item = await _db_get(key)
+        if item is not None:
+            _stats["db_hit"] += 1
+            _lru_put(key, item)
+
+    if item is not None and not item[3] and now < item[0]:
+        # негативная запись: провайдер уже отвечал «пусто» на этот запрос, при любом limit
+        _stats["negative_hit"] += 1
+        return []
+
+    if item is not None and item[3] and item[2] >= limit:
+        fresh_until, stale_until, _, rows = item
+        if now < fresh_until:
+            _stats["hit"] += 1
+            return [dict(r) for r in rows[:limit]]
+        if now < stale_until:
+            _stats["stale"] += 1
+            _schedule_refresh(key, limit, fetch)
+            return [dict(r) for r in rows[:limit]]
+
+    _stats["miss"] += 1
+    rows = await fetch()
+    if rows is None:
+        return []
+    await _store(key, limit, rows)
+    return [dict(r) for r in rows]
+
+
+async def purge_expired() -> int:
+    """Удалить просроченные записи (по индексу ttl_until) из БД и LRU."""
+    now = datetime.utcnow()
+    for key in [k for k, v in _lru.items() if v[1] <= now]:
+        _lru.pop(key, None)
+    try:
+        async with SessionLocal() as session:
+            res = await session.execute(delete(FoodCache).where(FoodCache.ttl_until <= now))
+            await session.commit()
+    except Exception as e:
+        log.warning("FoodCache purge error: %s", e)
+        return 0
+    removed = res.rowcount or 0
+    _stats["purged"] += removed
+    return removed
+
+
+async def purge_loop() -> None:
+    """Фоновая периодическая чистка food_cache."""
+    while True:
+        await asyncio.sleep(max(1, settings.food_cache_purge_minutes) * 60)
+        if not is_enabled():
+            continue
+        removed = await purge_expired()
+        if removed:
+            log.info("FoodCache: purged %d expired rows", removed)
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_stats)
+    out["lru_size"] = len(_lru)
+    out["enabled"] = is_enabled()
+    return out
+
+
+def clear_memory() -> None:
+    _lru.clear()
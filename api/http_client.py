@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import settings
+
+log = logging.getLogger(__name__)
+
+# Один клиент (и, соответственно, один пул соединений) на origin провайдера
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+EDAMAM_ORIGIN = "https://api.edamam.com"
+FDC_ORIGIN = "https://api.nal.usda.gov"
+GEMINI_ORIGIN = "https://generativelanguage.googleapis.com"
+YOOKASSA_ORIGIN = "https://api.yookassa.ru"
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _http2_enabled() -> bool:
+    if not settings.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        log.warning("HTTP2=true, но пакет h2 не установлен (pip install httpx[http2]); используем HTTP/1.1")
+        return False
+    return True
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
+    )
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Вернуть общий клиент с пулом keep-alive соединений для origin этого URL."""
+    key = _origin(url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[key] = client
+    return client
+
+
+def configured_origins() -> List[str]:
+    """Origins провайдеров, для которых заданы ключи в настройках."""
+    out: List[str] = []
+    if settings.edamam_app_id and settings.edamam_app_key:
+        out.append(EDAMAM_ORIGIN)
+    if settings.fdc_api_key:
+        out.append(FDC_ORIGIN)
+    if settings.use_gemini_translate and settings.gemini_api_key:
+        out.append(GEMINI_ORIGIN)
+    if settings.yookassa_shop_id and settings.yookassa_secret_key:
+        out.append(YOOKASSA_ORIGIN)
+    return out
+
+
+async def _warm_one(origin: str) -> None:
+    try:
+        # Любой ответ (хоть 404) оставляет в пуле готовое TCP+TLS соединение
+        await get_client(origin).head(origin + "/", timeout=httpx.Timeout(3.0))
+    except Exception as e:
+        log.info("HTTP warmup %s failed: %s", origin, e)
+
+
+async def warmup(origins: Iterable[str] | None = None) -> None:
+    """Заранее открыть соединения к провайдерам (вызывается при старте бота)."""
+    targets = list(origins) if origins is not None else configured_origins()
+    if targets:
+        await asyncio.gather(*(_warm_one(o) for o in targets))
+        log.info("HTTP warmup done: %s", ", ".join(targets))
+
+
+async def aclose_all() -> None:
+    """Закрыть все клиенты и их пулы (вызывается при остановке)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            log.warning("HTTP client close error: %s", e)
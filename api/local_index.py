@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from bot.utils.fuzzy import FuzzyIndex
+from core.config import settings
+from core.db import SessionLocal
+from core.models import FoodDictionary
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parents[1] / "static"
+
+# food_key строк, импортированных из выгрузки USDA FDC (scripts/import_fdc.py)
+FDC_KEY_PREFIX = "fdc_"
+
+# Совпадение не ниже этого порога считаем уверенным — провайдеры не нужны
+CONFIDENT_SCORE = 0.8
+
+# Слова способа готовки в названиях пресетов/словаря (основы, чтобы ловить род/число)
+_METHOD_STEMS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"^(от)?вар[её]н\w*$|^отварн\w*$"), "boiled"),
+    (re.compile(r"^жар[её]н+\w*$"), "fried"),
+    (re.compile(r"^запеч[её]н+\w*$"), "baked"),
+    (re.compile(r"^гриль$"), "grilled"),
+    (re.compile(r"^сыр(ая|ой|ое|ые)$"), "raw"),
+    # EN-названия из офлайн-выгрузки FDC (scripts/import_fdc.py)
+    (re.compile(r"^(boiled|stewed|simmered)$"), "boiled"),
+    (re.compile(r"^(fried|pan-fried)$"), "fried"),
+    (re.compile(r"^(baked|roasted)$"), "baked"),
+    (re.compile(r"^(grilled|broiled)$"), "grilled"),
+    (re.compile(r"^raw$"), "raw"),
+]
+
+
+class FoodItem:
+    """Продукт локального индекса (КБЖУ на 100 г)."""
+
+    __slots__ = ("key", "title", "tokens", "method", "kcal100", "p100", "f100", "c100", "category", "density", "origin")
+
+    def __init__(
+        self,
+        key: str,
+        title: str,
+        kcal100: float,
+        p100: float,
+        f100: float,
+        c100: float,
+        *,
+        category: Optional[str] = None,
+        density: Optional[float] = None,
+        origin: str = "dict",
+    ):
+        self.key = key
+        self.title = title
+        self.tokens, self.method = split_method(title)
+        self.kcal100 = float(kcal100 or 0)
+        self.p100 = float(p100 or 0)
+        self.f100 = float(f100 or 0)
+        self.c100 = float(c100 or 0)
+        self.category = category
+        self.density = density
+        self.origin = origin
+
+    def as_row(self) -> Dict[str, Any]:
+        """Строка в формате провайдеров (edamam_client.lookup_food)."""
+        return {
+            "title": self.title,
+            "kcal100": round(self.kcal100, 2),
+            "p100": round(self.p100, 2),
+            "f100": round(self.f100, 2),
+            "c100": round(self.c100, 2),
+            # EN-названия FDC переводятся при показе, как ответы API
+            "source": "db" if self.origin == "fdc" else "preset",
+        }
+
+
+def normalize(text: str) -> str:
+    t = (text or "").lower().replace("ё", "е")
+    t = re.sub(r"[^\w]+", " ", t)
+    return re.sub(r"\s+", " ", t).strip()
+
+
+def split_method(title: str) -> Tuple[frozenset, Optional[str]]:
+    """Токены названия без слов способа готовки + сам способ (если найден)."""
+    method = None
+    tokens = []
+    for tok in normalize(title).split():
+        for rx, m in _METHOD_STEMS:
+            if rx.match(tok):
+                method = method or m
+                break
+        else:
+            tokens.append(tok)
+    return frozenset(tokens), method
+
+
+class FoodIndex:
+    """Продукты + нечёткий индекс по названиям (опечатки, порядок слов, ё/е)."""
+
+    def __init__(self):
+        self._items: Dict[str, FoodItem] = {}
+        self._fuzzy = FuzzyIndex()
+        self._doc_key: List[str] = []
+        self._docs_by_key: Dict[str, List[int]] = {}
+        self.max_dict_id = 0
+        self.fdc_items = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _index_text(self, key: str, text: str) -> None:
+        doc_id = self._fuzzy.add(text)
+        self._doc_key.append(key)
+        self._docs_by_key.setdefault(key, []).append(doc_id)
+
+    def add(self, item: FoodItem) -> None:
+        for doc_id in self._docs_by_key.pop(item.key, ()):
+            self._fuzzy.remove(doc_id)
+        old = self._items.get(item.key)
+        self.fdc_items += (item.origin == "fdc") - (old is not None and old.origin == "fdc")
+        self._items[item.key] = item
+        title = " ".join(sorted(item.tokens))
+        self._index_text(item.key, title)
+        # food_key словаря («куриная_грудка») — дополнительное имя, если отличается от названия
+        alias, _ = split_method(item.key.split(":", 1)[-1].replace("_", " "))
+        if item.origin != "fdc" and alias and alias != item.tokens:
+            self._index_text(item.key, " ".join(sorted(alias)))
+
+    def match(
+        self, query: str, method: Optional[str] = None, *, limit: int = 5, min_score: float = 0.25,
+    ) -> List[Tuple[float, FoodItem]]:
+        """Ранжированные совпадения: нечёткий score по названию + поправка на способ готовки."""
+        q_tokens, q_method = split_method(query)
+        method = method or q_method
+        if not q_tokens:
+            return []
+        # с запасом: поправка на способ готовки может переставить кандидатов
+        hits = self._fuzzy.search(" ".join(sorted(q_tokens)), k=limit * 4, min_score=min_score)
+        best: Dict[str, float] = {}
+        for score, doc_id in hits:
+            key = self._doc_key[doc_id]
+            if score > best.get(key, -1.0):
+                best[key] = score
+        scored: List[Tuple[float, FoodItem]] = []
+        for key, score in best.items():
+            item = self._items[key]
+            if method and item.method:
+                score += 0.1 if item.method == method else -0.5
+            elif method or item.method:
+                score -= 0.05
+            scored.append((round(min(score, 1.0), 3), item))
+        scored.sort(key=lambda x: (-x[0], x[1].title))
+        return scored[:limit]
+
+
+_index = FoodIndex()
+_lock = asyncio.Lock()
+_stats: Dict[str, float] = {"lookups": 0, "confident": 0, "refreshes": 0, "last_load_ms": 0.0}
+
+
+# ----------------------------- loading -----------------------------
+
+def _load_static(index: FoodIndex) -> None:
+    try:
+        presets = json.loads((STATIC_DIR / "cooked_presets.json").read_text(encoding="utf-8") or "{}")
+    except Exception as e:
+        log.warning("Local index: cannot read cooked_presets.json: %s", e)
+        presets = {}
+    for title, v in presets.items():
+        index.add(FoodItem(
+            f"preset:{normalize(title)}", title.capitalize(),
+            v.get("kcal"), v.get("p"), v.get("f"), v.get("c"),
+            origin="preset",
+        ))
+
+    try:
+        seeds = json.loads((STATIC_DIR / "food_seed.json").read_text(encoding="utf-8") or "[]")
+    except Exception as e:
+        log.warning("Local index: cannot read food_seed.json: %s", e)
+        seeds = []
+    for row in seeds:
+        index.add(_item_from_dict(row, origin="seed"))
+
+
+def _item_from_dict(row: Any, origin: str = "dict") -> FoodItem:
+    get = row.get if isinstance(row, dict) else (lambda k: getattr(row, k, None))
+    if str(get("food_key") or "").startswith(FDC_KEY_PREFIX):
+        origin = "fdc"
+    return FoodItem(
+        f"dict:{get('food_key')}", get("title_ru"),
+        get("per_100g_kcal"), get("per_100g_p"), get("per_100g_f"), get("per_100g_c"),
+        category=get("category"), density=get("density_g_per_ml"), origin=origin,
+    )
+
+
+async def _load_dict_rows(index: FoodIndex) -> int:
+    """Догрузить строки food_dictionary с id > max_dict_id (инкрементально)."""
+    async with SessionLocal() as session:
+        res = await session.execute(
+            select(FoodDictionary)
+            .where(FoodDictionary.id > index.max_dict_id, FoodDictionary.per_100g_kcal != None)  # noqa: E711
+            .order_by(FoodDictionary.id)
+        )
+        rows = res.scalars().all()
+    for r in rows:
+        # словарь БД главнее одноимённого сида из static/
+        index.add(_item_from_dict(r))
+        index.max_dict_id = max(index.max_dict_id, r.id)
+    return len(rows)
+
+
+async def load() -> None:
+    """Полная сборка индекса (при старте бота)."""
+    global _index
+    t0 = time.perf_counter()
+    index = FoodIndex()
+    _load_static(index)
+    try:
+        await _load_dict_rows(index)
+    except Exception as e:
+        log.warning("Local index: food_dictionary unavailable: %s", e)
+    index.loaded = True
+    _index = index
+    _stats["last_load_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    log.info("Local index: %d items in %.1f ms", len(index), _stats["last_load_ms"])
+
+
+async def ensure_loaded() -> None:
+    if _index.loaded:
+        return
+    async with _lock:
+        if not _index.loaded:
+            await load()
+
+
+async def refresh() -> int:
+    """Подтянуть новые строки словаря без полной пересборки."""
+    try:
+        added = await _load_dict_rows(_index)
+    except Exception as e:
+        log.warning("Local index refresh error: %s", e)
+        return 0
+    _stats["refreshes"] += 1
+    if added:
+        log.info("Local index: +%d dictionary rows", added)
+    return added
+
+
+async def refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(max(5, settings.local_index_refresh_sec))
+        await refresh()
+
+
+# ----------------------------- lookup -----------------------------
+
+def lookup(query_ru: str, method: Optional[str] = None, *, limit: int = 5) -> Tuple[List[Dict[str, Any]], bool]:
+    """Поиск в локальном индексе. Возвращает (строки, уверенное_совпадение)."""
+    _stats["lookups"] += 1
+    matches = [(s, it) for s, it in _index.match(query_ru, method, limit=limit) if s > 0]
+    confident = bool(matches) and matches[0][0] >= CONFIDENT_SCORE
+    if confident:
+        _stats["confident"] += 1
+    return [it.as_row() for _, it in matches], confident
+
+
+def lookup_fdc(query_en: str, method: Optional[str] = None, *, limit: int = 5) -> List[Dict[str, Any]]:
+    """Поиск по офлайн-выгрузке FDC (EN-названия); пусто, если выгрузка не импортирована."""
+    if not _index.fdc_items:
+        return []
+    # описания FDC многословны («Chicken, broilers or fryers, breast, ...») — порог ниже
+    matches = _index.match(query_en, method, limit=limit * 2, min_score=0.1)
+    rows = [it.as_row() for s, it in matches if it.origin == "fdc" and s > 0]
+    return rows[:limit]
+
+
+def stats() -> Dict[str, float]:
+    out = dict(_stats)
+    out["items"] = len(_index)
+    out["fdc_items"] = _index.fdc_items
+    return out
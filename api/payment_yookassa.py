@@ -1,5 +1,6 @@
 import base64, uuid
 import httpx
+from api import http_client
 from core.config import settings
 
 API_URL = "https://api.yookassa.ru/v3/payments"
@@ -17,8 +18,9 @@ async def create_payment(amount: int, description: str, return_url: str = "https
         "confirmation": {"type": "redirect", "return_url": return_url},
         "description": description,
     }
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(API_URL, headers=headers, json=payload)
-        r.raise_for_status()
-        data = r.json()
-        return data["confirmation"]["confirmation_url"], data["id"]
\ No newline at end of file
+    r = await http_client.get_client(API_URL).post(
+        API_URL, headers=headers, json=payload, timeout=httpx.Timeout(15.0)
+    )
+    r.raise_for_status()
+    data = r.json()
+    return data["confirmation"]["confirmation_url"], data["id"]
\ No newline at end of file
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from api import edamam_client, fdc_client, local_index
+from api.food_cache import normalize_query
+from api.translate import translate_ru_to_en
+from core.config import settings
+
+log = logging.getLogger(__name__)
+
+Rows = List[Dict[str, Any]]
+
+# Порядок в выдаче не зависит от того, кто ответил первым
+_PRIORITY = ("local", "edamam", "fdc")
+
+_stats: Dict[str, Dict[str, float]] = {
+    name: {"calls": 0, "errors": 0, "empty": 0, "cancelled": 0, "wins": 0, "latency_ms_total": 0.0}
+    for name in _PRIORITY
+}
+
+
+# ----------------------------- providers -----------------------------
+
+async def _local_lookup(query_ru: str, method: Optional[str], *, limit: int) -> Rows:
+    """Поиск в локальном индексе (словарь + пресеты, RU-названия, без сети)."""
+    rows, _ = local_index.lookup(query_ru, method, limit=limit)
+    return rows
+
+
+def _enabled_providers() -> List[str]:
+    names = [n.strip().lower() for n in (settings.search_providers or "").split(",")]
+    return [n for n in _PRIORITY if n in names]
+
+
+# ----------------------------- merge -----------------------------
+
+def _tokens(title: str) -> set[str]:
+    return set(re.findall(r"\w+", normalize_query(title)))
+
+
+def _near_equal(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    ka, kb = float(a.get("kcal100") or 0), float(b.get("kcal100") or 0)
+    if abs(ka - kb) > max(5.0, 0.03 * max(ka, kb)):
+        return False
+    return all(abs(float(a.get(k) or 0) - float(b.get(k) or 0)) <= 1.0 for k in ("p100", "f100", "c100"))
+
+
+def _is_duplicate(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Один и тот же продукт: совпадающее название или похожее название + близкие КБЖУ на 100 г."""
+    ta, tb = _tokens(a.get("title") or ""), _tokens(b.get("title") or "")
+    if ta and ta == tb:
+        return True
+    overlap = len(ta & tb) / max(1, min(len(ta), len(tb)))
+    return overlap >= 0.5 and _near_equal(a, b)
+
+
+def merge_variants(results: Dict[str, Rows], limit: int) -> Rows:
+    """Склеить ответы провайдеров в порядке приоритета, убрав дубли и пустые КБЖУ."""
+    out: Rows = []
+    for name in _PRIORITY:
+        for row in results.get(name) or []:
+            if not row.get("kcal100"):
+                continue
+            if any(_is_duplicate(row, seen) for seen in out):
+                continue
+            out.append(row)
+            if len(out) >= limit:
+                return out
+    return out
+
+
+# ----------------------------- orchestrator -----------------------------
+
+async def _timed(name: str, coro: Awaitable[Rows]) -> Tuple[str, Rows]:
+    st = _stats[name]
+    st["calls"] += 1
+    t0 = time.perf_counter()
+    try:
+        rows = await coro
+    except asyncio.CancelledError:
+        st["cancelled"] += 1
+        raise
+    except Exception as e:
+        st["errors"] += 1
+        log.warning("Provider %s error: %s", name, e)
+        rows = []
+    finally:
+        st["latency_ms_total"] += (time.perf_counter() - t0) * 1000
+    if not rows:
+        st["empty"] += 1
+    return name, rows
+
+
+async def search(
+    query_ru: str,
+    method: Optional[str] = None,
+    *,
+    limit: int = 5,
+    deadline_ms: Optional[int] = None,
+) -> Tuple[Rows, Optional[str]]:
+    """
+    Параллельно опросить провайдеров (local / Edamam / FDC), склеить и дедуплицировать варианты.
+    Возвращает результат, как только набралось SEARCH_MIN_VARIANTS хороших вариантов
+    или истёк бюджет SEARCH_DEADLINE_MS; оставшиеся запросы отменяются.
+    Второй элемент — EN-перевод запроса (None, если перевод не успел завершиться).
+    Если локальный индекс дал уверенное совпадение — сразу отдаём его, без сети.
+    """
+    providers = _enabled_providers()
+    if "local" in providers:
+        await local_index.ensure_loaded()
+        t0 = time.perf_counter()
+        rows, confident = local_index.lookup(query_ru, method, limit=limit)
+        if confident:
+            st = _stats["local"]
+            st["calls"] += 1
+            st["wins"] += 1
+            st["latency_ms_total"] += (time.perf_counter() - t0) * 1000
+            log.info("Search '%s': %d local variants (confident)", query_ru, len(rows))
+            return rows, None
+
+    loop = asyncio.get_running_loop()
+    budget = (deadline_ms if deadline_ms is not None else settings.search_deadline_ms) / 1000
+    deadline = loop.time() + budget
+    need = max(1, min(limit, settings.search_min_variants))
+
+    en_task: Optional[asyncio.Task] = None
+    if any(n != "local" for n in providers):
+        en_task = asyncio.create_task(translate_ru_to_en(query_ru))
+
+    def _remote(fn: Callable[..., Awaitable[Rows]]) -> Awaitable[Rows]:
+        async def run() -> Rows:
+            # shield: отмена одного провайдера не отменяет общий перевод
+            query_en = await asyncio.shield(en_task)
+            return await fn(query_en, method, limit=limit)
+        return run()
+
+    coros: Dict[str, Awaitable[Rows]] = {}
+    for name in providers:
+        if name == "local":
+            coros[name] = _local_lookup(query_ru, method, limit=limit)
+        elif name == "edamam":
+            coros[name] = _remote(edamam_client.lookup_food)
+        elif name == "fdc":
+            coros[name] = _remote(fdc_client.lookup_food)
+
+    pending = {asyncio.create_task(_timed(name, c)) for name, c in coros.items()}
+    results: Dict[str, Rows] = {}
+    winner: Optional[str] = None
+    merged: Rows = []
+
+    try:
+        while pending:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, rows = task.result()
+                results[name] = rows
+                if rows and winner is None:
+                    winner = name
+            merged = merge_variants(results, limit)
+            if len(merged) >= need:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner:
+        _stats[winner]["wins"] += 1
+
+    query_en: Optional[str] = None
+    if en_task is not None:
+        if en_task.done() and not en_task.cancelled() and en_task.exception() is None:
+            query_en = en_task.result()
+        else:
+            en_task.cancel()
+
+    log.info(
+        "Search '%s': %d variants from %s (winner=%s, late=%d)",
+        query_ru, len(merged), ",".join(sorted(results)) or "-", winner, len(pending),
+    )
+    return merged, query_en
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for name, st in _stats.items():
+        row = dict(st)
+        calls = st["calls"] or 0
+        row["avg_latency_ms"] = round(st["latency_ms_total"] / calls, 1) if calls else 0.0
+        row["error_rate"] = round(st["errors"] / calls, 3) if calls else 0.0
+        out[name] = row
+    return out
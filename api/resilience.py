@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import httpx
+
+from core.config import settings
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """Провайдер сейчас не опрашивается (цепь разомкнута или исчерпана квота) — отказ без сети."""
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class RateLimitedError(ProviderUnavailable):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: число секунд или HTTP-дата. None — если заголовка нет/не разобрали."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Скользящее окно результатов за window_sec. Если вызовов не меньше min_calls
+    и доля неудач >= failure_ratio — цепь размыкается на open_sec, вызовы отклоняются сразу.
+    После паузы пропускается один пробный вызов (half-open): успех замыкает цепь,
+    неудача снова размыкает.
+    """
+
+    def __init__(self, window_sec: float, min_calls: int, failure_ratio: float, open_sec: float):
+        self.window_sec = window_sec
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_sec = open_sec
+        self.state = CLOSED
+        self.opened_until = 0.0
+        self.opened = 0
+        self._window: Deque[Tuple[float, bool]] = deque()
+        self._probe = False
+
+    def _prune(self, now: float) -> None:
+        while self._window and self._window[0][0] < now - self.window_sec:
+            self._window.popleft()
+
+    def failure_rate(self) -> float:
+        self._prune(time.monotonic())
+        if not self._window:
+            return 0.0
+        return sum(1 for _, ok in self._window if not ok) / len(self._window)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN and now >= self.opened_until:
+            self.state = HALF_OPEN
+            self._probe = False
+        if self.state == HALF_OPEN and not self._probe:
+            self._probe = True
+            return True
+        return False
+
+    def trip(self, seconds: Optional[float] = None) -> None:
+        """Разомкнуть цепь (по окну неудач или по Retry-After провайдера)."""
+        if self.state != OPEN:
+            self.opened += 1
+        self.state = OPEN
+        self._probe = False
+        self.opened_until = max(self.opened_until, time.monotonic() + (seconds if seconds is not None else self.open_sec))
+
+    def record(self, ok: bool) -> None:
+        if self.state == HALF_OPEN:
+            if ok:
+                self.state = CLOSED
+                self._window.clear()
+            else:
+                self.trip()
+            self._probe = False
+            return
+        now = time.monotonic()
+        self._window.append((now, ok))
+        self._prune(now)
+        if not ok and self.state == CLOSED and len(self._window) >= self.min_calls:
+            if self.failure_rate() >= self.failure_ratio:
+                self.trip()
+                log.warning("Circuit opened for %.0f s (failure rate %.0f%%)", self.open_sec, self.failure_rate() * 100)
+
+    def release_probe(self) -> None:
+        """Пробный вызов отменён, не дойдя до результата — разрешаем следующий."""
+        if self.state == HALF_OPEN:
+            self._probe = False
+
+
+class TokenBucket:
+    """Ограничитель по опубликованной квоте провайдера: quota запросов за period_sec.
+    Ёмкость burst (по умолчанию треть квоты), пополнение (quota - burst) / period —
+    так за любое окно period уходит не больше quota запросов.
+    """
+
+    def __init__(self, quota: int, period_sec: float, burst: Optional[int] = None):
+        quota = max(1, quota)
+        self.capacity = float(max(1, min(burst or quota // 3, quota)))
+        self.rate = max(quota - self.capacity, 1.0) / period_sec
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        # во время паузы (block) updated — её конец: пополнения нет
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def block(self, seconds: float) -> None:
+        """Провайдер ответил 429 + Retry-After: до этого момента не шлём ничего.
+        Ведро пустеет и пополняется с конца паузы — ожидающие выходят после неё в обычном темпе,
+        а не все разом.
+        """
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = max(self.updated, self.blocked_until)
+
+    def reserve(self) -> float:
+        """Занять токен; вернуть, сколько секунд нужно подождать до отправки."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1.0
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        # токены копятся не раньше updated (конец паузы, если она идёт)
+        return max(0.0, self.updated - now) + wait
+
+    async def acquire(self) -> float:
+        """Дождаться токена; вернуть, сколько ждали. Если за время ожидания пришёл 429 (block),
+        прежняя очередь сброшена — встаём в новую, за паузой.
+        """
+        waited = 0.0
+        while True:
+            blocked_until = self.blocked_until
+            wait = self.reserve()
+            if wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    self.cancel()
+                    raise
+                waited += wait
+            if self.blocked_until == blocked_until:
+                return waited
+
+    def cancel(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+
+class Provider:
+    def __init__(self, name: str, quota: int, period_sec: float):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            settings.cb_window_sec, settings.cb_min_calls, settings.cb_failure_ratio, settings.cb_open_sec,
+        )
+        self.bucket = TokenBucket(quota, period_sec)
+        self.quota = f"{quota}/{period_sec:.0f}s"
+        self.stats: Dict[str, float] = {
+            "calls": 0, "ok": 0, "failures": 0, "slow": 0, "short_circuited": 0,
+            "throttled": 0, "rejected": 0, "throttle_wait_ms": 0.0, "retry_after": 0,
+        }
+
+    def _on_status(self, resp: httpx.Response) -> bool:
+        """True — ответ считается неудачей провайдера (5xx/429)."""
+        if resp.status_code == 429 or resp.status_code >= 500:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None:
+                self.stats["retry_after"] += 1
+                if resp.status_code == 429:
+                    self.bucket.block(retry_after)
+                else:
+                    self.breaker.trip(retry_after)
+                log.warning("%s: HTTP %s, Retry-After %.0f s", self.name, resp.status_code, retry_after)
+            return True
+        return False
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            raise CircuitOpenError(f"{self.name}: circuit open")
+
+        wait = self.bucket.reserve()
+        if wait > 0:
+            if wait * 1000 > settings.rate_limit_max_wait_ms:
+                self.bucket.cancel()
+                self.breaker.release_probe()
+                self.stats["rejected"] += 1
+                raise RateLimitedError(f"{self.name}: quota exhausted, next slot in {wait:.1f} s")
+            self.stats["throttled"] += 1
+            self.stats["throttle_wait_ms"] += wait * 1000
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.bucket.cancel()
+                self.breaker.release_probe()
+                raise
+
+        self.stats["calls"] += 1
+        t0 = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # отменили по дедлайну поиска: зависший провайдер считаем неудачей
+            if (time.monotonic() - t0) * 1000 >= settings.cb_slow_call_ms:
+                self.stats["slow"] += 1
+                self._failure()
+            else:
+                self.breaker.release_probe()
+            raise
+        except httpx.HTTPStatusError as e:
+            if self._on_status(e.response):
+                self._failure()
+            else:
+                self._success()
+            raise
+        except httpx.TransportError:
+            self._failure()
+            raise
+        except Exception:
+            # битый ответ (DecodingError, ValueError при разборе) и прочее — тоже неудача;
+            # без record() пробный вызов half-open так и остался бы занят
+            self._failure()
+            raise
+        self._success()
+        return result
+
+    def _success(self) -> None:
+        self.stats["ok"] += 1
+        self.breaker.record(True)
+
+    def _failure(self) -> None:
+        self.stats["failures"] += 1
+        self.breaker.record(False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out["state"] = self.breaker.state
+        out["opened"] = self.breaker.opened
+        out["failure_rate"] = round(self.breaker.failure_rate(), 3)
+        out["open_for_s"] = round(max(0.0, self.breaker.opened_until - time.monotonic()), 1) if self.breaker.state == OPEN else 0.0
+        out["quota"] = self.quota
+        out["tokens"] = round(self.bucket.tokens, 1)
+        return out
+
+
+_providers: Dict[str, Provider] = {}
+
+
+def provider(name: str) -> Provider:
+    p = _providers.get(name)
+    if p is None:
+        quotas = {
+            "edamam": (settings.edamam_rate_per_min, 60.0),
+            "fdc": (settings.fdc_rate_per_hour, 3600.0),
+            "gemini": (settings.gemini_rate_per_min, 60.0),
+        }
+        quota, period = quotas.get(name, (600, 60.0))
+        p = _providers[name] = Provider(name, quota, period)
+    return p
+
+
+async def call(name: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Выполнить запрос к провайдеру через его автомат и лимитер.
+    Бросает ProviderUnavailable без обращения к сети, если провайдер сейчас недоступен.
+    """
+    return await provider(name).call(fn)
+
+
+async def request(name: str, client: httpx.AsyncClient, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """HTTP-запрос с raise_for_status внутри вызова — чтобы 5xx/429 учитывались автоматом."""
+    async def send() -> httpx.Response:
+        r = await client.request(method, url, **kwargs)
+        r.raise_for_status()
+        return r
+    return await call(name, send)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: p.snapshot() for name, p in _providers.items()}
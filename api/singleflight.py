@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Склейка одинаковых одновременных запросов: пока запрос с ключом key
+    выполняется, остальные вызовы с тем же ключом ждут его результат,
+    а не отправляют свой. Результат (или исключение) получают все ожидающие.
+
+    Отмена безопасна: отменённый вызывающий просто перестаёт ждать; сам запрос
+    отменяется только когда его не ждёт уже никто.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.issued = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        _registry.append(self)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call.task is task:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.create_task(fn())
+            call = _Call(task)
+            self._calls[key] = call
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+            self.issued += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # никто больше не ждёт — освобождаем апстрим
+                call.task.cancel()
+                self._forget(key, call.task)
+                self.cancelled += 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "issued": self.issued,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "in_flight": self.in_flight(),
+        }
+
+
+_registry: List[SingleFlight] = []
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {sf.name: sf.stats() for sf in _registry}
@@ -1,50 +1,82 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import re
-from typing import Optional
-
-import httpx
+from typing import Any, Dict, List, Optional
 
+from api import http_client, resilience, translate_cache
+from api.food_cache import normalize_query
+from api.singleflight import SingleFlight
 from core.config import settings
 
 log = logging.getLogger(__name__)
 
+# Сколько одиночных запросов к Gemini разрешаем параллельно в фолбэке пакетного перевода
+_FALLBACK_CONCURRENCY = 5
+
+_ru_en_flight = SingleFlight("translate_ru_en")
+_en_ru_flight = SingleFlight("translate_en_ru")
+
+
+def _enabled() -> bool:
+    return bool(settings.use_gemini_translate and settings.gemini_api_key)
+
+
+async def _gemini_generate(prompt: str, *, generation_config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Один запрос generateContent; возвращает текст первого непустого part или None.
+    Исключения пробрасываются — их логируют вызывающие функции.
+    """
+    payload: Dict[str, Any] = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": prompt}],
+            }
+        ]
+    }
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    headers = {
+        "Content-Type": "application/json",
+        "x-goog-api-key": settings.gemini_api_key,
+    }
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.gemini_model}:generateContent"
+    r = await resilience.request("gemini", http_client.get_client(url), "POST", url, json=payload, headers=headers)
+    data = r.json()
+    candidates = data.get("candidates") or []
+    for c in candidates:
+        parts = (((c or {}).get("content") or {}).get("parts")) or []
+        for p in parts:
+            if t := p.get("text"):
+                return t
+    return None
+
 
 async def translate_ru_to_en(text: str) -> str:
-    """Перевод RU->EN через Gemini API (если включено)."""
+    """Перевод RU->EN через Gemini API (если включено), с кэшем api.translate_cache.
+    Одновременные переводы одного и того же текста склеиваются в один запрос.
+    """
     text = text.strip()
     if not text:
         return text
+    return await _ru_en_flight.do(normalize_query(text), lambda: _ru_to_en(text))
+
+
+async def _ru_to_en(text: str) -> str:
+    if cached := await translate_cache.get(translate_cache.RU_EN, text):
+        return cached
 
-    if not settings.use_gemini_translate or not settings.gemini_api_key:
+    if not _enabled():
         log.info("Gemini translation disabled or missing key; return input")
         return text
 
     try:
-        payload = {
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [{"text": f"Translate into concise English: {text}"}],
-                }
-            ]
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": settings.gemini_api_key,
-        }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.gemini_model}:generateContent"
-        async with httpx.AsyncClient(timeout=httpx.Timeout(8.0)) as client:
-            r = await client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-        candidates = data.get("candidates") or []
-        for c in candidates:
-            parts = (((c or {}).get("content") or {}).get("parts")) or []
-            for p in parts:
-                if t := p.get("text"):
-                    return t.strip()
+        t = await _gemini_generate(f"Translate into concise English: {text}")
+        if t:
+            await translate_cache.put(translate_cache.RU_EN, text, t.strip())
+            return t.strip()
     except Exception as e:
         log.warning("Gemini translate_ru_to_en error: %s", e)
 
@@ -52,44 +84,99 @@ async def translate_ru_to_en(text: str) -> str:
 
 
 async def translate_en_to_ru(text: str) -> str:
-    """Перевод EN->RU через Gemini API с постобработкой результата."""
+    """Перевод EN->RU через Gemini API с постобработкой результата и кэшем.
+    Одновременные переводы одного и того же текста склеиваются в один запрос.
+    """
     text = text.strip()
     if not text:
         return text
+    return await _en_ru_flight.do(normalize_query(text), lambda: _en_to_ru(text))
 
-    if not settings.use_gemini_translate or not settings.gemini_api_key:
+
+async def _en_to_ru(text: str) -> str:
+    if cached := await translate_cache.get(translate_cache.EN_RU, text):
+        return cached
+
+    if not _enabled():
         return text
 
     try:
-        payload = {
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [{"text": f"Translate the following food name into Russian, concise form, no commentary: {text}"}],
-                }
-            ]
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": settings.gemini_api_key,
-        }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.gemini_model}:generateContent"
-        async with httpx.AsyncClient(timeout=httpx.Timeout(8.0)) as client:
-            r = await client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-        candidates = data.get("candidates") or []
-        for c in candidates:
-            parts = (((c or {}).get("content") or {}).get("parts")) or []
-            for p in parts:
-                if t := p.get("text"):
-                    return _sanitize_ru(t)
+        t = await _gemini_generate(
+            f"Translate the following food name into Russian, concise form, no commentary: {text}"
+        )
+        if t:
+            ru = _sanitize_ru(t)
+            await translate_cache.put(translate_cache.EN_RU, text, ru)
+            return ru
     except Exception as e:
         log.warning("Gemini translate_en_to_ru error: %s", e)
 
     return text
 
 
+async def translate_many_en_to_ru(texts: List[str]) -> List[str]:
+    """Пакетный перевод EN->RU: один запрос к Gemini со структурированным ответом
+    [{"i": индекс, "ru": перевод}, ...]. Результат выровнен по индексам входа.
+    Если пакетный вызов не удался или вернул не все элементы — недостающие
+    переводим одиночными запросами параллельно (не более _FALLBACK_CONCURRENCY).
+    Уже известные переводы берутся из api.translate_cache и в запрос не попадают.
+    """
+    items = [(t or "").strip() for t in texts]
+    out: List[Optional[str]] = [t if not t else None for t in items]
+    for i, t in enumerate(items):
+        if t:
+            out[i] = await translate_cache.get(translate_cache.EN_RU, t)
+    todo = [i for i, t in enumerate(items) if t and out[i] is None]
+    if not todo or not _enabled():
+        return [o if o is not None else items[i] for i, o in enumerate(out)]
+
+    try:
+        numbered = "\n".join(f"{i}. {items[i]}" for i in todo)
+        raw = await _gemini_generate(
+            "Translate each numbered food name into Russian, concise form, no commentary. "
+            "Return a JSON array of objects {\"i\": number, \"ru\": translation}, one per input line.\n"
+            + numbered,
+            generation_config={
+                "responseMimeType": "application/json",
+                "responseSchema": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {"i": {"type": "INTEGER"}, "ru": {"type": "STRING"}},
+                        "required": ["i", "ru"],
+                    },
+                },
+            },
+        )
+        for row in json.loads(raw or "[]"):
+            i = row.get("i") if isinstance(row, dict) else None
+            ru = row.get("ru") if isinstance(row, dict) else None
+            if isinstance(i, int) and i in todo and isinstance(ru, str) and ru.strip():
+                out[i] = _sanitize_ru(ru)
+        await translate_cache.put_many(
+            translate_cache.EN_RU, [(items[i], out[i]) for i in todo if out[i] is not None]
+        )
+    except resilience.ProviderUnavailable as e:
+        # Gemini сейчас недоступен — одиночные запросы тоже не пройдут, показываем оригиналы
+        log.info("Gemini translate_many_en_to_ru skipped: %s", e)
+        return [o if o is not None else items[i] for i, o in enumerate(out)]
+    except Exception as e:
+        log.warning("Gemini translate_many_en_to_ru batch error: %s", e)
+
+    missing = [i for i in todo if out[i] is None]
+    if missing:
+        log.info("Batch translate: fallback for %d of %d items", len(missing), len(todo))
+        sem = asyncio.Semaphore(_FALLBACK_CONCURRENCY)
+
+        async def _one(i: int) -> None:
+            async with sem:
+                out[i] = await translate_en_to_ru(items[i])
+
+        await asyncio.gather(*(_one(i) for i in missing))
+
+    return [o if o is not None else items[i] for i, o in enumerate(out)]
+
+
 def _sanitize_ru(raw: str) -> str:
     """Чистим от лишнего и форматируем под короткое RU-название."""
     t = raw.strip()
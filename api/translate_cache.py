@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete
+
+from api.food_cache import normalize_query
+from core.config import settings
+from core.db import SessionLocal
+from core.models import TranslationCache
+
+log = logging.getLogger(__name__)
+
+RU_EN = "ru_en"
+EN_RU = "en_ru"
+
+SYNONYMS_PATH = Path(__file__).resolve().parents[1] / "static" / "synonyms_ru.json"
+
+# (direction, text_key) -> (translated, stored_at)
+_lru: "OrderedDict[Tuple[str, str], Tuple[str, datetime]]" = OrderedDict()
+# Сиды из static/synonyms_ru.json: не вытесняются и не устаревают
+_seed: Dict[Tuple[str, str], str] = {}
+_stats: Dict[str, int] = {"hit": 0, "seed_hit": 0, "db_hit": 0, "miss": 0, "stored": 0, "purged": 0}
+
+
+def _key(text: str) -> str:
+    key = normalize_query(text)
+    if len(key) > 255:
+        # text_key — String(255); длинные тексты хэшируем, а не обрезаем (иначе общий префикс — общий перевод)
+        key = "#" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return key
+
+
+def _max_age() -> timedelta:
+    return timedelta(days=max(1, settings.translate_cache_max_age_days))
+
+
+def _lru_put(k: Tuple[str, str], value: str, stored_at: datetime) -> None:
+    _lru[k] = (value, stored_at)
+    _lru.move_to_end(k)
+    while len(_lru) > max(1, settings.translate_cache_lru_size):
+        _lru.popitem(last=False)
+
+
+def seed_from_file(path: Path = SYNONYMS_PATH) -> int:
+    """Загрузить RU→EN синонимы: {"гречка": "buckwheat", "курица": ["chicken", ...]}.
+    Для списка берём первый вариант. Пустой/отсутствующий файл — не ошибка.
+    """
+    try:
+        raw = path.read_text(encoding="utf-8").strip()
+        data = json.loads(raw) if raw else {}
+    except Exception as e:
+        log.warning("Translate cache: cannot read %s: %s", path, e)
+        return 0
+    n = 0
+    for ru, en in (data or {}).items():
+        if isinstance(en, list):
+            en = en[0] if en else None
+        if isinstance(ru, str) and isinstance(en, str) and ru.strip() and en.strip():
+            _seed[(RU_EN, _key(ru))] = en.strip()
+            n += 1
+    return n
+
+
+async def get(direction: str, text: str) -> Optional[str]:
+    """Найти перевод: сиды → LRU → translation_cache. None — промах."""
+    k = (direction, _key(text))
+    if not k[1]:
+        return None
+
+    if k in _seed:
+        _stats["seed_hit"] += 1
+        return _seed[k]
+
+    now = datetime.utcnow()
+    item = _lru.get(k)
+    if item is not None:
+        value, stored_at = item
+        if now - stored_at < _max_age():
+            _lru.move_to_end(k)
+            _stats["hit"] += 1
+            return value
+        _lru.pop(k, None)
+
+    try:
+        async with SessionLocal() as session:
+            row = await session.get(TranslationCache, k)
+    except Exception as e:
+        log.warning("Translate cache read error: %s", e)
+        row = None
+    if row is not None and now - row.created_at < _max_age():
+        _lru_put(k, row.translated, row.created_at)
+        _stats["db_hit"] += 1
+        return row.translated
+
+    _stats["miss"] += 1
+    return None
+
+
+async def put_many(direction: str, pairs: Iterable[Tuple[str, str]]) -> None:
+    """Сохранить переводы (исходный текст, перевод) в LRU и БД одной транзакцией."""
+    now = datetime.utcnow()
+    rows = []
+    for text, translated in pairs:
+        k = (direction, _key(text))
+        value = (translated or "").strip()[:255]
+        if not k[1] or not value:
+            continue
+        _lru_put(k, value, now)
+        rows.append(TranslationCache(direction=direction, text_key=k[1], translated=value, created_at=now))
+    if not rows:
+        return
+    try:
+        async with SessionLocal() as session:
+            for row in rows:
+                await session.merge(row)
+            await session.commit()
+        _stats["stored"] += len(rows)
+    except Exception as e:
+        log.warning("Translate cache write error: %s", e)
+
+
+async def put(direction: str, text: str, translated: str) -> None:
+    await put_many(direction, [(text, translated)])
+
+
+async def purge_expired() -> int:
+    """Удалить из БД переводы старше TRANSLATE_CACHE_MAX_AGE_DAYS (по индексу created_at)."""
+    border = datetime.utcnow() - _max_age()
+    try:
+        async with SessionLocal() as session:
+            res = await session.execute(delete(TranslationCache).where(TranslationCache.created_at < border))
+            await session.commit()
+    except Exception as e:
+        log.warning("Translate cache purge error: %s", e)
+        return 0
+    removed = res.rowcount or 0
+    _stats["purged"] += removed
+    return removed
+
+
+async def purge_loop() -> None:
+    """Фоновая чистка translation_cache раз в сутки."""
+    while True:
+        await asyncio.sleep(24 * 3600)
+        removed = await purge_expired()
+        if removed:
+            log.info("Translate cache: purged %d old rows", removed)
+
+
+def stats() -> Dict[str, float]:
+    out: Dict[str, float] = dict(_stats)
+    hits = _stats["hit"] + _stats["seed_hit"] + _stats["db_hit"]
+    total = hits + _stats["miss"]
+    out["hit_rate"] = round(hits / total, 3) if total else 0.0
+    out["lru_size"] = len(_lru)
+    out["seeded"] = len(_seed)
+    return out
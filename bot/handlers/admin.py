@@ -6,8 +6,8 @@ from datetime import datetime
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.db import SessionLocal
 from core.crud_grants import grant_premium_days
 
 router = Router()
@@ -15,7 +15,7 @@ log = logging.getLogger(__name__)
 
 
 @router.message(Command("grant_premium"))
-async def cmd_grant_premium(message: Message):
+async def cmd_grant_premium(message: Message, session: AsyncSession):
     """
     Выдаёт премиум на N дней пользователю по его Telegram ID.
     Использование: /grant_premium <tg_id> <days>
@@ -33,13 +33,13 @@ async def cmd_grant_premium(message: Message):
         await message.answer("tg_id и days должны быть числами")
         return
 
-    async with SessionLocal() as session:
-        try:
-            until = await grant_premium_days(session, user_key=tg_id, by="tg_id", days=days)
-        except Exception as e:  # noqa: BLE001
-            log.exception("grant_premium_days failed")
-            await message.answer(f"Ошибка: {e}")
-            return
+    try:
+        until = await grant_premium_days(session, user_key=tg_id, by="tg_id", days=days)
+    except Exception as e:  # noqa: BLE001
+        log.exception("grant_premium_days failed")
+        await session.rollback()
+        await message.answer(f"Ошибка: {e}")
+        return
 
     until_str = until.strftime("%Y-%m-%d %H:%M:%S") if isinstance(until, datetime) else str(until)
     await message.answer(f"Премиум выдан до: {until_str}")
\ No newline at end of file
@@ -8,11 +8,15 @@ from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.db import SessionLocal
+from core.db import usage_stats
 from core.models import User, FoodDictionary, FoodCache, Entry
 from api.translate import ru_en_for_search
 from api.edamam_client import lookup_food
+from api import food_cache, local_index, providers, resilience, singleflight, translate_cache
+from bot.utils import broadcast, units
+from core import jobs, leader, scheduler, user_cache
 
 router = Router()
 
@@ -26,8 +30,126 @@ def _mask(value: str | None, keep: int = 4) -> str:
     return v[:keep] + "…" + "*" * max(0, len(v) - keep - 1)
 
 
+def _cache_info() -> str:
+    st = food_cache.stats()
+    if not st["enabled"]:
+        return "disabled"
+    return (
+        f"hit={st['hit']}, stale={st['stale']}, miss={st['miss']}, "
+        f"db_hit={st['db_hit']}, refresh={st['refresh']}, lru={st['lru_size']}, "
+        f"negative={st['negative_stored']} (suppressed {st['negative_hit']})"
+    )
+
+
+def _translate_cache_info() -> str:
+    st = translate_cache.stats()
+    return (
+        f"hit_rate={st['hit_rate']:.0%}, hit={st['hit']}, seed_hit={st['seed_hit']}, "
+        f"db_hit={st['db_hit']}, miss={st['miss']}, lru={st['lru_size']}, seeded={st['seeded']}"
+    )
+
+
+def _local_index_info() -> str:
+    st = local_index.stats()
+    return (
+        f"items={st['items']:.0f} (fdc={st['fdc_items']:.0f}), lookups={st['lookups']:.0f}, confident={st['confident']:.0f}, "
+        f"load={st['last_load_ms']} ms, refreshes={st['refreshes']:.0f}"
+    )
+
+
+def _user_cache_info() -> str:
+    st = user_cache.stats()
+    return (
+        f"hit_rate={st['hit_rate']:.0%}, hit={st['hit']}, miss={st['miss']}, size={st['size']}, "
+        f"invalidated={st['invalidated']}, evicted={st['evicted']}"
+    )
+
+
+def _db_usage_info() -> str:
+    st = usage_stats()
+    return (
+        f"updates={st['scopes']}, avg_conn={st['avg_connections']}, avg_stmt={st['avg_statements']}, "
+        f"max_conn={st['max_connections']}, max_stmt={st['max_statements']}"
+    )
+
+
+def _scheduler_info() -> str:
+    st = scheduler.stats()
+    return (
+        f"ticks={st['ticks']:.0f}, standby={st['standby']:.0f}, zones={st['zones']}, fired={st['fired']:.0f}, "
+        f"already_fired={st['already_fired']:.0f}, users={st['users']:.0f}, "
+        f"errors={st['errors']:.0f}, last_tick={st['last_tick_ms']} ms"
+    )
+
+
+def _leader_info() -> str:
+    st = leader.stats()
+    since = st["since"].strftime("%d.%m %H:%M") if st["since"] else "-"
+    return (
+        f"{'leader' if st['leader'] else 'standby'} ({st['mode']}), since={since}, holder={st['holder']}, "
+        f"acquired={st['acquired']}, lost={st['lost']}, errors={st['errors']}"
+    )
+
+
+def _jobs_info() -> str:
+    st = jobs.stats()
+    return (
+        f"scheduled={st['scheduled']:.0f}, claimed={st['claimed']:.0f}, done={st['done']:.0f}, "
+        f"retried={st['retried']:.0f}, failed={st['failed']:.0f}, requeued={st['requeued']:.0f}, "
+        f"last_batch={st['last_batch_ms']} ms"
+    )
+
+
+def _broadcast_info() -> str:
+    st = broadcast.stats()
+    active = ", ".join(f"{a['name']} {a['done']}/{a['total'] or '?'}" for a in st["active"]) or "none"
+    return (
+        f"sent={st['sent']:.0f}, blocked={st['blocked']:.0f} (known {st['blocked_chats']}), "
+        f"failed={st['failed']:.0f}, retry_after={st['retry_after']:.0f}, last_rate={st['last_rate']} msg/s, "
+        f"active: {active}"
+    )
+
+
+def _units_info() -> str:
+    st = units.stats()
+    return (
+        f"units={st['units']}, pieces={st['pieces']}, densities={st['densities']}, "
+        f"resolved={st['resolved']:.0f}, unresolved={st['unresolved']:.0f}, reloads={st['reloads']:.0f}"
+    )
+
+
+def _providers_info() -> str:
+    rows = []
+    for name, st in providers.stats().items():
+        rows.append(
+            f"• {name}: calls={st['calls']:.0f}, wins={st['wins']:.0f}, avg={st['avg_latency_ms']} ms, "
+            f"err={st['error_rate']:.0%}, empty={st['empty']:.0f}, cancelled={st['cancelled']:.0f}"
+        )
+    return "\n".join(rows)
+
+
+def _resilience_info() -> str:
+    rows = []
+    for name, st in resilience.stats().items():
+        rows.append(
+            f"• {name}: {st['state']}"
+            + (f" ({st['open_for_s']} s)" if st["open_for_s"] else "")
+            + f", fail_rate={st['failure_rate']:.0%}, opened={st['opened']}, short={st['short_circuited']:.0f}, "
+            f"quota={st['quota']}, throttled={st['throttled']:.0f} ({st['throttle_wait_ms']:.0f} ms), "
+            f"rejected={st['rejected']:.0f}, retry_after={st['retry_after']:.0f}"
+        )
+    return "\n".join(rows) or "• <no calls yet>"
+
+
+def _singleflight_info() -> str:
+    return "; ".join(
+        f"{name}: issued={st['issued']}, coalesced={st['coalesced']}, cancelled={st['cancelled']}"
+        for name, st in singleflight.stats().items()
+    ) or "<none>"
+
+
 @router.message(Command("diag"))
-async def cmd_diag(message: Message):
+async def cmd_diag(message: Message, user: User, session: AsyncSession):
     """
     Диагностика окружения и базовых зависимостей.
     """
@@ -53,38 +175,36 @@ async def cmd_diag(message: Message):
         env_report.append(f"{name}: {masked}")
 
     # БД метрики
-    async with SessionLocal() as session:
-        total_users = (await session.execute(select(func.count()).select_from(User))).scalar() or 0
-        dict_count = (await session.execute(select(func.count()).select_from(FoodDictionary))).scalar() or 0
-        cache_total = (await session.execute(select(func.count()).select_from(FoodCache))).scalar() or 0
-        cache_valid = (
-            await session.execute(
-                select(func.count()).select_from(FoodCache).where(FoodCache.ttl_until > datetime.utcnow())
-            )
-        ).scalar() or 0
-
-        usr = (
-            await session.execute(select(User).where(User.tg_id == message.from_user.id))
-        ).scalar_one_or_none()
-        today = datetime.utcnow().date()
-        today_entries = 0
-        if usr:
-            today_entries = (
-                await session.execute(
-                    select(func.count()).select_from(Entry).where(Entry.user_id == usr.id, Entry.date == today)
-                )
-            ).scalar() or 0
-
-        # Тест перевода и поиска
-        try:
-            en_variants = await ru_en_for_search("куриная грудка", method="boiled")
-        except Exception as e:
-            en_variants = [f"<error: {e}>"]
-        try:
-            items = await lookup_food(session, "куриная грудка", method="boiled")
-            items_info = f"ok, {len(items)} items"
-        except Exception as e:
-            items_info = f"error: {e}"
+    total_users = (await session.execute(select(func.count()).select_from(User))).scalar() or 0
+    dict_count = (await session.execute(select(func.count()).select_from(FoodDictionary))).scalar() or 0
+    cache_total = (await session.execute(select(func.count()).select_from(FoodCache))).scalar() or 0
+    cache_valid = (
+        await session.execute(
+            select(func.count()).select_from(FoodCache).where(FoodCache.ttl_until > datetime.utcnow())
+        )
+    ).scalar() or 0
+
+    today = scheduler.local_today(user.tz)
+    today_entries = (
+        await session.execute(
+            select(func.count()).select_from(Entry).where(Entry.user_id == user.id, Entry.date == today)
+        )
+    ).scalar() or 0
+    # соединение не держим, пока идут сетевые проверки ниже
+    await session.commit()
+
+    # Тест перевода и поиска
+    query_en = "куриная грудка"
+    try:
+        query_en = await ru_en_for_search("куриная грудка")
+        en_variants = [query_en]
+    except Exception as e:
+        en_variants = [f"<error: {e}>"]
+    try:
+        items = await lookup_food(query_en, method="boiled")
+        items_info = f"ok, {len(items)} items"
+    except Exception as e:
+        items_info = f"error: {e}"
 
     text = (
         "<b>DIAG</b>\n\n"
@@ -92,5 +212,18 @@ async def cmd_diag(message: Message):
         f"<b>DB</b>: users={total_users}, dict={dict_count}, cache={cache_total} (valid {cache_valid}), today_entries={today_entries}\n\n"
         f"<b>Translate</b>: candidates={', '.join(en_variants) if en_variants else '<none>'}\n"
         f"<b>Lookup</b>: {items_info}\n"
+        f"<b>FoodCache</b>: {_cache_info()}\n"
+        f"<b>TranslateCache</b>: {_translate_cache_info()}\n"
+        f"<b>LocalIndex</b>: {_local_index_info()}\n"
+        f"<b>Units</b>: {_units_info()}\n"
+        f"<b>UserCache</b>: {_user_cache_info()}\n"
+        f"<b>DB per update</b>: {_db_usage_info()}\n"
+        f"<b>Leader</b>: {_leader_info()}\n"
+        f"<b>Scheduler</b>: {_scheduler_info()}\n"
+        f"<b>Jobs</b>: {_jobs_info()}\n"
+        f"<b>Broadcast</b>: {_broadcast_info()}\n"
+        f"<b>Providers</b>:\n{_providers_info()}\n"
+        f"<b>Resilience</b>:\n{_resilience_info()}\n"
+        f"<b>Singleflight</b>: {_singleflight_info()}\n"
     )
     await message.answer(text)
\ No newline at end of file
@@ -1,18 +1,64 @@
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
-from datetime import datetime
-from core.db import SessionLocal
-from core.crud import get_daily_summary
-from sqlalchemy import select
+from datetime import timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from core import scheduler
+from core.crud import get_daily_summary, get_range_totals
 from core.models import User
+from bot.utils.calcs import user_targets
+from bot.utils.period_stats import ROLLING_WINDOW, period_stats
 
 router = Router()
 
 @router.message(Command("summary"))
-async def cmd_summary(message: Message):
-    async with SessionLocal() as session:
-        user = (await session.execute(select(User).where(User.tg_id==message.from_user.id))).scalar_one()
-        today = datetime.utcnow().date()
-        s = await get_daily_summary(session, user.id, today)
-    await message.answer(f"Сводка за сегодня: {round(s['kcal'])} ккал, Б {round(s['p'],1)} / Ж {round(s['f'],1)} / У {round(s['c'],1)}")
\ No newline at end of file
+async def cmd_summary(message: Message, user: User, session: AsyncSession):
+    today = scheduler.local_today(user.tz)
+    s = await get_daily_summary(session, user.id, today)
+    await message.answer(f"Сводка за сегодня: {round(s['kcal'])} ккал, Б {round(s['p'],1)} / Ж {round(s['f'],1)} / У {round(s['c'],1)}")
+
+def _fmt_day(d) -> str:
+    return d.strftime("%d.%m")
+
+
+def _period_text(title: str, st: dict) -> str:
+    if not st["logged_days"]:
+        return f"<b>{title}: {_fmt_day(st['start'])}–{_fmt_day(st['end'])}</b>\nЗаписей за период нет."
+    avg, total = st["avg"], st["total"]
+    lines = [
+        f"<b>{title}: {_fmt_day(st['start'])}–{_fmt_day(st['end'])}</b>",
+        f"Дней с записями: {st['logged_days']} из {st['days']}",
+        f"В среднем за день: {round(avg['kcal'])} ккал, Б {round(avg['p'])} / Ж {round(avg['f'])} / У {round(avg['c'])}",
+        f"Всего: {round(total['kcal'])} ккал",
+    ]
+    if st["avg_pct"]:
+        pct = st["avg_pct"]
+        lines.append(
+            f"Цель {st['targets']['kcal']} ккал: в среднем {pct['kcal']:.0f}% "
+            f"(Б {pct['p']:.0f}% / Ж {pct['f']:.0f}% / У {pct['c']:.0f}%), в норме ±10%: {st['on_target_days']} дн."
+        )
+    rolling = next((v for v in reversed(st["rolling_kcal"]) if v is not None), None)
+    if rolling is not None:
+        lines.append(f"Скользящее среднее ({ROLLING_WINDOW} дн.): {round(rolling)} ккал")
+    (hi_day, hi), (lo_day, lo) = st["max_day"], st["min_day"]
+    lines.append(f"Максимум: {_fmt_day(hi_day)} — {round(hi)} ккал; минимум: {_fmt_day(lo_day)} — {round(lo)} ккал")
+    return "\n".join(lines)
+
+
+async def _period_report(message: Message, user: User, session: AsyncSession, title: str, days: int) -> None:
+    end = scheduler.local_today(user.tz)
+    start = end - timedelta(days=days - 1)
+    # Одним запросом — все дни периода
+    rows = await get_range_totals(session, user.id, start, end)
+    st = period_stats(rows, start, end, user_targets(user))
+    await message.answer(_period_text(title, st))
+
+
+@router.message(Command("week"))
+async def cmd_week(message: Message, user: User, session: AsyncSession):
+    await _period_report(message, user, session, "Неделя", 7)
+
+
+@router.message(Command("month"))
+async def cmd_month(message: Message, user: User, session: AsyncSession):
+    await _period_report(message, user, session, "30 дней", 30)
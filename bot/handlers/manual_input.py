@@ -1,6 +1,7 @@
 # File: bot/handlers/manual_input.py
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any, Dict, List, Optional
 
@@ -8,18 +9,154 @@ from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 
-from bot.keyboards.choices import variants_kb, confirm_add_kb
+from bot.keyboards.choices import variants_kb, confirm_add_kb, confirm_meal_kb
 from bot.keyboards.common import back_home_kb
-from core.crud import add_entry
-from core.db import async_session_maker
-from api.edamam_client import lookup_food
-from api.translate import translate_ru_to_en, translate_en_to_ru
-from bot.utils.parser import parse_line
+from core import scheduler
+from core.crud import add_entry, add_entries
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.models import User
+from api import providers
+from api import resilience
+from api.translate import _gemini_generate, translate_en_to_ru, translate_ru_to_en, translate_many_en_to_ru
+from bot.utils.parser import Parsed, parse_line, split_meal
+from bot.utils import search_sessions
 
 router = Router()
 log = logging.getLogger(__name__)
 
 
+async def _translate_titles(variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Перевести названия вариантов EN→RU (на месте) и вернуть тот же список.
+    Локальные варианты (source="preset") уже на русском — их не трогаем.
+    """
+    foreign = [v for v in variants if v.get("source") != "preset"]
+    if not foreign:
+        return variants
+    ru_titles = await translate_many_en_to_ru([v.get("title", "") for v in foreign])
+    for v, ru_title in zip(foreign, ru_titles):
+        v["title"] = ru_title or v.get("title")
+    return variants
+
+
+def _portion(variant: Dict[str, Any], grams: float) -> Dict[str, Any]:
+    """Пересчитать вариант (на 100 г) на порцию."""
+    return {
+        "title": variant.get("title") or "",
+        "grams": grams,
+        "kcal": round((variant.get("kcal100", 0) * grams) / 100, 1),
+        "p": round((variant.get("p100", 0) * grams) / 100, 1),
+        "f": round((variant.get("f100", 0) * grams) / 100, 1),
+        "c": round((variant.get("c100", 0) * grams) / 100, 1),
+        "source": variant.get("source") or "api",
+    }
+
+
+def _session_from(call: CallbackQuery, prefix: str) -> Optional[search_sessions.SearchSession]:
+    """Достать сессию поиска по токену из callback_data вида '<prefix>:<sid>[:...]'."""
+    rest = call.data[len(prefix):].split(":")
+    if not rest or not rest[0]:
+        return None
+    return search_sessions.get(call.message.chat.id, rest[0])
+
+
+_EXPIRED = "Поиск устарел — отправь блюдо ещё раз."
+
+# Сколько вариантов ждём на каждую позицию приёма пищи (берём лучший)
+_MEAL_VARIANTS = 3
+
+
+def _meal_item(parsed: Parsed, chosen: Dict[str, Any]) -> Dict[str, Any]:
+    """Позиция приёма пищи в формате crud.add_entries.
+    Только калории, без количества («кофе 50 ккал») — одна порция: в схеме amount_value NOT NULL и > 0.
+    """
+    if parsed.amount_value:
+        amount_value, amount_unit = parsed.amount_value, parsed.amount_unit or "g"
+    elif chosen["grams"]:
+        amount_value, amount_unit = chosen["grams"], "g"
+    else:
+        amount_value, amount_unit = 1.0, "portion"
+    return {
+        "title": chosen["title"],
+        "amount_value": amount_value,
+        "amount_unit": amount_unit,
+        "amount_grams": chosen["grams"],
+        "kcal": chosen["kcal"],
+        "p": chosen["p"],
+        "f": chosen["f"],
+        "c": chosen["c"],
+        "is_calories_only": chosen.get("is_calories_only", False),
+        "source": chosen["source"],
+    }
+
+
+def _own_values(parsed: Parsed) -> Dict[str, Any]:
+    """Позиция, для которой пользователь сам указал ккал — без поиска."""
+    return {
+        "title": parsed.title.capitalize() or "Без названия",
+        "grams": parsed.grams,
+        "kcal": parsed.kcal,
+        "p": parsed.p or 0.0,
+        "f": parsed.f or 0.0,
+        "c": parsed.c or 0.0,
+        "is_calories_only": parsed.p is None and parsed.f is None and parsed.c is None,
+        "source": "manual",
+    }
+
+
+async def _catch_meal(message: Message, lines: List[str]) -> None:
+    """Несколько блюд в одном сообщении: все позиции ищем параллельно,
+    показываем одно общее подтверждение.
+    """
+    items = [parse_line(line) for line in lines]
+    log.info("Meal input: %d items: %s", len(items), items)
+    await message.answer(f"🔍 Считаю приём пищи ({len(items)} поз.), подожди...", reply_markup=back_home_kb())
+
+    # Время ответа ≈ самая медленная позиция, а не сумма
+    to_search = [p for p in items if p.kcal is None and p.title]
+    found = await asyncio.gather(
+        *(providers.search(p.title, method=p.method, limit=_MEAL_VARIANTS) for p in to_search)
+    )
+    best = {id(p): variants[0] for p, (variants, _) in zip(to_search, found) if variants}
+    await _translate_titles(list(best.values()))
+
+    resolved: List[Dict[str, Any]] = []
+    lines_out: List[str] = []
+    missed: List[str] = []
+    for parsed in items:
+        if parsed.kcal is not None:
+            chosen = _own_values(parsed)
+        elif id(parsed) in best:
+            chosen = _portion(best[id(parsed)], parsed.grams or 100)
+        else:
+            missed.append(parsed.title or "?")
+            continue
+        resolved.append(_meal_item(parsed, chosen))
+        grams = f" — {chosen['grams']:.0f} г" if chosen["grams"] else ""
+        lines_out.append(
+            f"{len(resolved)}. {chosen['title']}{grams} · {chosen['kcal']:.0f} ккал · "
+            f"Б/Ж/У {chosen['p']}/{chosen['f']}/{chosen['c']}"
+        )
+
+    if not resolved:
+        await message.answer(
+            "Не нашёл ни одной позиции. Отправь блюда по одному или укажи ккал (например, «суп 180 ккал»).",
+            reply_markup=back_home_kb(),
+        )
+        return
+
+    total = {k: round(sum(it[k] or 0 for it in resolved), 1) for k in ("kcal", "p", "f", "c")}
+    text = "🍽 <b>Приём пищи</b>\n" + "\n".join(lines_out)
+    if missed:
+        text += "\n\n❓ Не нашёл, пропущу: " + ", ".join(missed)
+    text += (
+        f"\n\n<b>Итого:</b> {total['kcal']:.0f} ккал · Б/Ж/У {total['p']}/{total['f']}/{total['c']}"
+        "\n\nДобавить в отчёт?"
+    )
+
+    sess = search_sessions.create(message.chat.id, None, None, [], items=resolved)
+    await message.answer(text, reply_markup=confirm_meal_kb(sess.token), parse_mode="HTML")
+
+
 @router.message(Command("add"))
 @router.message(F.text == "➕ Добавить")
 async def start_manual_input(message: Message):
@@ -33,6 +170,11 @@ async def start_manual_input(message: Message):
 @router.message(F.text & ~F.text.in_({"🏠 В главное меню", "❌ Отмена"}))
 async def catch_manual(message: Message):
     text = message.text.strip()
+    lines = split_meal(text)
+    if len(lines) > 1:
+        await _catch_meal(message, lines)
+        return
+
     parsed = parse_line(text)
     log.info("Parsed input: %s -> %s", text, parsed)
 
@@ -41,13 +183,9 @@ async def catch_manual(message: Message):
     query_ru = parsed.title
     method = parsed.method
 
-    # Перевод RU→EN для Edamam
-    query_en = await translate_ru_to_en(query_ru)
-    log.info("Provider queries: RU='%s' -> EN='%s' (only_en=True)", query_ru, query_en)
-
-    # Поиск в Edamam (ограничено до top-5)
-    variants = await lookup_food(query_en, method=method, limit=5)
-    log.info("Edamam variants: %d", len(variants))
+    # Параллельно: локальный словарь, Edamam, FDC (перевод RU→EN — внутри), top-5
+    variants, query_en = await providers.search(query_ru, method=method, limit=5)
+    log.info("Provider queries: RU='%s' -> EN='%s', variants: %d", query_ru, query_en, len(variants))
 
     if not variants:
         await message.answer(
@@ -56,100 +194,69 @@ async def catch_manual(message: Message):
         )
         return
 
-    # Перевод EN→RU названий для отображения
-    translated_variants: List[Dict[str, Any]] = []
-    for v in variants:
-        ru_title = await translate_en_to_ru(v.get("title", ""))
-        v["title"] = ru_title or v.get("title")
-        translated_variants.append(v)
+    # Перевод EN→RU названий для отображения — одним пакетным запросом
+    translated_variants = await _translate_titles(variants)
+
+    # Запоминаем результат: pick/confirm дальше работают только с памятью
+    sess = search_sessions.create(message.chat.id, parsed, query_en, translated_variants)
 
     await message.answer(
         "Нашёл варианты, выбери один:",
-        reply_markup=variants_kb(translated_variants, include_ai=True),
+        reply_markup=variants_kb(translated_variants, include_ai=True, sid=sess.token),
     )
 
 
 @router.callback_query(F.data.startswith("pick:"))
 async def pick_variant(call: CallbackQuery):
-    await call.answer("Считаю КБЖУ для твоей порции…")
-
-    index = int(call.data.split(":", 1)[1])
-    message = call.message
-    text = message.reply_to_message.text if message.reply_to_message else None
-
-    parsed = parse_line(text or "")
-
-    # Поиск снова (или можно кэшировать)
-    query_en = await translate_ru_to_en(parsed.title)
-    variants = await lookup_food(query_en, method=parsed.method, limit=5)
-    if not variants or index >= len(variants):
-        await call.message.answer("Ошибка: вариант не найден.")
+    parts = call.data.split(":")
+    sess = _session_from(call, "pick:")
+    if sess is None or len(parts) != 3:
+        await call.answer(_EXPIRED, show_alert=True)
         return
 
-    chosen = variants[index]
+    index = int(parts[2])
+    if index >= len(sess.variants):
+        await call.answer("Ошибка: вариант не найден.", show_alert=True)
+        return
+    await call.answer("Считаю КБЖУ для твоей порции…")
 
-    grams = parsed.grams or 100
-    kcal = round((chosen["kcal100"] * grams) / 100, 1)
-    p = round((chosen["p100"] * grams) / 100, 1)
-    f = round((chosen["f100"] * grams) / 100, 1)
-    c = round((chosen["c100"] * grams) / 100, 1)
+    chosen = _portion(sess.variants[index], sess.parsed.grams or 100)
+    sess.chosen = chosen
 
     msg = (
-        f"✅ <b>{chosen['title']}</b> — {grams:.0f} г\n"
-        f"≈ {kcal} ккал\n"
-        f"Б/Ж/У: {p}/{f}/{c}\n\nДобавить в отчёт?"
+        f"✅ <b>{chosen['title']}</b> — {chosen['grams']:.0f} г\n"
+        f"≈ {chosen['kcal']} ккал\n"
+        f"Б/Ж/У: {chosen['p']}/{chosen['f']}/{chosen['c']}\n\nДобавить в отчёт?"
     )
 
-    await call.message.answer(msg, reply_markup=confirm_add_kb(), parse_mode="HTML")
+    await call.message.answer(msg, reply_markup=confirm_add_kb(sess.token), parse_mode="HTML")
 
 
-@router.callback_query(F.data == "variant:ai")
+@router.callback_query(F.data.startswith("variant:ai"))
 async def pick_ai_variant(call: CallbackQuery):
-    await call.answer()
-    message = call.message.reply_to_message
-    text = message.text if message else None
-    if not text:
-        await call.message.answer("Не удалось определить запрос.")
+    sess = _session_from(call, "variant:ai:")
+    if sess is None:
+        await call.answer(_EXPIRED, show_alert=True)
         return
+    await call.answer()
 
     await call.message.answer("🤖 Считаю с помощью ИИ…")
 
-    # Импортируем здесь, чтобы не тянуть лишнее при обычной работе
-    from api.translate import translate_ru_to_en, translate_en_to_ru
-    import httpx
-
-    query_ru = parse_line(text).title
-    query_en = await translate_ru_to_en(query_ru)
-
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [
-                    {
-                        "text": (
-                            f"Estimate nutrition (kcal, proteins, fats, carbs per 100g) "
-                            f"for: {query_en}. Return JSON: {{'title': name, 'kcal100':, 'p100':, 'f100':, 'c100':}}"
-                        )
-                    }
-                ],
-            }
-        ]
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": settings.gemini_api_key,
-    }
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.gemini_model}:generateContent"
+    query_en = sess.query_en or await translate_ru_to_en(sess.parsed.title)
 
+    # Через автомат и лимитер провайдера gemini (api.resilience), как и переводы
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            r = await client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-            text_out = str(data)
+        text_out = await _gemini_generate(
+            f"Estimate nutrition (kcal, proteins, fats, carbs per 100g) for: {query_en}. "
+            "Return JSON: {\"title\": name, \"kcal100\": number, \"p100\": number, \"f100\": number, \"c100\": number}",
+            generation_config={"responseMimeType": "application/json"},
+        ) or ""
+    except resilience.ProviderUnavailable as e:
+        log.info("Gemini nutrition estimate skipped: %s", e)
+        await call.message.answer("ИИ сейчас недоступен — попробуй позже или выбери вариант из списка.")
+        return
     except Exception as e:
+        log.warning("Gemini nutrition estimate error: %s", e)
         await call.message.answer(f"Ошибка Gemini: {e}")
         return
 
@@ -166,63 +273,86 @@ async def pick_ai_variant(call: CallbackQuery):
         await call.message.answer("Не удалось получить данные от ИИ.")
         return
 
-    ru_title = await translate_en_to_ru(parsed.get("title", query_en))
-    grams = parse_line(text).grams or 100
-    kcal = round((parsed.get("kcal100", 0) * grams) / 100, 1)
-    p = round((parsed.get("p100", 0) * grams) / 100, 1)
-    f = round((parsed.get("f100", 0) * grams) / 100, 1)
-    c = round((parsed.get("c100", 0) * grams) / 100, 1)
+    parsed["title"] = await translate_en_to_ru(parsed.get("title", query_en))
+    parsed["source"] = "api"
+    chosen = _portion(parsed, sess.parsed.grams or 100)
+    sess.chosen = chosen
 
     msg = (
-        f"🤖 <b>{ru_title}</b> — {grams:.0f} г\n"
-        f"≈ {kcal} ккал\n"
-        f"Б/Ж/У: {p}/{f}/{c}\n\nДобавить в отчёт?"
+        f"🤖 <b>{chosen['title']}</b> — {chosen['grams']:.0f} г\n"
+        f"≈ {chosen['kcal']} ккал\n"
+        f"Б/Ж/У: {chosen['p']}/{chosen['f']}/{chosen['c']}\n\nДобавить в отчёт?"
     )
-    await call.message.answer(msg, reply_markup=confirm_add_kb(), parse_mode="HTML")
+    await call.message.answer(msg, reply_markup=confirm_add_kb(sess.token), parse_mode="HTML")
 
 
-@router.callback_query(F.data == "confirm:add")
-async def confirm_add(call: CallbackQuery):
-    message = call.message.reply_to_message
-    text = message.text if message else None
-    if not text:
-        await call.message.answer("Не удалось определить, что добавлять.")
+@router.callback_query(F.data.startswith("confirm:add"))
+async def confirm_add(call: CallbackQuery, user: User, session: AsyncSession):
+    sess = _session_from(call, "confirm:add:")
+    if sess is None or sess.chosen is None:
+        await call.answer(_EXPIRED, show_alert=True)
         return
+    await call.answer()
 
-    parsed = parse_line(text)
-
-    async with async_session_maker() as session:
+    # Забираем вариант — повторное нажатие во время записи увидит пустую сессию и не задвоит её.
+    # Сессию закрываем только после записи: при ошибке вариант возвращается, можно нажать ещё раз
+    parsed, chosen = sess.parsed, sess.chosen
+    sess.chosen = None
+    try:
         await add_entry(
             session,
-            user_id=call.from_user.id,
-            title=parsed.title,
-            grams=parsed.grams,
-            kcal=parsed.kcal,
-            source="manual",
+            user.id,
+            on_date=scheduler.local_today(user.tz),
+            title=chosen["title"],
+            amount_value=parsed.amount_value or chosen["grams"],
+            amount_unit=parsed.amount_unit or "g",
+            amount_grams=chosen["grams"],
+            kcal=chosen["kcal"],
+            p=chosen["p"],
+            f=chosen["f"],
+            c=chosen["c"],
+            is_calories_only=False,
+            source=chosen["source"],
         )
+    except Exception:
+        sess.chosen = chosen
+        raise
+    search_sessions.drop(call.message.chat.id, sess.token)
 
     await call.message.answer("✅ Добавлено в отчёт!", reply_markup=back_home_kb())
 
 
-@router.callback_query(F.data == "confirm:other")
-async def confirm_other(call: CallbackQuery):
-    await call.answer("Хорошо, покажу другие варианты…")
-    message = call.message.reply_to_message
-    if not message:
-        await call.message.answer("Не найден предыдущий запрос.")
+@router.callback_query(F.data.startswith("meal:add"))
+async def confirm_meal(call: CallbackQuery, user: User, session: AsyncSession):
+    sess = _session_from(call, "meal:add:")
+    if sess is None or not sess.items:
+        await call.answer(_EXPIRED, show_alert=True)
         return
+    await call.answer()
+
+    # Забираем позиции — повторное нажатие во время записи увидит пустую сессию и не задвоит её.
+    # Сессию закрываем только после записи: при ошибке позиции возвращаются, можно нажать ещё раз
+    items, sess.items = sess.items, []
+    try:
+        # Все позиции — одним INSERT в одной транзакции
+        count = await add_entries(session, user.id, on_date=scheduler.local_today(user.tz), items=items)
+    except Exception:
+        sess.items = items
+        raise
+    search_sessions.drop(call.message.chat.id, sess.token)
 
-    parsed = parse_line(message.text)
-    query_en = await translate_ru_to_en(parsed.title)
-    variants = await lookup_food(query_en, method=parsed.method, limit=5)
+    await call.message.answer(f"✅ Добавлено в отчёт: {count} поз.", reply_markup=back_home_kb())
 
-    translated_variants: List[Dict[str, Any]] = []
-    for v in variants:
-        ru_title = await translate_en_to_ru(v.get("title", ""))
-        v["title"] = ru_title or v.get("title")
-        translated_variants.append(v)
+
+@router.callback_query(F.data.startswith("confirm:other"))
+async def confirm_other(call: CallbackQuery):
+    sess = _session_from(call, "confirm:other:")
+    if sess is None:
+        await call.answer(_EXPIRED, show_alert=True)
+        return
+    await call.answer("Хорошо, покажу другие варианты…")
 
     await call.message.answer(
         "Вот другие варианты:",
-        reply_markup=variants_kb(translated_variants, include_ai=True),
-    )
+        reply_markup=variants_kb(sess.variants, include_ai=True, sid=sess.token),
+    )
\ No newline at end of file
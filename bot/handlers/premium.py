@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 import logging
-from aiogram import Router, F
+from datetime import datetime
+from functools import partial
+
+from aiogram import Bot, Router, F
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
+from sqlalchemy import select
 
 from bot.keyboards.main_menu import main_menu_kb
+from bot.utils import broadcast
+from core import jobs
+from core.db import SessionLocal
+from core.models import Job, User
 
 router = Router()
 log = logging.getLogger(__name__)
@@ -83,4 +91,30 @@ async def back_to_main_from_premium(call: CallbackQuery):
     except Exception:
         pass
     await call.message.answer("Что дальше?", reply_markup=main_menu_kb())
-    await call.answer()
\ No newline at end of file
+    await call.answer()
+
+
+# --- напоминание об окончании премиума (задача из core.jobs) ---
+def premium_reminder_handler(bot: Bot) -> jobs.JobHandler:
+    async def send(job: Job) -> None:
+        data = jobs.payload(job)
+        async with SessionLocal() as session:
+            row = (await session.execute(
+                select(User.tg_id, User.premium_until).where(User.id == job.user_id)
+            )).one_or_none()
+        if row is None:
+            return
+        tg_id, until = row
+        # премиум уже продлили/сняли — задача устарела
+        if until is None or until.isoformat() != data.get("premium_until") or until <= datetime.utcnow():
+            return
+        days = data.get("days_left")
+        when = "завтра" if days == 1 else f"через {days} дня"
+        # через общий лимитер рассылок; заблокировавшему бота — просто не шлём
+        await broadcast.deliver(tg_id, partial(
+            bot.send_message,
+            tg_id,
+            f"⭐️ Премиум закончится {when} — {until.strftime('%d.%m.%Y')}. Продлите, чтобы не потерять доступ.",
+            reply_markup=premium_kb(),
+        ))
+    return send
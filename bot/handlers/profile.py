@@ -9,9 +9,10 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery
-from sqlalchemy import select, update
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.db import async_session_maker
+from core import user_cache
 from core.models import User
 
 # Пытаемся использовать готовые клавиатуры профиля
@@ -33,10 +34,15 @@ class ProfileStates(StatesGroup):
     waiting_age = State()
 
 
-async def _get_user(tg_id: int) -> Optional[User]:
-    async with async_session_maker() as session:
-        res = await session.execute(select(User).where(User.tg_id == tg_id))
-        return res.scalars().first()
+async def _get_user(session: AsyncSession, tg_id: int) -> Optional[User]:
+    # Из кэша пользователей; после изменения профиля запись сбрасывается (user_cache.invalidate)
+    return await user_cache.get(tg_id, session)
+
+
+async def _update_user(session: AsyncSession, tg_id: int, **values) -> None:
+    await session.execute(update(User).where(User.tg_id == tg_id).values(**values))
+    await session.commit()
+    user_cache.invalidate(tg_id=tg_id)
 
 
 def _profile_text(u: User) -> str:
@@ -61,9 +67,9 @@ async def _render_profile(message: Message, u: User):
 
 @router.message(Command("profile"))
 @router.message(F.text == "👤 Профиль")
-async def open_profile(message: Message, state: FSMContext):
+async def open_profile(message: Message, state: FSMContext, session: AsyncSession):
     await state.clear()
-    u = await _get_user(message.from_user.id)
+    u = await _get_user(session, message.from_user.id)
     if not u:
         await message.answer("Профиль не найден. Попробуйте позже.")
         return
@@ -72,12 +78,12 @@ async def open_profile(message: Message, state: FSMContext):
 
 # ===== Кнопки профиля =====
 @router.callback_query(F.data.startswith("prof:"))
-async def prof_router(call: CallbackQuery, state: FSMContext):
+async def prof_router(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = call.data.split(":")  # варианты: prof:weight / prof:sex:male / prof:goal:loss / prof:pal:1.55 / prof:tz:Europe/Moscow
     action = data[1] if len(data) > 1 else None
     value = ":".join(data[2:]) if len(data) > 2 else None
 
-    u = await _get_user(call.from_user.id)
+    u = await _get_user(session, call.from_user.id)
     if not u:
         await call.answer("Профиль не найден")
         return
@@ -97,15 +103,11 @@ async def prof_router(call: CallbackQuery, state: FSMContext):
     # Предвыбранные значения из инлайн-кнопок
     if action == "sex" and value:
         new_val = value.lower()[:10]
-        async with async_session_maker() as session:
-            await session.execute(update(User).where(User.id == u.id).values(sex=new_val))
-            await session.commit()
+        await _update_user(session, u.tg_id, sex=new_val)
         await call.answer("Пол обновлён")
     elif action == "goal" and value:
         new_val = value.lower()[:20]
-        async with async_session_maker() as session:
-            await session.execute(update(User).where(User.id == u.id).values(goal=new_val))
-            await session.commit()
+        await _update_user(session, u.tg_id, goal=new_val)
         await call.answer("Цель обновлена")
     elif action == "pal" and value:
         try:
@@ -113,21 +115,17 @@ async def prof_router(call: CallbackQuery, state: FSMContext):
         except Exception:
             pal = None
         if pal:
-            async with async_session_maker() as session:
-                await session.execute(update(User).where(User.id == u.id).values(pal=pal))
-                await session.commit()
+            await _update_user(session, u.tg_id, pal=pal)
             await call.answer("PAL обновлён")
         else:
             await call.answer("Некорректное значение PAL")
     elif action == "tz" and value:
         new_tz = value[:64]
-        async with async_session_maker() as session:
-            await session.execute(update(User).where(User.id == u.id).values(timezone=new_tz))
-            await session.commit()
+        await _update_user(session, u.tg_id, timezone=new_tz)
         await call.answer("Часовой пояс обновлён")
 
     # Перерисуем профиль
-    u = await _get_user(call.from_user.id)
+    u = await _get_user(session, call.from_user.id)
     try:
         kb = profile_kb(u)
     except Exception:
@@ -137,60 +135,39 @@ async def prof_router(call: CallbackQuery, state: FSMContext):
 
 # ===== Обработка числовых ответов =====
 @router.message(ProfileStates.waiting_weight)
-async def set_weight(message: Message, state: FSMContext):
+async def set_weight(message: Message, state: FSMContext, session: AsyncSession):
     try:
         val = float(message.text.replace(",", "."))
     except Exception:
         await message.answer("Пожалуйста, число. Например: 68")
         return
-    async with async_session_maker() as session:
-        res = await session.execute(select(User).where(User.tg_id == message.from_user.id))
-        u = res.scalars().first()
-        if not u:
-            await message.answer("Профиль не найден")
-            return
-        u.weight_kg = val
-        await session.commit()
+    await _update_user(session, message.from_user.id, weight_kg=val)
     await state.clear()
     await message.answer("Вес обновлён.")
-    await open_profile(message, state)
+    await open_profile(message, state, session)
 
 
 @router.message(ProfileStates.waiting_height)
-async def set_height(message: Message, state: FSMContext):
+async def set_height(message: Message, state: FSMContext, session: AsyncSession):
     try:
         val = float(message.text.replace(",", "."))
     except Exception:
         await message.answer("Пожалуйста, число. Например: 172")
         return
-    async with async_session_maker() as session:
-        res = await session.execute(select(User).where(User.tg_id == message.from_user.id))
-        u = res.scalars().first()
-        if not u:
-            await message.answer("Профиль не найден")
-            return
-        u.height_cm = val
-        await session.commit()
+    await _update_user(session, message.from_user.id, height_cm=val)
     await state.clear()
     await message.answer("Рост обновлён.")
-    await open_profile(message, state)
+    await open_profile(message, state, session)
 
 
 @router.message(ProfileStates.waiting_age)
-async def set_age(message: Message, state: FSMContext):
+async def set_age(message: Message, state: FSMContext, session: AsyncSession):
     try:
         val = int(float(message.text.replace(",", ".")))
     except Exception:
         await message.answer("Пожалуйста, целое число. Например: 29")
         return
-    async with async_session_maker() as session:
-        res = await session.execute(select(User).where(User.tg_id == message.from_user.id))
-        u = res.scalars().first()
-        if not u:
-            await message.answer("Профиль не найден")
-            return
-        u.age = val
-        await session.commit()
+    await _update_user(session, message.from_user.id, age=val)
     await state.clear()
     await message.answer("Возраст обновлён.")
-    await open_profile(message, state)
+    await open_profile(message, state, session)
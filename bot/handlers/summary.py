@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-from datetime import datetime
-from aiogram import Router, F
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Any, Dict, List, Set
+
+from aiogram import Bot, Router, F
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.utils import broadcast
+from core import scheduler
 from core.db import SessionLocal
 from core.models import User
-from core.crud import get_daily_summary
-from sqlalchemy import select
+from core.crud import get_daily_summary, iter_daily_summaries
+
+log = logging.getLogger(__name__)
 
 router = Router()
 
@@ -20,10 +29,9 @@ def summary_kb():
     ])
 
 
-async def _summary_text(user: User) -> str:
-    today = datetime.utcnow().date()
-    async with SessionLocal() as session:
-        summary = await get_daily_summary(session, user.id, today)
+async def _summary_text(session: AsyncSession, user: User) -> str:
+    today = scheduler.local_today(user.tz)
+    summary = await get_daily_summary(session, user.id, today)
     kcal = round(summary.get("kcal") or 0)
     p = round(summary.get("p") or 0)
     f = round(summary.get("f") or 0)
@@ -37,20 +45,58 @@ async def _summary_text(user: User) -> str:
 
 
 @router.message(F.text.regexp(r"^📊\s*Сводка$"))
-async def open_summary(msg: Message):
-    async with SessionLocal() as session:
-        user = (await session.execute(select(User).where(User.tg_id == msg.from_user.id))).scalar_one()
-    txt = await _summary_text(user)
+async def open_summary(msg: Message, user: User, session: AsyncSession):
+    txt = await _summary_text(session, user)
     await msg.answer(txt, reply_markup=summary_kb(), parse_mode="HTML")
 
 
 @router.callback_query(F.data == "summary:refresh")
-async def summary_refresh(call: CallbackQuery):
-    async with SessionLocal() as session:
-        user = (await session.execute(select(User).where(User.tg_id == call.from_user.id))).scalar_one()
-    txt = await _summary_text(user)
+async def summary_refresh(call: CallbackQuery, user: User, session: AsyncSession):
+    txt = await _summary_text(session, user)
     try:
         await call.message.edit_text(txt, reply_markup=summary_kb(), parse_mode="HTML")
     except Exception:
         await call.message.answer(txt, reply_markup=summary_kb(), parse_mode="HTML")
-    await call.answer()
\ No newline at end of file
+    await call.answer()
+
+
+# --- итоги прошедшего дня (событие day_start планировщика) ---
+# Рассылки идут фоном, чтобы не задерживать тик; ссылки держим, пока не закончатся
+_day_summary_tasks: Set[asyncio.Task] = set()
+
+
+def _day_summary_text(s: Dict[str, Any], day: date) -> str:
+    kcal = round(s["kcal"])
+    lines = [f"<b>Итоги за {day.strftime('%d.%m')}</b>"]
+    targets = s["targets"]
+    if targets and targets["kcal"]:
+        lines.append(f"Калории: {kcal} из {targets['kcal']} ({kcal / targets['kcal']:.0%})")
+        lines.append(
+            f"Б: {round(s['p'])}/{targets['p']} · Ж: {round(s['f'])}/{targets['f']} · У: {round(s['c'])}/{targets['c']}"
+        )
+    else:
+        lines.append(f"Калории: {kcal}")
+        lines.append(f"Б: {round(s['p'])} / Ж: {round(s['f'])} / У: {round(s['c'])}")
+    return "\n".join(lines)
+
+
+def day_summary_handler(bot: Bot) -> scheduler.Handler:
+    """Сводка за вчера пользователям пояса, у которых были записи.
+    Суммы и цели — пачками (iter_daily_summaries), отправка — через общий лимитер рассылок.
+    """
+    async def send(user_ids: List[int], local_now: datetime) -> None:
+        # записи датируются местным днём пользователя (scheduler.local_today) — «вчера» тот же день
+        day = local_now.date() - timedelta(days=1)
+        messages = []
+        async with SessionLocal() as session:
+            async for chunk in iter_daily_summaries(session, user_ids, day):
+                messages.extend(
+                    (s["tg_id"], partial(bot.send_message, s["tg_id"], _day_summary_text(s, day)))
+                    for s in chunk if s["entries"]
+                )
+        if not messages:
+            return
+        task = asyncio.create_task(broadcast.run(f"day_summary {local_now.tzname()} {day}", messages))
+        _day_summary_tasks.add(task)
+        task.add_done_callback(_day_summary_tasks.discard)
+    return send
@@ -4,8 +4,10 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from typing import List, Dict
 
 
-def variants_kb(variants: List[Dict], include_ai: bool = True) -> InlineKeyboardMarkup:
-    """Кнопки вариантов продукта + опционально «Посчитать с помощью ИИ»."""
+def variants_kb(variants: List[Dict], include_ai: bool = True, sid: str = "") -> InlineKeyboardMarkup:
+    """Кнопки вариантов продукта + опционально «Посчитать с помощью ИИ».
+    sid — токен сессии поиска (bot.utils.search_sessions), попадает в callback_data.
+    """
     rows: List[List[InlineKeyboardButton]] = []
     for i, v in enumerate(variants[:5]):
         title = v.get("title") or "Без названия"
@@ -14,20 +16,30 @@ def variants_kb(variants: List[Dict], include_ai: bool = True) -> InlineKeyboard
         f = v.get("f100") or 0
         c = v.get("c100") or 0
         text = f"{title} — {kcal:.0f} ккал/100г · Б/Ж/У {p:.1f}/{f:.1f}/{c:.1f}"
-        rows.append([InlineKeyboardButton(text=text, callback_data=f"pick:{i}")])
+        rows.append([InlineKeyboardButton(text=text, callback_data=f"pick:{sid}:{i}")])
 
     if include_ai:
-        rows.append([InlineKeyboardButton(text="🤖 Посчитать с помощью ИИ", callback_data="variant:ai")])
+        rows.append([InlineKeyboardButton(text="🤖 Посчитать с помощью ИИ", callback_data=f"variant:ai:{sid}")])
 
     rows.append([InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def confirm_add_kb() -> InlineKeyboardMarkup:
+def confirm_meal_kb(sid: str) -> InlineKeyboardMarkup:
+    """Одно подтверждение на весь приём пищи."""
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Добавить в отчёт", callback_data="confirm:add")],
-            [InlineKeyboardButton(text="🔁 Выбрать другой вариант", callback_data="confirm:other")],
+            [InlineKeyboardButton(text="✅ Добавить всё в отчёт", callback_data=f"meal:add:{sid}")],
+            [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")],
+        ]
+    )
+
+
+def confirm_add_kb(sid: str = "") -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="✅ Добавить в отчёт", callback_data=f"confirm:add:{sid}")],
+            [InlineKeyboardButton(text="🔁 Выбрать другой вариант", callback_data=f"confirm:other:{sid}")],
             [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")],
         ]
     )
\ No newline at end of file
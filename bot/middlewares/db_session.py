@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from core.db import SessionLocal, track_usage
+
+log = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Одна сессия БД на апдейт: передаётся хендлерам и EnsureUserMiddleware как data["session"].
+
+    Соединение из пула берётся при первом запросе, а не при создании сессии, —
+    апдейты без обращения к БД пул не трогают. Коммиты — в хендлерах и core.crud;
+    при исключении транзакция откатывается, в конце сессия закрывается.
+    Заодно считается, сколько соединений и SQL-выражений ушло на апдейт (core.db.usage_stats).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with track_usage() as usage:
+            async with SessionLocal() as session:
+                data["session"] = session
+                try:
+                    return await handler(event, data)
+                except Exception:
+                    await session.rollback()
+                    raise
+                finally:
+                    log.debug(
+                        "Update %s: %d connections, %d statements",
+                        type(event).__name__, usage.connections, usage.statements,
+                    )
@@ -4,8 +4,8 @@ from typing import Any, Callable, Dict, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
 
-from core.db import SessionLocal
-from core.crud import get_or_create_user
+from bot.utils import broadcast
+from core import user_cache
 
 DEFAULT_TZ = "Europe/Moscow"
 
@@ -13,6 +13,8 @@ class EnsureUserMiddleware(BaseMiddleware):
     """Гарантирует, что запись о пользователе есть в БД до обработки любого апдейта.
 
     Покрывает Message и CallbackQuery. Если пользователь отсутствует — создаёт его.
+    Строка users берётся из core.user_cache и передаётся хендлерам как data["user"]
+    (только для чтения) — повторно выбирать её по tg_id не нужно.
     """
 
     async def __call__(
@@ -29,9 +31,11 @@ class EnsureUserMiddleware(BaseMiddleware):
             tg_user_id = event.from_user.id
 
         if tg_user_id is not None:
-            # Сигнатура get_or_create_user(session, tg_id) — без передачи tz
-            # Поле tz в модели имеет дефолт, поэтому пользователь создастся корректно
-            async with SessionLocal() as session:
-                await get_or_create_user(session, tg_user_id)
+            # Поле tz в модели имеет дефолт, поэтому пользователь создастся корректно.
+            # Промах читается своей короткой сессией, не сессией апдейта: иначе SELECT оставил бы
+            # её транзакцию (и соединение пула) открытой на весь хендлер — с поиском и Gemini
+            data["user"] = await user_cache.get(tg_user_id)
+            # написал боту — значит, не заблокировал: снова получает рассылки
+            broadcast.forget_blocked(tg_user_id)
 
         return await handler(event, data)
\ No newline at end of file
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from api.resilience import TokenBucket
+from core.config import settings
+
+log = logging.getLogger(__name__)
+
+# Одна отправка: bot.send_message(...) / send_photo(...) с уже подставленными аргументами
+Send = Callable[[], Awaitable[Any]]
+
+# Пользователь недоступен навсегда (по крайней мере пока сам не напишет боту)
+BLOCKED_MARKERS = ("chat not found", "user is deactivated", "bot was blocked", "peer_id_invalid")
+# Сколько записей о последней отправке в чат держать, прежде чем чистить устаревшие
+CHAT_PACE_PRUNE_AT = 10_000
+
+
+class BroadcastResult:
+    """Итог (и прогресс, пока идёт) одной рассылки."""
+
+    __slots__ = ("name", "total", "sent", "blocked", "failed", "retried", "started", "finished")
+
+    def __init__(self, name: str, total: Optional[int] = None):
+        self.name = name
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.blocked: List[int] = []
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + len(self.blocked)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self) -> float:
+        """Доставлено сообщений в секунду."""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name, "total": self.total, "done": self.done, "sent": self.sent,
+            "blocked": len(self.blocked), "failed": self.failed, "retried": self.retried,
+            "elapsed_s": round(self.elapsed, 1), "rate": round(self.rate, 1),
+        }
+
+    def __repr__(self) -> str:
+        d = self.as_dict()
+        return "<Broadcast {name}: {done}/{total} sent={sent} blocked={blocked} failed={failed} {rate} msg/s>".format(**d)
+
+
+# Общие на процесс: лимит Telegram — на бота, а не на рассылку
+_bucket: Optional[TokenBucket] = None
+# chat_id -> monotonic-время, раньше которого в этот чат не пишем
+_chat_next: Dict[int, float] = {}
+# chat_id -> monotonic-время, когда Telegram ответил «заблокирован»
+_blocked: Dict[int, float] = {}
+_active: Dict[int, BroadcastResult] = {}
+_stats: Dict[str, float] = {
+    "broadcasts": 0, "sent": 0, "blocked": 0, "skipped_blocked": 0, "failed": 0, "retry_after": 0,
+    "retried": 0, "throttle_wait_ms": 0.0, "last_rate": 0.0,
+}
+
+
+def bucket() -> TokenBucket:
+    global _bucket
+    if _bucket is None:
+        # не больше BROADCAST_RATE_PER_SEC сообщений за любую секунду; без запаса на всплеск —
+        # рассылка длинная, важнее ровный темп почти на уровне лимита
+        _bucket = TokenBucket(settings.broadcast_rate_per_sec, 1.0, burst=1)
+    return _bucket
+
+
+def reset() -> None:
+    """Сбросить лимитер и счётчики (после изменения настроек — например, в стенде)."""
+    global _bucket
+    _bucket = None
+    _chat_next.clear()
+    _blocked.clear()
+    for k in _stats:
+        _stats[k] = 0
+
+
+def is_blocked(chat_id: int) -> bool:
+    at = _blocked.get(chat_id)
+    if at is None:
+        return False
+    if time.monotonic() - at > settings.broadcast_blocked_ttl_sec:
+        del _blocked[chat_id]
+        return False
+    return True
+
+
+def forget_blocked(chat_id: int) -> None:
+    """Пользователь снова пишет боту — значит, разблокировал: рассылки ему возобновляются."""
+    _blocked.pop(chat_id, None)
+
+
+def _is_blocked_error(e: Exception) -> bool:
+    if isinstance(e, TelegramForbiddenError):
+        return True
+    return isinstance(e, TelegramBadRequest) and any(m in str(e).lower() for m in BLOCKED_MARKERS)
+
+
+def _chat_slot(chat_id: int, now: float) -> float:
+    """Занять очередной слот чата; вернуть, сколько ждать до него."""
+    if len(_chat_next) >= CHAT_PACE_PRUNE_AT:
+        for cid in [cid for cid, t in _chat_next.items() if t <= now]:
+            del _chat_next[cid]
+    slot = max(now, _chat_next.get(chat_id, 0.0))
+    _chat_next[chat_id] = slot + settings.broadcast_per_chat_sec
+    return slot - now
+
+
+async def _acquire(chat_id: int) -> None:
+    """Дождаться и слота чата, и токена общего лимита."""
+    chat_wait = _chat_slot(chat_id, time.monotonic())
+    if chat_wait > 0:
+        await asyncio.sleep(chat_wait)
+    _stats["throttle_wait_ms"] += await bucket().acquire() * 1000
+
+
+async def deliver(chat_id: int, send: Send, result: Optional[BroadcastResult] = None) -> bool:
+    """Отправить одно сообщение через общий лимитер.
+    429 (TelegramRetryAfter) — пауза для всех отправок на retry_after и повтор;
+    сбой сети / 5xx — повтор с экспоненциальной паузой; не больше BROADCAST_MAX_RETRIES повторов.
+    False — пользователь заблокировал бота (или чата нет), прочие ошибки пробрасываются.
+    """
+    if is_blocked(chat_id):
+        _stats["skipped_blocked"] += 1
+        return False
+    attempt = 0
+    while True:
+        await _acquire(chat_id)
+        try:
+            await send()
+        except TelegramRetryAfter as e:
+            if attempt >= settings.broadcast_max_retries:
+                raise
+            _stats["retry_after"] += 1
+            # флуд-контроль Telegram — на бота целиком: останавливаем всех, не только этот чат
+            bucket().block(e.retry_after)
+            _chat_next[chat_id] = max(_chat_next.get(chat_id, 0.0), time.monotonic() + e.retry_after)
+            log.warning("Broadcast: flood control, retry after %s s (chat %s)", e.retry_after, chat_id)
+        except (TelegramServerError, TelegramNetworkError) as e:
+            if attempt >= settings.broadcast_max_retries:
+                raise
+            await asyncio.sleep(2 ** attempt)
+            log.info("Broadcast: %s for chat %s, retrying", type(e).__name__, chat_id)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            if not _is_blocked_error(e):
+                raise
+            _blocked[chat_id] = time.monotonic()
+            _stats["blocked"] += 1
+            return False
+        else:
+            _stats["sent"] += 1
+            return True
+        attempt += 1
+        _stats["retried"] += 1
+        if result is not None:
+            result.retried += 1
+
+
+async def run(
+    name: str,
+    messages: Iterable[Tuple[int, Send]],
+    *,
+    total: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> BroadcastResult:
+    """Массовая рассылка: (chat_id, send) из messages, не больше BROADCAST_CONCURRENCY
+    отправок одновременно, с общим лимитом и паузой между сообщениями в один чат.
+    Ошибки отдельных сообщений не прерывают рассылку — они в счётчиках результата.
+    """
+    result = BroadcastResult(name, total)
+    if total is None and hasattr(messages, "__len__"):
+        result.total = len(messages)  # type: ignore[arg-type]
+    it: Iterator[Tuple[int, Send]] = iter(messages)
+    next_progress = [time.monotonic() + settings.broadcast_progress_sec]
+
+    async def worker() -> None:
+        # итератор общий: next() без await между вызовами — гонок нет
+        for chat_id, send in it:
+            try:
+                if await deliver(chat_id, send, result):
+                    result.sent += 1
+                else:
+                    result.blocked.append(chat_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result.failed += 1
+                _stats["failed"] += 1
+                log.warning("Broadcast %s: chat %s failed: %s: %s", name, chat_id, type(e).__name__, e)
+            if time.monotonic() >= next_progress[0]:
+                next_progress[0] = time.monotonic() + settings.broadcast_progress_sec
+                log.info("Broadcast %s: %d/%s, %.1f msg/s", name, result.done, result.total or "?", result.rate)
+
+    _stats["broadcasts"] += 1
+    _active[id(result)] = result
+    try:
+        n = max(1, concurrency or settings.broadcast_concurrency)
+        await asyncio.gather(*(worker() for _ in range(n)))
+    finally:
+        result.finished = time.monotonic()
+        _active.pop(id(result), None)
+    _stats["last_rate"] = round(result.rate, 1)
+    log.info(
+        "Broadcast %s: sent=%d blocked=%d failed=%d retried=%d in %.1f s (%.1f msg/s)",
+        name, result.sent, len(result.blocked), result.failed, result.retried, result.elapsed, result.rate,
+    )
+    return result
+
+
+async def send_text(bot: Bot, name: str, chat_ids: Iterable[int], text: str, **kwargs: Any) -> BroadcastResult:
+    """Один и тот же текст списку чатов."""
+    ids = list(chat_ids)
+    return await run(name, ((cid, partial(bot.send_message, cid, text, **kwargs)) for cid in ids), total=len(ids))
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_stats)
+    out["active"] = [r.as_dict() for r in _active.values()]
+    out["blocked_chats"] = len(_blocked)
+    out["tokens"] = round(_bucket.tokens, 1) if _bucket is not None else None
+    return out
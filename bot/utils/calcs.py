@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any, Dict, Optional
+
 def calc_bmr(sex: str, weight_kg: float, height_cm: float, age: int) -> float:
     if sex == "male":
         return 10*weight_kg + 6.25*height_cm - 5*age + 5
@@ -24,4 +26,12 @@ def calc_targets(tdee: float, goal: str) -> dict:
     protein = p_kcal / 4
     fat = f_kcal / 9
     carbs = c_kcal / 4
-    return {"kcal": round(kcal), "p": round(protein), "f": round(fat), "c": round(carbs)}
\ No newline at end of file
+    return {"kcal": round(kcal), "p": round(protein), "f": round(fat), "c": round(carbs)}
+
+
+def user_targets(user: Any) -> Optional[Dict[str, float]]:
+    """Дневные цели КБЖУ из профиля (User или строка с теми же полями); None — профиль заполнен не полностью."""
+    if not (user.sex and user.weight_kg and user.height_cm and user.age):
+        return None
+    tdee = calc_tdee(calc_bmr(user.sex, user.weight_kg, user.height_cm, user.age), user.pal or 1.2)
+    return calc_targets(tdee, user.goal or "maintain")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import insort
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Окончания для лёгкого стемминга (длинные — первыми)
+_ENDINGS = sorted(
+    {
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ых", "их",
+        "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ую", "юю",
+        "ом", "ем", "ах", "ях", "ов", "ев", "ей", "ам", "ям",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "й",
+    },
+    key=len,
+    reverse=True,
+)
+_MIN_STEM = 3
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold(text: str) -> str:
+    """Нижний регистр, ё→е, без пунктуации (и «_» из food_key)."""
+    t = (text or "").lower().replace("ё", "е")
+    return _NON_WORD.sub(" ", t).strip()
+
+
+def stem(word: str) -> str:
+    """Очень лёгкий стеммер: срезаем одно окончание, оставляя основу >= 3 символов.
+    й→и после стемминга — частая опечатка («яицо»).
+    """
+    for end in _ENDINGS:
+        if word.endswith(end) and len(word) - len(end) >= _MIN_STEM:
+            word = word[: -len(end)]
+            break
+    return word.replace("й", "и")
+
+
+def tokens(text: str) -> List[str]:
+    """Уникальные основы слов; порядок слов не важен."""
+    return sorted({stem(w) for w in fold(text).split() if w})
+
+
+def trigrams(word: str) -> frozenset:
+    padded = f"${word}$"
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def dice(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class FuzzyIndex:
+    """Нечёткий поиск по названиям с опечатками и перестановкой слов.
+
+    Два уровня:
+      1) словарь основ (stem) с инвертированным индексом по символьным триграммам —
+         для каждого слова запроса находим похожие основы (коэффициент Дайса);
+      2) постинги основа → документы, отсортированные по числу слов в документе.
+
+    Score документа — «мягкий Жаккар»: m / (|Q| + |D| - m), где m — сумма лучших
+    сходств слов запроса со словами документа. Короткие документы просматриваются
+    первыми, и обход останавливается, как только даже идеальное совпадение
+    документа такой длины не может попасть в top-k.
+    """
+
+    # Минимальное сходство слова запроса со словом словаря
+    MIN_TOKEN_SIM = 0.34
+    # Сколько похожих слов словаря берём на одно слово запроса
+    MAX_TOKEN_MATCHES = 8
+
+    def __init__(self):
+        self._vocab: Dict[str, int] = {}
+        self._vocab_grams: List[frozenset] = []
+        self._gram_postings: Dict[str, List[int]] = {}
+        # vocab_id -> [(число слов документа, doc_id), ...] по возрастанию
+        self._postings: List[List[Tuple[int, int]]] = []
+        self._docs: List[Tuple[int, ...]] = []
+        self._alive: List[bool] = []
+
+    def __len__(self) -> int:
+        return sum(self._alive)
+
+    def _vocab_id(self, word: str) -> int:
+        vid = self._vocab.get(word)
+        if vid is None:
+            vid = len(self._vocab_grams)
+            self._vocab[word] = vid
+            grams = trigrams(word)
+            self._vocab_grams.append(grams)
+            self._postings.append([])
+            for g in grams:
+                self._gram_postings.setdefault(g, []).append(vid)
+        return vid
+
+    def add(self, text: str) -> int:
+        doc_id = len(self._docs)
+        vids = tuple(self._vocab_id(w) for w in tokens(text))
+        self._docs.append(vids)
+        self._alive.append(bool(vids))
+        for vid in vids:
+            insort(self._postings[vid], (len(vids), doc_id))
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        # tombstone: постинги не трогаем, документ просто не попадёт в выдачу
+        if 0 <= doc_id < len(self._alive):
+            self._alive[doc_id] = False
+
+    def _similar_words(self, word: str) -> Dict[int, float]:
+        exact = self._vocab.get(word)
+        if exact is not None:
+            return {exact: 1.0}
+        q = trigrams(word)
+        hits: Counter = Counter()
+        for g in q:
+            hits.update(self._gram_postings.get(g, ()))
+        out: Dict[int, float] = {}
+        for vid, _ in hits.most_common(self.MAX_TOKEN_MATCHES * 4):
+            sim = dice(q, self._vocab_grams[vid])
+            if sim >= self.MIN_TOKEN_SIM:
+                out[vid] = sim
+        if len(out) > self.MAX_TOKEN_MATCHES:
+            out = dict(sorted(out.items(), key=lambda x: -x[1])[: self.MAX_TOKEN_MATCHES])
+        return out
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.25) -> List[Tuple[float, int]]:
+        words = tokens(query)
+        if not words:
+            return []
+        cands = [self._similar_words(w) for w in words]
+        q_len = len(words)
+        # лучшая достижимая сумма сходств — для верхней оценки score
+        m_max = sum(max(c.values(), default=0.0) for c in cands)
+        if not m_max:
+            return []
+
+        streams = [self._postings[vid] for c in cands for vid in c]
+
+        top: List[Tuple[float, int]] = []  # min-heap (score, -doc_id)
+        seen = set()
+        for d_len, doc_id in heapq.merge(*streams):
+            if d_len > m_max:
+                # документы дальше только длиннее: score <= m / (|Q| + |D| - m)
+                bound = m_max / (q_len + d_len - m_max)
+                if bound < min_score or (len(top) >= k and bound <= top[0][0]):
+                    break
+            if doc_id in seen or not self._alive[doc_id]:
+                continue
+            seen.add(doc_id)
+            doc = self._docs[doc_id]
+            matched = 0.0
+            for c in cands:
+                best = 0.0
+                for vid in doc:
+                    s = c.get(vid)
+                    if s is not None and s > best:
+                        best = s
+                matched += best
+            score = matched / (q_len + d_len - matched)
+            if score < min_score:
+                continue
+            item = (score, -doc_id)
+            if len(top) < k:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+        return [(round(s, 3), -neg) for s, neg in sorted(top, reverse=True)]
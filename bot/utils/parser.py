@@ -1,12 +1,18 @@
 from __future__ import annotations
 import re
 
-# единицы измерения (минимальный набор)
+from bot.utils import units
+
+# единицы измерения; граммы считает bot.utils.units (unit_conversions, вес штуки, плотность)
 _UNITS = {
     'г': 'g', 'гр': 'g', 'гр.': 'g', 'грамм': 'g',
     'кг': 'kg',
     'мл': 'ml', 'л': 'l',
-    'шт': 'pcs', 'штука': 'pcs', 'штуки': 'pcs'
+    'шт': 'pcs', 'штука': 'pcs', 'штуки': 'pcs',
+    'ч.л.': 'tsp', 'ч. л.': 'tsp', 'чайная ложка': 'tsp', 'чайные ложки': 'tsp', 'чайных ложки': 'tsp',
+    'ст.л.': 'tbsp', 'ст. л.': 'tbsp', 'столовая ложка': 'tbsp', 'столовые ложки': 'tbsp', 'столовых ложки': 'tbsp',
+    'стакан': 'cup', 'стакана': 'cup', 'стаканов': 'cup',
+    'ломтик': 'slice', 'ломтика': 'slice', 'ломтиков': 'slice',
 }
 
 # методы готовки
@@ -18,7 +24,46 @@ COOK_METHODS = {
     'на гриле': 'grilled', 'гриль': 'grilled', 'grilled': 'grilled',
 }
 
+# калории
+_KCAL_WORDS = ('ккал', 'кал', 'cal')
+
+# макросы: «б 18 ж 5 у 3», «белки: 18», «б/ж/у 18/5/3»
+_MACRO_WORDS = {'б': 'p', 'белки': 'p', 'белок': 'p', 'ж': 'f', 'жиры': 'f', 'жир': 'f', 'у': 'c', 'углеводы': 'c'}
+
+# Если в строке несколько способов готовки — побеждает первый по порядку в COOK_METHODS
+_METHOD_RANK = {k: i for i, k in enumerate(COOK_METHODS)}
+
+
+def _alt(words) -> str:
+    # длинные варианты первыми, чтобы «штуки» не съедалось как «шт»
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+_NUM = r"\d+[.,]?\d*"
+_END = r"(?!\w)"
+
+# Один токенизатор на все типы токенов; проход по строке — один, слева направо
+_TOKEN_RE = re.compile(
+    rf"(?P<qty>(?P<qty_num>{_NUM})\s*(?P<unit>{_alt(_UNITS)}){_END})"
+    rf"|(?P<kcal>(?P<kcal_num>{_NUM})\s*(?:{_alt(_KCAL_WORDS)}){_END})"
+    rf"|(?P<bju>(?<!\w)б\s*/\s*ж\s*/\s*у\s*[:=]?\s*(?P<bju_p>{_NUM})\s*/\s*(?P<bju_f>{_NUM})\s*/\s*(?P<bju_c>{_NUM}))"
+    rf"|(?P<macro>(?<!\w)(?P<macro_key>{_alt(_MACRO_WORDS)})\s*[:=]?\s*(?P<macro_num>{_NUM})"
+    rf"(?!\s*(?:{_alt(list(_UNITS) + list(_KCAL_WORDS))}){_END}|[.,]?\d))"
+    rf"|(?P<method>(?<!\w)(?:{_alt(COOK_METHODS)}){_END})"
+)
+
+
+# Разделители позиций в приёме пищи; запятая между цифрами — десятичная («2,5%»)
+_MEAL_SPLIT_RE = re.compile(r"\s*(?:[;\n+]|,(?!\d))\s*")
+
+
+def _num(s: str) -> float:
+    return float(s.replace(",", "."))
+
+
 class Parsed:
+    __slots__ = ("title", "amount_value", "amount_unit", "grams", "kcal", "p", "f", "c", "is_cal_only", "method")
+
     def __init__(
         self,
         title: str,
@@ -43,67 +88,78 @@ class Parsed:
         self.is_cal_only = is_cal_only
         self.method = method
 
-def _guess_grams(amount_value: float | None, amount_unit: str | None) -> float | None:
-    """Очень грубая эвристика, чтобы не падать, если нужно масштабировать БЖУ per 100g."""
-    if amount_value is None or amount_unit is None:
-        return None
-    unit = amount_unit.lower()
-    if unit in ('g',):
-        return amount_value
-    if unit in ('kg',):
-        return amount_value * 1000
-    if unit in ('ml',):
-        # для воды/йогурта и т.п.  ~1 мл ≈ 1 г
-        return amount_value
-    if unit in ('l',):
-        return amount_value * 1000
-    if unit in ('pcs',):
-        # по умолчанию не знаем массу штуки
-        return None
-    return None
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"Parsed({fields})"
 
 def parse_line(text: str) -> Parsed:
     """
     Примеры:
       - 'куриная грудка варёная 140 г'
       - 'батончик 180 ккал'
-      - 'творог 100 г б 18 ж 5 у 3'  (макросы пока не парсим детально в MVP)
+      - 'творог 100 г б 18 ж 5 у 3'
+
+    Берётся первое количество и первые ккал в строке; способ готовки —
+    первый по порядку COOK_METHODS (все его вхождения убираются из названия).
     """
     t = (text or "").strip().lower()
 
-    # 1) метод готовки
-    method = None
-    for k, v in COOK_METHODS.items():
-        if re.search(rf"\b{k}\b", t, flags=re.I):
-            method = v
-            t = re.sub(rf"\b{k}\b", "", t, flags=re.I).strip()
-            break
-
-    # 2) количество и единицы
     amount_value, amount_unit = None, None
-    m_qty = re.search(r"(\d+[.,]?\d*)\s*(г|гр|гр\.|грамм|кг|мл|л|шт|штука|штуки)\b", t)
-    if m_qty:
-        amount_value = float(m_qty.group(1).replace(",", "."))
-        raw_unit = m_qty.group(2)
-        amount_unit = _UNITS.get(raw_unit, raw_unit)
-        t = re.sub(m_qty.group(0), "", t).strip()
-
-    # 3) калории (если пользователь ввёл ккал прямо)
     kcal = None
     p = f = c = None
-    is_cal_only = False
-    m_kcal = re.search(r"(\d+[.,]?\d*)\s*(ккал|кал|cal)\b", t)
-    if m_kcal:
-        kcal = float(m_kcal.group(1).replace(",", "."))
-        is_cal_only = True
-        t = re.sub(m_kcal.group(0), "", t).strip()
+    macros = {}
+    method_key = None
+    cut = []           # (start, end) вырезаемых из названия фрагментов
+    method_spans = {}  # ключ метода -> его вхождения
+
+    for m in _TOKEN_RE.finditer(t):
+        kind = m.lastgroup
+        if kind == "qty":
+            if amount_value is None:
+                amount_value = _num(m.group("qty_num"))
+                amount_unit = _UNITS[m.group("unit")]
+                cut.append(m.span())
+        elif kind == "kcal":
+            if kcal is None:
+                kcal = _num(m.group("kcal_num"))
+                cut.append(m.span())
+        elif kind == "bju":
+            for key in ("p", "f", "c"):
+                macros.setdefault(key, _num(m.group("bju_" + key)))
+            cut.append(m.span())
+        elif kind == "macro":
+            macros.setdefault(_MACRO_WORDS[m.group("macro_key")], _num(m.group("macro_num")))
+            cut.append(m.span())
+        else:
+            key = m.group()
+            method_spans.setdefault(key, []).append(m.span())
+            if method_key is None or _METHOD_RANK[key] < _METHOD_RANK[method_key]:
+                method_key = key
+
+    method = None
+    if method_key is not None:
+        method = COOK_METHODS[method_key]
+        cut.extend(method_spans[method_key])
 
-    grams = _guess_grams(amount_value, amount_unit)
+    if cut:
+        cut.sort()
+        parts, pos = [], 0
+        for start, end in cut:
+            parts.append(t[pos:start])
+            pos = end
+        parts.append(t[pos:])
+        t = "".join(parts).strip()
+
+    if macros:
+        p, f, c = macros.get("p"), macros.get("f"), macros.get("c")
+
+    is_cal_only = kcal is not None
+    grams = units.resolve_grams(amount_value, amount_unit, t)
 
     # На этом этапе:
-    #  - title = t (очищен от метода и количества)
+    #  - title = t (очищен от метода, количества, ккал и БЖУ)
     #  - если kcal указаны — is_cal_only=True
-    #  - grams может быть None (если шт/нет единицы)
+    #  - grams может быть None (нет количества или пересчитать нечем)
     return Parsed(
         title=t or "",
         amount_value=amount_value,
@@ -113,3 +169,20 @@ def parse_line(text: str) -> Parsed:
         is_cal_only=is_cal_only,
         method=method,
     )
+
+
+def split_meal(text: str) -> list[str]:
+    """
+    Разбить сообщение с приёмом пищи на позиции:
+      'гречка 150 г, куриная грудка 120 г, огурец 2 шт' -> 3 строки.
+    Фрагмент без названия («ж 5 у 3», «180 ккал») приклеивается к предыдущей позиции.
+    """
+    items: list[str] = []
+    for part in _MEAL_SPLIT_RE.split((text or "").strip()):
+        if not part:
+            continue
+        if items and not parse_line(part).title:
+            items[-1] = f"{items[-1]} {part}"
+        else:
+            items.append(part)
+    return items
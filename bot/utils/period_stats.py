@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+KEYS = ("kcal", "p", "f", "c")
+# День «в норме», если калории в пределах ±10% от цели
+ON_TARGET_TOLERANCE = 0.10
+ROLLING_WINDOW = 7
+
+
+def _trailing_mean(values: np.ndarray, mask: np.ndarray, window: int) -> np.ndarray:
+    """Скользящее среднее за последние window дней; учитываются только дни с записями."""
+    sums = np.cumsum(np.concatenate(([0.0], np.where(mask, values, 0.0))))
+    counts = np.cumsum(np.concatenate(([0], mask.astype(np.int64))))
+    hi = np.arange(1, len(values) + 1)
+    lo = np.maximum(hi - window, 0)
+    n = counts[hi] - counts[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[hi] - sums[lo]) / n, np.nan)
+
+
+def period_stats(
+    rows: List[Dict[str, Any]],
+    start: date,
+    end: date,
+    targets: Optional[Dict[str, float]] = None,
+    window: int = ROLLING_WINDOW,
+) -> Dict[str, Any]:
+    """Статистика за период по суммам дней (core.crud.get_range_totals).
+    Средние — по дням с записями; пустые дни в среднее не входят.
+    С целями — средний % выполнения по КБЖУ и число дней «в норме» по калориям.
+    """
+    days = (end - start).days + 1
+    matrix = np.zeros((days, len(KEYS)))
+    logged = np.zeros(days, dtype=bool)
+    if rows:
+        idx = np.fromiter(((r["date"] - start).days for r in rows), dtype=np.intp, count=len(rows))
+        matrix[idx] = [[r[k] for k in KEYS] for r in rows]
+        logged[idx] = True
+
+    n = int(logged.sum())
+    total = matrix.sum(axis=0)
+    avg = matrix[logged].mean(axis=0) if n else np.zeros(len(KEYS))
+    rolling = _trailing_mean(matrix[:, 0], logged, window)
+
+    out: Dict[str, Any] = {
+        "start": start,
+        "end": end,
+        "days": days,
+        "logged_days": n,
+        "total": dict(zip(KEYS, total.round(1).tolist())),
+        "avg": dict(zip(KEYS, avg.round(1).tolist())),
+        "rolling_kcal": [None if np.isnan(v) else round(float(v), 1) for v in rolling],
+        "max_day": None,
+        "min_day": None,
+        "targets": targets,
+        "avg_pct": None,
+        "on_target_days": None,
+    }
+    if n:
+        kcal = np.where(logged, matrix[:, 0], np.nan)
+        hi, lo = int(np.nanargmax(kcal)), int(np.nanargmin(kcal))
+        out["max_day"] = (start + timedelta(days=hi), round(float(kcal[hi]), 1))
+        out["min_day"] = (start + timedelta(days=lo), round(float(kcal[lo]), 1))
+        if targets:
+            goal = np.array([float(targets[k]) or np.nan for k in KEYS])
+            pct = matrix[logged] / goal * 100
+            out["avg_pct"] = dict(zip(KEYS, np.nan_to_num(pct.mean(axis=0)).round().tolist()))
+            out["on_target_days"] = int((np.abs(pct[:, 0] / 100 - 1) <= ON_TARGET_TOLERANCE).sum())
+    return out
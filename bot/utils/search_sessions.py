@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from bot.utils.parser import Parsed
+
+# Сколько живёт сессия поиска (кнопки старше — «устарели»)
+SESSION_TTL_SEC = 30 * 60
+# Верхняя граница числа сессий в памяти (на весь процесс)
+MAX_SESSIONS = 20_000
+
+
+class SearchSession:
+    """Результат одного поиска: разобранная строка и ранжированные варианты.
+    chosen — выбранный вариант, уже пересчитанный на порцию (заполняется в pick).
+    items — позиции приёма пищи (режим нескольких блюд в одном сообщении), готовые к записи.
+    """
+
+    __slots__ = ("token", "parsed", "query_en", "variants", "chosen", "items", "created_at")
+
+    def __init__(
+        self,
+        token: str,
+        parsed: Optional[Parsed],
+        query_en: Optional[str],
+        variants: List[Dict[str, Any]],
+        items: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.token = token
+        self.parsed = parsed
+        self.query_en = query_en
+        self.variants = variants
+        self.chosen: Optional[Dict[str, Any]] = None
+        self.items = items
+        self.created_at = time.monotonic()
+
+
+# (chat_id, token) -> SearchSession; порядок вставки = порядок создания
+_sessions: "OrderedDict[Tuple[int, str], SearchSession]" = OrderedDict()
+
+
+def _evict(now: float) -> None:
+    while _sessions:
+        key, sess = next(iter(_sessions.items()))
+        if now - sess.created_at < SESSION_TTL_SEC and len(_sessions) <= MAX_SESSIONS:
+            break
+        _sessions.pop(key, None)
+
+
+def create(
+    chat_id: int,
+    parsed: Optional[Parsed],
+    query_en: Optional[str],
+    variants: List[Dict[str, Any]],
+    items: Optional[List[Dict[str, Any]]] = None,
+) -> SearchSession:
+    """Сохранить результат поиска и вернуть сессию с коротким токеном для callback_data."""
+    now = time.monotonic()
+    _evict(now)
+    token = secrets.token_hex(3)
+    while (chat_id, token) in _sessions:
+        token = secrets.token_hex(3)
+    sess = SearchSession(token, parsed, query_en, variants, items)
+    _sessions[(chat_id, token)] = sess
+    return sess
+
+
+def get(chat_id: int, token: str) -> Optional[SearchSession]:
+    sess = _sessions.get((chat_id, token))
+    if sess is None:
+        return None
+    if time.monotonic() - sess.created_at >= SESSION_TTL_SEC:
+        _sessions.pop((chat_id, token), None)
+        return None
+    return sess
+
+
+def drop(chat_id: int, token: str) -> None:
+    _sessions.pop((chat_id, token), None)
+
+
+def size() -> int:
+    return len(_sessions)
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bot.utils.fuzzy import tokens
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parents[2] / "static"
+_STATIC_FILES = ("unit_conversions.json", "category_density.json", "piece_weights.json", "food_seed.json")
+
+# Коды единиц из bot.utils.parser -> ключ в unit_conversions
+UNIT_KEYS = {
+    "g": "г", "kg": "кг", "ml": "мл", "l": "л", "pcs": "шт",
+    "tsp": "ч.л.", "tbsp": "ст.л.", "cup": "стакан", "slice": "ломтик",
+}
+# Объёмные единицы: граммы = объём × плотность продукта
+_VOLUME_UNITS = {"мл", "л", "стакан"}
+
+# Слова в названии -> категория из static/category_density.json
+_CATEGORY_HINTS = {
+    "молоко": "молочка", "кефир": "молочка", "йогурт": "молочка", "ряженка": "молочка",
+    "простокваша": "молочка", "сливки": "молочка", "айран": "молочка",
+    "вода": "вода", "чай": "вода", "кофе": "вода", "компот": "вода",
+    "масло": "масло",
+}
+
+# Основы из bot.utils.fuzzy.stem иногда расходятся в беглой гласной или мягком знаке
+# («огурец»/«огурц», «пельмень»/«пельмен»): допускаем столько букв различия в хвосте
+_ENDING_SLACK = 2
+# ...но общее начало — не короче _MIN_COMMON букв («грудк» ≠ «груш»); по нему же и корзины кандидатов
+_MIN_COMMON = 4
+
+
+@lru_cache(maxsize=4096)
+def _keys(title: str) -> Tuple[str, ...]:
+    """Основы слов названия в исходном порядке (первое слово обычно главное)."""
+    seen: List[str] = []
+    for w in (title or "").split():
+        for tok in tokens(w):
+            if tok not in seen:
+                seen.append(tok)
+    return tuple(seen)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class StemMap:
+    """Словарь по основам слов: точное совпадение, иначе — основа, отличающаяся только хвостом
+    (не больше _ENDING_SLACK букв, общее начало — от _MIN_COMMON), из них — с самым длинным общим началом.
+    «перепелин» и «перец» — разные ключи: общее начало «пере» короче обеих основ без хвоста.
+    """
+
+    __slots__ = ("_items", "_buckets")
+
+    def __init__(self):
+        self._items: Dict[str, Any] = {}
+        self._buckets: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __setitem__(self, stem: str, value: Any) -> None:
+        if stem not in self._items:
+            self._buckets.setdefault(stem[:_MIN_COMMON], []).append(stem)
+        self._items[stem] = value
+
+    def setdefault(self, stem: str, value: Any) -> Any:
+        if stem not in self._items:
+            self[stem] = value
+        return self._items[stem]
+
+    def get(self, stem: str) -> Any:
+        value = self._items.get(stem)
+        if value is not None:
+            return value
+        best, best_n = None, 0
+        if len(stem) < _MIN_COMMON:
+            return None
+        for cand in self._buckets.get(stem[:_MIN_COMMON], ()):
+            n = _common_prefix(stem, cand)
+            if n >= max(_MIN_COMMON, len(stem) - _ENDING_SLACK, len(cand) - _ENDING_SLACK) and n > best_n:
+                best, best_n = cand, n
+        return self._items[best] if best is not None else None
+
+
+class UnitTable:
+    """Предвычисленные таблицы пересчёта порции в граммы; поиск — по основам слов (StemMap)."""
+
+    __slots__ = ("unit_grams", "piece_grams", "food_density", "category_density", "category_hint", "signature", "loaded_at")
+
+    def __init__(self):
+        self.unit_grams: Dict[str, float] = {}
+        self.piece_grams = StemMap()
+        self.food_density = StemMap()
+        self.category_density: Dict[str, float] = {}
+        self.category_hint = StemMap()
+        for w, c in _CATEGORY_HINTS.items():
+            self.category_hint[tokens(w)[0]] = c
+        self.signature: Tuple[Any, ...] = ()
+        self.loaded_at = 0.0
+
+    def add_piece(self, title: str, grams: float) -> None:
+        keys = _keys(title)
+        if keys and grams and grams > 0:
+            # «перец болгарский» — по первому слову
+            self.piece_grams.setdefault(keys[0], float(grams))
+
+    def add_food(self, title: str, density: Optional[float], category: Optional[str]) -> None:
+        keys = _keys(title)
+        if not keys:
+            return
+        if density is None and category:
+            density = self.category_density.get(category)
+        if density and density > 0:
+            self.food_density[keys[0]] = float(density)
+
+    def density(self, title: str) -> float:
+        for k in _keys(title):
+            d = self.food_density.get(k)
+            if d:
+                return d
+            cat = self.category_hint.get(k)
+            if cat and cat in self.category_density:
+                return self.category_density[cat]
+        return 1.0
+
+    def piece(self, title: str) -> Optional[float]:
+        for k in _keys(title):
+            g = self.piece_grams.get(k)
+            if g:
+                return g
+        return None
+
+    def grams(self, amount_value: Optional[float], amount_unit: Optional[str], title: str = "") -> Optional[float]:
+        if amount_value is None or amount_unit is None:
+            return None
+        unit = UNIT_KEYS.get(amount_unit, amount_unit)
+        if unit == "шт":
+            per_piece = self.piece(title) or self.unit_grams.get(unit)
+            return round(amount_value * per_piece, 1) if per_piece else None
+        per_unit = self.unit_grams.get(unit)
+        if per_unit is None:
+            return None
+        grams = amount_value * per_unit
+        if unit in _VOLUME_UNITS:
+            grams *= self.density(title)
+        return round(grams, 1)
+
+
+# ----------------------------- loading -----------------------------
+
+def _read_json(name: str, default: Any) -> Any:
+    try:
+        return json.loads((STATIC_DIR / name).read_text(encoding="utf-8") or "null") or default
+    except Exception as e:
+        log.warning("Units: cannot read %s: %s", name, e)
+        return default
+
+
+def _static_signature() -> Tuple[Any, ...]:
+    out = []
+    for name in _STATIC_FILES:
+        try:
+            out.append((STATIC_DIR / name).stat().st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def build(
+    db_units: Iterable[Tuple[str, float]] = (),
+    db_foods: Iterable[Tuple[str, Optional[float], Optional[str]]] = (),
+) -> UnitTable:
+    """Собрать таблицы: static/*.json, поверх — строки unit_conversions и food_dictionary из БД."""
+    table = UnitTable()
+    for row in _read_json("unit_conversions.json", []):
+        table.unit_grams[row["unit"]] = float(row["grams_per_unit"])
+    for unit, grams in db_units:
+        table.unit_grams[unit] = float(grams)
+    table.category_density.update({k: float(v) for k, v in _read_json("category_density.json", {}).items()})
+    for title, grams in _read_json("piece_weights.json", {}).items():
+        table.add_piece(title, grams)
+    for row in _read_json("food_seed.json", []):
+        table.add_food(row.get("title_ru") or "", row.get("density_g_per_ml"), row.get("category"))
+    for title, density, category in db_foods:
+        table.add_food(title, density, category)
+    table.loaded_at = time.time()
+    return table
+
+
+_table: Optional[UnitTable] = None
+_stats: Dict[str, float] = {"reloads": 0, "resolved": 0, "unresolved": 0}
+
+
+def table() -> UnitTable:
+    """Текущие таблицы; до загрузки из БД — только static/*.json."""
+    global _table
+    if _table is None:
+        _table = build()
+        _table.signature = _static_signature()
+    return _table
+
+
+async def _db_rows() -> Tuple[List[Tuple[str, float]], List[Tuple[str, Optional[float], Optional[str]]]]:
+    from sqlalchemy import select
+
+    from core.db import SessionLocal
+    from core.models import FoodDictionary, UnitConversion
+
+    async with SessionLocal() as session:
+        units = (await session.execute(select(UnitConversion.unit, UnitConversion.grams_per_unit))).all()
+        foods = (await session.execute(
+            select(FoodDictionary.title_ru, FoodDictionary.density_g_per_ml, FoodDictionary.category)
+            .where(FoodDictionary.density_g_per_ml != None)  # noqa: E711
+        )).all()
+    return [tuple(r) for r in units], [tuple(r) for r in foods]
+
+
+async def load() -> bool:
+    """(Пере)собрать таблицы, если данные в БД или static/ изменились. True — если пересобрали."""
+    global _table
+    try:
+        db_units, db_foods = await _db_rows()
+    except Exception as e:
+        log.warning("Units: DB unavailable, using static files only: %s", e)
+        db_units, db_foods = [], []
+    signature = (_static_signature(), tuple(sorted(db_units)), tuple(sorted(db_foods, key=repr)))
+    if _table is not None and _table.signature == signature:
+        return False
+    new = build(db_units, db_foods)
+    new.signature = signature
+    _table = new  # атомарная подмена: читатели видят либо старую, либо новую таблицу
+    _stats["reloads"] += 1
+    log.info(
+        "Units: %d units, %d piece weights, %d food densities",
+        len(new.unit_grams), len(new.piece_grams), len(new.food_density),
+    )
+    return True
+
+
+async def reload_loop() -> None:
+    from core.config import settings
+
+    while True:
+        await asyncio.sleep(max(10, settings.units_reload_sec))
+        await load()
+
+
+def resolve_grams(amount_value: Optional[float], amount_unit: Optional[str], title: str = "") -> Optional[float]:
+    """Порция в граммах: «2 шт» яиц, «стакан» молока, «ст.л.»; None — если пересчитать нечем."""
+    grams = table().grams(amount_value, amount_unit, title)
+    if amount_value is not None:
+        _stats["resolved" if grams is not None else "unresolved"] += 1
+    return grams
+
+
+def stats() -> Dict[str, Any]:
+    t = table()
+    out: Dict[str, Any] = dict(_stats)
+    out.update(units=len(t.unit_grams), pieces=len(t.piece_grams), densities=len(t.food_density))
+    return out
@@ -23,6 +23,61 @@ class Settings(BaseSettings):
     edamam_app_key: str | None = Field(default=None, alias="EDAMAM_APP_KEY")
     fdc_api_key: str | None = Field(default=None, alias="FDC_API_KEY")
 
+    # Поиск продукта: параллельный опрос провайдеров с бюджетом по времени
+    search_providers: str = Field(default="local,edamam,fdc", alias="SEARCH_PROVIDERS")
+    search_deadline_ms: int = Field(default=2500, alias="SEARCH_DEADLINE_MS")
+    search_min_variants: int = Field(default=3, alias="SEARCH_MIN_VARIANTS")
+    local_index_refresh_sec: int = Field(default=300, alias="LOCAL_INDEX_REFRESH_SEC")
+    units_reload_sec: int = Field(default=300, alias="UNITS_RELOAD_SEC")
+
+    # Кэш пользователей (tg_id -> строка users) в процессе бота
+    user_cache_size: int = Field(default=10000, alias="USER_CACHE_SIZE")
+    user_cache_ttl_sec: int = Field(default=300, alias="USER_CACHE_TTL_SEC")
+
+    # Планировщик событий по местному времени пользователей
+    scheduler_tz_refresh_sec: int = Field(default=600, alias="SCHEDULER_TZ_REFRESH_SEC")
+    scheduler_batch_size: int = Field(default=1000, alias="SCHEDULER_BATCH_SIZE")
+
+    # Очередь отложенных задач (таблица jobs)
+    jobs_poll_sec: int = Field(default=30, alias="JOBS_POLL_SEC")
+    jobs_batch_size: int = Field(default=100, alias="JOBS_BATCH_SIZE")
+    jobs_lease_sec: int = Field(default=300, alias="JOBS_LEASE_SEC")
+    jobs_max_attempts: int = Field(default=5, alias="JOBS_MAX_ATTEMPTS")
+
+    # Лидер среди реплик: планировщик работает только на одной (PostgreSQL — advisory lock,
+    # иначе — аренда в таблице leader_leases); LEASE_SEC должен заметно превышать расхождение часов реплик
+    leader_election: bool = Field(default=True, alias="LEADER_ELECTION")
+    leader_lease_sec: int = Field(default=30, alias="LEADER_LEASE_SEC")
+    leader_heartbeat_sec: int = Field(default=10, alias="LEADER_HEARTBEAT_SEC")
+
+    # Массовые рассылки (bot/utils/broadcast.py): общий лимит Telegram ~30 сообщений/с на бота,
+    # не чаще одного сообщения в секунду в один чат
+    broadcast_rate_per_sec: int = Field(default=30, alias="BROADCAST_RATE_PER_SEC")
+    broadcast_per_chat_sec: float = Field(default=1.0, alias="BROADCAST_PER_CHAT_SEC")
+    broadcast_concurrency: int = Field(default=20, alias="BROADCAST_CONCURRENCY")
+    broadcast_max_retries: int = Field(default=3, alias="BROADCAST_MAX_RETRIES")
+    broadcast_blocked_ttl_sec: int = Field(default=24 * 3600, alias="BROADCAST_BLOCKED_TTL_SEC")
+    broadcast_progress_sec: int = Field(default=10, alias="BROADCAST_PROGRESS_SEC")
+
+    # Общий HTTP-клиент для внешних провайдеров (пулы keep-alive соединений)
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive: int = Field(default=20, alias="HTTP_MAX_KEEPALIVE")
+    http_keepalive_expiry: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    http_timeout: float = Field(default=8.0, alias="HTTP_TIMEOUT")
+    http_connect_timeout: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT")
+    http2: bool = Field(default=False, alias="HTTP2")
+
+    # Устойчивость к деградации провайдеров: автомат (circuit breaker) и лимиты по квотам
+    cb_window_sec: float = Field(default=60.0, alias="CB_WINDOW_SEC")
+    cb_min_calls: int = Field(default=5, alias="CB_MIN_CALLS")
+    cb_failure_ratio: float = Field(default=0.5, alias="CB_FAILURE_RATIO")
+    cb_open_sec: float = Field(default=30.0, alias="CB_OPEN_SEC")
+    cb_slow_call_ms: int = Field(default=2000, alias="CB_SLOW_CALL_MS")
+    rate_limit_max_wait_ms: int = Field(default=1000, alias="RATE_LIMIT_MAX_WAIT_MS")
+    edamam_rate_per_min: int = Field(default=100, alias="EDAMAM_RATE_PER_MIN")
+    fdc_rate_per_hour: int = Field(default=1000, alias="FDC_RATE_PER_HOUR")
+    gemini_rate_per_min: int = Field(default=15, alias="GEMINI_RATE_PER_MIN")
+
     # Translate
     use_gemini_translate: bool = Field(default=False, alias="USE_GEMINI_TRANSLATE")
     use_ru_en_dictionary: bool = Field(default=False, alias="USE_RU_EN_DICTIONARY")
@@ -30,6 +85,10 @@ class Settings(BaseSettings):
     gemini_api_key: str | None = Field(default=None, alias="GEMINI_API_KEY")
     gemini_model: str | None = Field(default=None, alias="GEMINI_MODEL")
 
+    # Кэш переводов (LRU в памяти + таблица translation_cache)
+    translate_cache_lru_size: int = Field(default=4096, alias="TRANSLATE_CACHE_LRU_SIZE")
+    translate_cache_max_age_days: int = Field(default=90, alias="TRANSLATE_CACHE_MAX_AGE_DAYS")
+
     # --- Aliases / tolerated extras from your .env ---
     # YooKassa (мы их пока не используем в коде, но разрешим чтение)
     yookassa_shop_id: str | None = Field(default=None, alias="YOOKASSA_SHOP_ID")
@@ -41,8 +100,13 @@ class Settings(BaseSettings):
     # Доп. совместимость: если в .env указан старый ключ USE_GEMINI_TRANSLATION
     use_gemini_translation: bool | None = Field(default=None, alias="USE_GEMINI_TRANSLATION")
 
-    # Неиспользуемый сейчас флаг — просто примем его
+    # Кэш результатов поиска продуктов (LRU в памяти + таблица food_cache)
     disable_food_cache: bool | None = Field(default=None, alias="DISABLE_FOOD_CACHE")
+    food_cache_ttl_hours: int = Field(default=24 * 7, alias="FOOD_CACHE_TTL_HOURS")
+    food_cache_stale_hours: int = Field(default=24 * 30, alias="FOOD_CACHE_STALE_HOURS")
+    food_cache_negative_minutes: int = Field(default=360, alias="FOOD_CACHE_NEGATIVE_MINUTES")
+    food_cache_lru_size: int = Field(default=2048, alias="FOOD_CACHE_LRU_SIZE")
+    food_cache_purge_minutes: int = Field(default=60, alias="FOOD_CACHE_PURGE_MINUTES")
 
     model_config = SettingsConfigDict(
         env_file=".env",
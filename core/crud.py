@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any, List, Sequence
 
-from sqlalchemy import select, func
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.models import User, Entry, Payment
+from bot.utils.calcs import user_targets
+from core import jobs, user_cache
+from core.models import DailyTotal, User, Entry, Payment
 
 # ----------------------------- helpers -----------------------------
 
@@ -28,22 +30,97 @@ def _normalize_source(value: Optional[str]) -> str:
 
 # ----------------------------- users -----------------------------
 
+def _dialect_insert(session: AsyncSession, model):
+    """INSERT с ON CONFLICT (DO NOTHING / DO UPDATE) для текущего диалекта; None — диалект не поддерживается."""
+    name = session.bind.dialect.name if session.bind is not None else ""
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
+
+
 async def get_or_create_user(session: AsyncSession, tg_id: int) -> User:
     """Вернуть пользователя по tg_id, при отсутствии — создать.
     Минимальная инициализация, остальные поля nullable.
+    Создание — одним INSERT ... ON CONFLICT DO NOTHING RETURNING: параллельные
+    апдейты нового пользователя не упадут на уникальности tg_id.
     """
     res = await session.execute(select(User).where(User.tg_id == tg_id))
     user = res.scalar_one_or_none()
     if user:
         return user
 
-    user = User(tg_id=tg_id, created_at=datetime.utcnow())
-    session.add(user)
+    stmt = _dialect_insert(session, User)
+    if stmt is None:
+        user = User(tg_id=tg_id, created_at=datetime.utcnow())
+        session.add(user)
+        await session.commit()
+        return user
+
+    stmt = (
+        stmt.values(tg_id=tg_id, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[User.tg_id])
+        .returning(User)
+    )
+    user = (await session.scalars(stmt)).one_or_none()
     await session.commit()
-    await session.refresh(user)
+    if user is None:
+        # строку только что вставил параллельный апдейт
+        user = (await session.execute(select(User).where(User.tg_id == tg_id))).scalar_one()
     return user
 
 
+# ----------------------------- daily totals -----------------------------
+
+async def bump_daily_totals(
+    session: AsyncSession,
+    user_id: int,
+    on_date: date,
+    *,
+    kcal: float | None = 0,
+    p: float | None = 0,
+    f: float | None = 0,
+    c: float | None = 0,
+    entries: int = 1,
+) -> None:
+    """Прибавить к daily_totals(user_id, on_date) изменение сумм (для удаления — отрицательное).
+    Не коммитит: вызывается в транзакции, которая меняет entries, — суммы и записи
+    фиксируются вместе. На Postgres/SQLite — один атомарный INSERT ... ON CONFLICT DO UPDATE.
+    """
+    delta = {
+        "kcal": float(kcal or 0),
+        "protein": float(p or 0),
+        "fat": float(f or 0),
+        "carbs": float(c or 0),
+        "entries": entries,
+    }
+    now = datetime.utcnow()
+    stmt = _dialect_insert(session, DailyTotal)
+    if stmt is not None:
+        stmt = stmt.values(user_id=user_id, date=on_date, updated_at=now, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyTotal.user_id, DailyTotal.date],
+            set_={
+                **{k: getattr(DailyTotal, k) + getattr(stmt.excluded, k) for k in delta},
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await session.execute(stmt)
+        return
+
+    row = await session.get(DailyTotal, (user_id, on_date), with_for_update=True)
+    if row is None:
+        session.add(DailyTotal(user_id=user_id, date=on_date, updated_at=now, **delta))
+    else:
+        for k, v in delta.items():
+            setattr(row, k, getattr(row, k) + v)
+        row.updated_at = now
+    await session.flush()
+
+
 # ----------------------------- entries -----------------------------
 
 async def add_entry(
@@ -64,7 +141,9 @@ async def add_entry(
 ) -> Entry:
     """Создать запись дневника.
     Нормализуем source под допустимые значения.
-    Коммитим внутри, как ожидает вызывающая сторона.
+    Коммитим внутри, как ожидает вызывающая сторона; daily_totals — в той же транзакции.
+    id приходит при flush (INSERT ... RETURNING), refresh после коммита не нужен:
+    сессии создаются с expire_on_commit=False.
     """
     entry = Entry(
         user_id=user_id,
@@ -82,32 +161,156 @@ async def add_entry(
         created_at=datetime.utcnow(),
     )
     session.add(entry)
+    await bump_daily_totals(session, user_id, on_date, kcal=kcal, p=p, f=f, c=c)
     await session.commit()
-    await session.refresh(entry)
     return entry
 
 
+async def insert_entries(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    on_date: date,
+    items: List[Dict[str, Any]],
+) -> List[int]:
+    """Вставить позиции дневника одним INSERT и обновить daily_totals, не коммитя —
+    для составления более крупной транзакции (коммит/откат — у вызывающего).
+    Ключи items — как аргументы add_entry: title, amount_value, amount_unit, amount_grams,
+    kcal, p, f, c, is_calories_only, source.
+    Возвращает id новых строк в порядке items (INSERT ... VALUES (...), (...) RETURNING id);
+    если БД не умеет RETURNING для пакетной вставки — пустой список.
+    """
+    if not items:
+        return []
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "date": on_date,
+            "title": it["title"],
+            "amount_value": it.get("amount_value"),
+            "amount_unit": it.get("amount_unit"),
+            "amount_grams": it.get("amount_grams"),
+            "kcal": it.get("kcal"),
+            "protein": it.get("p"),
+            "fat": it.get("f"),
+            "carbs": it.get("c"),
+            "is_calories_only": bool(it.get("is_calories_only")),
+            "source": _normalize_source(it.get("source")),
+            "created_at": now,
+        }
+        for it in items
+    ]
+    ids: List[int] = []
+    dialect = session.bind.dialect if session.bind is not None else None
+    if dialect is not None and dialect.insert_executemany_returning:
+        if dialect.name == "sqlite":
+            # с sort_by_parameter_order SQLAlchemy разбил бы вставку на INSERT на строку;
+            # rowid в одном INSERT растут в порядке VALUES — сортировки достаточно
+            res = await session.execute(insert(Entry).returning(Entry.id), rows)
+            ids = sorted(res.scalars())
+        else:
+            res = await session.execute(insert(Entry).returning(Entry.id, sort_by_parameter_order=True), rows)
+            ids = list(res.scalars())
+    else:
+        await session.execute(insert(Entry), rows)
+    await bump_daily_totals(
+        session, user_id, on_date,
+        kcal=sum(r["kcal"] or 0 for r in rows),
+        p=sum(r["protein"] or 0 for r in rows),
+        f=sum(r["fat"] or 0 for r in rows),
+        c=sum(r["carbs"] or 0 for r in rows),
+        entries=len(rows),
+    )
+    return ids
+
+
+async def add_entries(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    on_date: date,
+    items: List[Dict[str, Any]],
+) -> int:
+    """Записать несколько позиций дневника (приём пищи) одним INSERT и одним коммитом;
+    daily_totals — одним обновлением в той же транзакции. Возвращает число записанных строк.
+    Без коммита — insert_entries.
+    """
+    if not items:
+        return 0
+    await insert_entries(session, user_id, on_date=on_date, items=items)
+    await session.commit()
+    return len(items)
+
+
 async def get_daily_summary(session: AsyncSession, user_id: int, on_date: date) -> Dict[str, Any]:
     """Вернуть сумму КБЖУ за день. Пустые -> 0.
     Возвращаем float, совместимый с форматтерами.
+    Чтение одной строки daily_totals по первичному ключу; пересобрать суммы из entries —
+    scripts/rebuild_daily_totals.py.
     """
     res = await session.execute(
-        select(
-            func.coalesce(func.sum(Entry.kcal), 0),
-            func.coalesce(func.sum(Entry.protein), 0),
-            func.coalesce(func.sum(Entry.fat), 0),
-            func.coalesce(func.sum(Entry.carbs), 0),
-        ).where((Entry.user_id == user_id) & (Entry.date == on_date))
+        select(DailyTotal.kcal, DailyTotal.protein, DailyTotal.fat, DailyTotal.carbs)
+        .where((DailyTotal.user_id == user_id) & (DailyTotal.date == on_date))
     )
-    kcal, p, f, c = res.one()
+    row = res.one_or_none()
+    if row is None:
+        return {"kcal": 0.0, "p": 0.0, "f": 0.0, "c": 0.0}
+    kcal, p, f, c = row
     return {"kcal": float(kcal or 0), "p": float(p or 0), "f": float(f or 0), "c": float(c or 0)}
 
 
+async def get_range_totals(session: AsyncSession, user_id: int, start: date, end: date) -> List[Dict[str, Any]]:
+    """Суммы КБЖУ по дням за [start, end] одним запросом — диапазон по первичному ключу daily_totals.
+    Дни без записей в ответ не попадают. Ключи: date, kcal, p, f, c, entries.
+    """
+    res = await session.execute(
+        select(DailyTotal.date, DailyTotal.kcal, DailyTotal.protein, DailyTotal.fat, DailyTotal.carbs, DailyTotal.entries)
+        .where((DailyTotal.user_id == user_id) & (DailyTotal.date >= start) & (DailyTotal.date <= end))
+        .order_by(DailyTotal.date)
+    )
+    return [
+        {"date": d, "kcal": float(kcal or 0), "p": float(p or 0), "f": float(f or 0), "c": float(c or 0), "entries": n}
+        for d, kcal, p, f, c, n in res.all()
+    ]
+
+
+async def iter_daily_summaries(
+    session: AsyncSession, user_ids: Sequence[int], on_date: date, *, chunk_size: int = 1000,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Суммы КБЖУ за on_date сразу для списка пользователей — пачками по chunk_size.
+    На пачку один запрос: users LEFT JOIN daily_totals по первичному ключу (user_id, date),
+    вместе с полями профиля — цели (targets) считаются здесь же, без обращений к БД на пользователя.
+    Ключи: user_id, tg_id, kcal, p, f, c, entries (0 — записей не было), targets (None — профиль неполный).
+    """
+    for i in range(0, len(user_ids), chunk_size):
+        ids = user_ids[i:i + chunk_size]
+        res = await session.execute(
+            select(
+                User.id, User.tg_id, User.sex, User.age, User.height_cm, User.weight_kg, User.goal, User.pal,
+                DailyTotal.kcal, DailyTotal.protein, DailyTotal.fat, DailyTotal.carbs, DailyTotal.entries,
+            )
+            .outerjoin(DailyTotal, (DailyTotal.user_id == User.id) & (DailyTotal.date == on_date))
+            .where(User.id.in_(ids))
+            .order_by(User.id)
+        )
+        yield [
+            {
+                "user_id": row.id, "tg_id": row.tg_id,
+                "kcal": float(row.kcal or 0), "p": float(row.protein or 0),
+                "f": float(row.fat or 0), "c": float(row.carbs or 0),
+                "entries": row.entries or 0, "targets": user_targets(row),
+            }
+            for row in res.all()
+        ]
+
+
 # ----------------------------- payments / premium -----------------------------
 
 async def set_premium_until(session: AsyncSession, user_id: int, until: datetime) -> None:
     """Установить/продлить premium_until пользователю и зафиксировать в БД.
     Не создаёт пользователя — предполагается существующий user_id.
+    Напоминания об окончании (таблица jobs) пересоздаются в той же транзакции.
     """
     res = await session.execute(select(User).where(User.id == user_id))
     user = res.scalar_one_or_none()
@@ -115,7 +318,9 @@ async def set_premium_until(session: AsyncSession, user_id: int, until: datetime
         raise ValueError(f"User id={user_id} not found")
 
     user.premium_until = until
+    await jobs.schedule_premium_reminders(session, user, until)
     await session.commit()
+    user_cache.invalidate(tg_id=user.tg_id)
 
 
 async def log_payment(
@@ -141,5 +346,4 @@ async def log_payment(
     )
     session.add(payment)
     await session.commit()
-    await session.refresh(payment)
     return payment
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import Literal, Optional
 
 from sqlalchemy import select
 
+from core import jobs, user_cache
 from core.models import User
 
 
@@ -40,13 +41,16 @@ async def grant_premium_days(session, *, user_key: int, by: Literal["id", "tg_id
         # Если есть булево поле is_premium — включим его
         if hasattr(user, "is_premium"):
             setattr(user, "is_premium", True)
+        await jobs.schedule_premium_reminders(session, user, new_until)
         await session.commit()
+        user_cache.invalidate(tg_id=user.tg_id)
         return new_until
 
     # Фолбэк: если premium_until нет, но есть is_premium — просто включим
     if hasattr(user, "is_premium"):
         setattr(user, "is_premium", True)
         await session.commit()
+        user_cache.invalidate(tg_id=user.tg_id)
         return True
 
     # Если в схеме нет ни одного поля — сигнализируем о проблеме схемы
@@ -2,8 +2,10 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, Optional
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -46,11 +48,82 @@ async def session_scope() -> AsyncGenerator[AsyncSession, None]:
         await session.close()
 
 
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI-зависимость: одна сессия на HTTP-запрос.
+    Коммиты — в вызываемом коде (как в core.crud); при ошибке — откат, в конце — закрытие.
+    """
+    session: AsyncSession = async_session_maker()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+# --- Учёт обращений к БД в пределах апдейта / HTTP-запроса ---
+
+class DbUsage:
+    """Сколько соединений взято из пула и сколько SQL-выражений выполнено."""
+
+    __slots__ = ("connections", "statements")
+
+    def __init__(self):
+        self.connections = 0
+        self.statements = 0
+
+
+_usage: ContextVar[Optional[DbUsage]] = ContextVar("db_usage", default=None)
+_stats: Dict[str, int] = {"scopes": 0, "connections": 0, "statements": 0, "max_connections": 0, "max_statements": 0}
+
+
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _on_checkout(dbapi_conn, record, proxy) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.connections += 1
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.statements += 1
+
+
+@asynccontextmanager
+async def track_usage() -> AsyncGenerator[DbUsage, None]:
+    """Считать обращения к БД внутри блока (включая сессии, открытые кэшами и crud)."""
+    usage = DbUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+        _stats["scopes"] += 1
+        _stats["connections"] += usage.connections
+        _stats["statements"] += usage.statements
+        _stats["max_connections"] = max(_stats["max_connections"], usage.connections)
+        _stats["max_statements"] = max(_stats["max_statements"], usage.statements)
+
+
+def usage_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_stats)
+    scopes = _stats["scopes"] or 1
+    out["avg_connections"] = round(_stats["connections"] / scopes, 2)
+    out["avg_statements"] = round(_stats["statements"] / scopes, 2)
+    return out
+
+
 __all__ = [
     "engine",
     "async_session_maker",
     "SessionLocal",
     "session_scope",
+    "get_session",
+    "track_usage",
+    "usage_stats",
 ]
 # --- Declarative Base (for models) ---
 from sqlalchemy.orm import DeclarativeBase
@@ -65,6 +138,9 @@ __all__ = [
     "async_session_maker",
     "SessionLocal",
     "session_scope",
+    "get_session",
+    "track_usage",
+    "usage_stats",
     "Base",
 ]
 
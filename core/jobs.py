@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time as _time
+from datetime import datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.db import SessionLocal
+from core.models import Job, User
+from core.scheduler import get_tz
+
+log = logging.getLogger(__name__)
+
+PREMIUM_REMINDER = "premium_reminder"
+# За сколько дней до окончания премиума напоминаем и в какой час по местному времени
+PREMIUM_REMINDER_DAYS = (3, 1)
+PREMIUM_REMINDER_LOCAL_HOUR = 10
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+_handlers: Dict[str, JobHandler] = {}
+_stats: Dict[str, float] = {
+    "scheduled": 0, "cancelled": 0, "claimed": 0, "done": 0, "retried": 0, "failed": 0, "requeued": 0,
+    "last_batch_ms": 0.0,
+}
+
+
+def register(kind: str, handler: JobHandler) -> None:
+    _handlers[kind] = handler
+
+
+def payload(job: Job) -> Dict[str, Any]:
+    try:
+        return json.loads(job.payload or "{}")
+    except ValueError:
+        return {}
+
+
+# ----------------------------- постановка -----------------------------
+
+def enqueue(session: AsyncSession, *, kind: str, user_id: int, run_at: datetime, data: Optional[Dict[str, Any]] = None) -> Job:
+    """Добавить задачу в сессию; коммит — у вызывающего (вместе с изменением, которое её породило)."""
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind, user_id=user_id, run_at=run_at,
+        payload=json.dumps(data, ensure_ascii=False) if data else None,
+        status="pending", created_at=now, updated_at=now,
+    )
+    session.add(job)
+    _stats["scheduled"] += 1
+    return job
+
+
+async def cancel(session: AsyncSession, *, kind: str, user_id: int) -> int:
+    """Отменить ещё не выполненные задачи пользователя этого вида (без коммита)."""
+    res = await session.execute(
+        update(Job)
+        .where(Job.kind == kind, Job.user_id == user_id, Job.status == "pending")
+        .values(status="cancelled", updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    _stats["cancelled"] += res.rowcount or 0
+    return res.rowcount or 0
+
+
+async def schedule_premium_reminders(session: AsyncSession, user: User, until: Optional[datetime]) -> int:
+    """Пересоздать напоминания об окончании премиума: за 3 и за 1 день, в 10:00 по поясу пользователя.
+    Вызывается при каждом изменении premium_until, до коммита. Возвращает число новых задач.
+    """
+    await cancel(session, kind=PREMIUM_REMINDER, user_id=user.id)
+    if until is None:
+        return 0
+    tz = get_tz(user.tz)
+    now = datetime.utcnow()
+    n = 0
+    for days in PREMIUM_REMINDER_DAYS:
+        local_day = pytz.utc.localize(until - timedelta(days=days)).astimezone(tz).date()
+        local_run = tz.localize(datetime.combine(local_day, time(PREMIUM_REMINDER_LOCAL_HOUR)))
+        run_at = local_run.astimezone(pytz.utc).replace(tzinfo=None)
+        if run_at <= now:
+            continue
+        enqueue(
+            session, kind=PREMIUM_REMINDER, user_id=user.id, run_at=run_at,
+            data={"days_left": days, "premium_until": until.isoformat()},
+        )
+        n += 1
+    return n
+
+
+# ----------------------------- выполнение -----------------------------
+
+async def claim(limit: int) -> List[Job]:
+    """Забрать до limit наступивших задач: pending -> running с арендой на JOBS_LEASE_SEC.
+    Postgres: подзапрос FOR UPDATE SKIP LOCKED — параллельные воркеры берут разные строки.
+    SQLite: FOR UPDATE не поддерживается, но UPDATE ... RETURNING — одна атомарная запись
+    под блокировкой всей БД, двойной выдачи тоже нет.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(Job.status == "pending", Job.run_at <= now)
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(
+            status="running", attempts=Job.attempts + 1,
+            locked_until=now + timedelta(seconds=settings.jobs_lease_sec), updated_at=now,
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    async with SessionLocal() as session:
+        jobs = list((await session.scalars(stmt)).all())
+        await session.commit()
+    _stats["claimed"] += len(jobs)
+    return jobs
+
+
+async def requeue_stale() -> int:
+    """Вернуть в очередь задачи, чья аренда истекла (воркер упал посреди выполнения)."""
+    now = datetime.utcnow()
+    async with SessionLocal() as session:
+        res = await session.execute(
+            update(Job)
+            .where(Job.status == "running", Job.locked_until < now)
+            .values(status="pending", locked_until=None, updated_at=now)
+        )
+        await session.commit()
+    n = res.rowcount or 0
+    if n:
+        log.warning("Jobs: %d stale jobs requeued", n)
+    _stats["requeued"] += n
+    return n
+
+
+async def _finish(done: List[int], retry: List[Tuple[int, datetime, str]], failed: List[Tuple[int, str]]) -> None:
+    now = datetime.utcnow()
+    async with SessionLocal() as session:
+        if done:
+            await session.execute(
+                update(Job).where(Job.id.in_(done)).values(status="done", locked_until=None, updated_at=now)
+            )
+        for job_id, run_at, error in retry:
+            await session.execute(
+                update(Job).where(Job.id == job_id)
+                .values(status="pending", run_at=run_at, locked_until=None, last_error=error, updated_at=now)
+            )
+        for job_id, error in failed:
+            await session.execute(
+                update(Job).where(Job.id == job_id)
+                .values(status="failed", locked_until=None, last_error=error, updated_at=now)
+            )
+        await session.commit()
+
+
+async def run_due(limit: Optional[int] = None) -> int:
+    """Выполнить одну пачку наступивших задач. Возвращает, сколько задач забрали."""
+    t0 = _time.perf_counter()
+    jobs = await claim(limit or settings.jobs_batch_size)
+    done: List[int] = []
+    retry: List[Tuple[int, datetime, str]] = []
+    failed: List[Tuple[int, str]] = []
+    for job in jobs:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            failed.append((job.id, f"no handler for {job.kind!r}"))
+            continue
+        try:
+            await handler(job)
+            done.append(job.id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:1000]
+            if job.attempts < settings.jobs_max_attempts:
+                # экспоненциальная пауза: 1, 2, 4, ... минут
+                retry.append((job.id, datetime.utcnow() + timedelta(minutes=2 ** (job.attempts - 1)), error))
+            else:
+                failed.append((job.id, error))
+                log.warning("Jobs: %s #%d failed after %d attempts: %s", job.kind, job.id, job.attempts, error)
+    if jobs:
+        await _finish(done, retry, failed)
+    _stats["done"] += len(done)
+    _stats["retried"] += len(retry)
+    _stats["failed"] += len(failed)
+    _stats["last_batch_ms"] = round((_time.perf_counter() - t0) * 1000, 1)
+    return len(jobs)
+
+
+async def worker_loop() -> None:
+    """Опрос очереди раз в JOBS_POLL_SEC; полная пачка — сразу следующая."""
+    last_requeue = 0.0
+    while True:
+        try:
+            if _time.monotonic() - last_requeue >= settings.jobs_lease_sec:
+                await requeue_stale()
+                last_requeue = _time.monotonic()
+            if await run_due() >= settings.jobs_batch_size:
+                continue
+        except Exception:
+            log.exception("Jobs worker iteration failed")
+        await asyncio.sleep(max(1, settings.jobs_poll_sec))
+
+
+def stats() -> Dict[str, Any]:
+    return dict(_stats)
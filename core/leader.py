@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.config import settings
+from core.db import SessionLocal, engine
+from core.models import LeaderLease
+
+log = logging.getLogger(__name__)
+
+# Одно лидерство на все фоновые задачи, которые должны идти ровно в одной реплике
+NAME = "background"
+# Кто держит лидерство: хост, процесс и случайный суффикс (pid в контейнерах часто совпадает)
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# monotonic-время, до которого считаем себя лидером (продлевается каждым успешным heartbeat)
+_valid_until = 0.0
+# PostgreSQL: соединение, на котором висит advisory lock; закрылось — блокировка снята
+_conn: Optional[AsyncConnection] = None
+_stats: Dict[str, Any] = {"acquired": 0, "lost": 0, "heartbeats": 0, "errors": 0, "since": None}
+
+
+def lock_key(name: str) -> int:
+    """Ключ pg_advisory_lock: стабильный signed int64 из имени."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def mode() -> str:
+    return "advisory" if engine.dialect.name == "postgresql" else "lease"
+
+
+def is_leader() -> bool:
+    """Можно ли этой реплике выполнять фоновую работу. LEADER_ELECTION=false — всегда да (одна реплика)."""
+    if not settings.leader_election:
+        return True
+    return time.monotonic() < _valid_until
+
+
+# ----------------------------- PostgreSQL: advisory lock -----------------------------
+
+async def _drop_conn() -> None:
+    """Закрыть соединение с блокировкой. invalidate — не в пул: иначе сессия, а с ней и lock, переживёт нас."""
+    global _conn
+    if _conn is not None:
+        conn, _conn = _conn, None
+        try:
+            await conn.invalidate()
+        except Exception:
+            log.debug("Leader: invalidate failed", exc_info=True)
+
+
+async def _advisory_hold(name: str) -> bool:
+    """Взять блокировку (если ещё не наша) или убедиться, что её соединение живо.
+    Блокировка уровня сессии: держится, пока открыто соединение, — упал процесс, и её сразу
+    может взять другая реплика. Через pgbouncer в режиме transaction не работает.
+    """
+    global _conn
+    if _conn is not None:
+        await _conn.scalar(text("SELECT 1"))
+        return True
+    conn = await engine.connect()
+    try:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        got = await conn.scalar(text("SELECT pg_try_advisory_lock(:k)"), {"k": lock_key(name)})
+    except BaseException:
+        await conn.invalidate()
+        raise
+    if not got:
+        await conn.close()
+        return False
+    _conn = conn
+    return True
+
+
+# ----------------------------- прочие БД: аренда в leader_leases -----------------------------
+
+async def _lease_hold(name: str) -> bool:
+    """Продлить свою аренду или забрать истёкшую; строки ещё нет — создать."""
+    now = datetime.utcnow()
+    values = {"holder": HOLDER, "expires_at": now + timedelta(seconds=settings.leader_lease_sec), "updated_at": now}
+    async with SessionLocal() as session:
+        res = await session.execute(
+            update(LeaderLease)
+            .where(LeaderLease.name == name, or_(LeaderLease.holder == HOLDER, LeaderLease.expires_at < now))
+            .values(**values)
+        )
+        if res.rowcount:
+            await session.commit()
+            return True
+        session.add(LeaderLease(name=name, **values))
+        try:
+            await session.commit()
+        except IntegrityError:
+            # строка есть, аренда чужая и не истекла
+            return False
+    return True
+
+
+# ----------------------------- цикл -----------------------------
+
+def _set_leader(held: bool, started: float) -> None:
+    global _valid_until
+    was = is_leader()
+    if held:
+        # запас в один heartbeat: аренда у других истекает по их часам
+        _valid_until = started + settings.leader_lease_sec - settings.leader_heartbeat_sec
+        if not was:
+            _stats["acquired"] += 1
+            _stats["since"] = datetime.utcnow()
+            log.info("Leader: %s is now the leader (%s)", HOLDER, mode())
+    else:
+        _valid_until = 0.0
+        if was:
+            _stats["lost"] += 1
+            _stats["since"] = None
+            log.warning("Leader: %s lost leadership", HOLDER)
+
+
+async def _release(name: str) -> None:
+    """Отдать лидерство при остановке — другая реплика подхватит сразу, не дожидаясь истечения."""
+    global _valid_until
+    was = is_leader()
+    _valid_until = 0.0
+    try:
+        if _conn is not None:
+            await _conn.scalar(text("SELECT pg_advisory_unlock(:k)"), {"k": lock_key(name)})
+        elif was and mode() == "lease":
+            async with SessionLocal() as session:
+                await session.execute(
+                    update(LeaderLease)
+                    .where(LeaderLease.name == name, LeaderLease.holder == HOLDER)
+                    .values(expires_at=datetime.utcnow())
+                )
+                await session.commit()
+    except Exception:
+        log.warning("Leader: release failed", exc_info=True)
+    finally:
+        await _drop_conn()
+    if was:
+        log.info("Leader: %s released leadership", HOLDER)
+
+
+async def leader_loop(name: str = NAME) -> None:
+    """Раз в LEADER_HEARTBEAT_SEC: лидер подтверждает блокировку/аренду, остальные пытаются её взять.
+    Не удалось подтвердить (ошибка, таймаут) — сразу перестаём считать себя лидером.
+    """
+    if not settings.leader_election:
+        return
+    hold = _advisory_hold if mode() == "advisory" else _lease_hold
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                held = await asyncio.wait_for(hold(name), timeout=settings.leader_heartbeat_sec)
+                _stats["heartbeats"] += 1
+            except Exception as e:
+                _stats["errors"] += 1
+                log.warning("Leader: heartbeat failed: %s: %s", type(e).__name__, e)
+                held = False
+                await _drop_conn()
+            _set_leader(held, started)
+            await asyncio.sleep(settings.leader_heartbeat_sec)
+    finally:
+        await _release(name)
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_stats)
+    out["leader"] = is_leader()
+    out["mode"] = mode() if settings.leader_election else "off"
+    out["holder"] = HOLDER
+    return out
@@ -4,7 +4,7 @@ from typing import Optional
 
 from sqlalchemy import (
     CheckConstraint, Date, DateTime, Enum, Float, ForeignKey, Integer, String,
-    Boolean, Index, Text
+    Boolean, Index, Text, text
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from core.db import Base
@@ -15,6 +15,7 @@ SexEnum = Enum("male", "female", name="sex_enum")
 GoalEnum = Enum("lose", "maintain", "gain", name="goal_enum")
 SourceEnum = Enum("manual", "api", "preset", name="source_enum")
 PaymentStatusEnum = Enum("pending", "succeeded", "canceled", "failed", name="payment_status_enum")
+DictSourceEnum = Enum("seed", "api", "user", name="dict_source_enum")
 
 # -------------------- MODELS --------------------
 
@@ -32,7 +33,7 @@ class User(Base):
     goal: Mapped[Optional[str]] = mapped_column(GoalEnum, nullable=True)
     pal: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
-    tz: Mapped[str] = mapped_column(String(64), nullable=False, default="Europe/Moscow")
+    tz: Mapped[str] = mapped_column(String(64), nullable=False, default="Europe/Moscow", index=True)
     premium_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True, index=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
@@ -77,6 +78,74 @@ class Entry(Base):
     )
 
 
+class DailyTotal(Base):
+    """Суммы КБЖУ за день по пользователю; обновляются в одной транзакции с entries (core.crud)."""
+    __tablename__ = "daily_totals"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    kcal: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    protein: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    fat: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    carbs: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    entries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+
+class Job(Base):
+    """Отложенная задача (напоминания и т.п.): выполняется воркером core.jobs после run_at."""
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    run_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
+    payload: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # pending -> running -> done | failed; cancelled — отменена до выполнения
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Очередь: только ожидающие задачи, по времени запуска
+        Index(
+            "ix_jobs_due", "run_at",
+            postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'"),
+        ),
+        Index("ix_jobs_status_locked", "status", "locked_until"),
+    )
+
+
+class LeaderLease(Base):
+    """Аренда лидерства для фоновых задач (core.leader) — там, где нет advisory-блокировок (SQLite)."""
+    __tablename__ = "leader_leases"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+
+class SchedulerRun(Base):
+    """Отработавшее событие планировщика: (событие, пояс, местная дата) — не больше одного раза,
+    в том числе при смене лидера посреди окна события.
+    """
+    __tablename__ = "scheduler_runs"
+
+    trigger: Mapped[str] = mapped_column(String(32), primary_key=True)
+    tz: Mapped[str] = mapped_column(String(64), primary_key=True)
+    local_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    fired_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+
 class Payment(Base):
     __tablename__ = "payments"
 
@@ -107,6 +176,16 @@ class FoodCache(Base):
     ttl_until: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False, index=True)
 
 
+class TranslationCache(Base):
+    __tablename__ = "translation_cache"
+
+    # direction: "ru_en" | "en_ru"; text_key — нормализованный исходный текст
+    direction: Mapped[str] = mapped_column(String(8), primary_key=True)
+    text_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    translated: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False, index=True)
+
+
 class FoodDictionary(Base):
     __tablename__ = "food_dictionary"
 
@@ -114,3 +193,29 @@ class FoodDictionary(Base):
     food_key: Mapped[str] = mapped_column(String(255), nullable=False)
     title_ru: Mapped[str] = mapped_column(String(255), nullable=False)
     category: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    per_100g_kcal: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    per_100g_p: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    per_100g_f: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    per_100g_c: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    density_g_per_ml: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    source: Mapped[str] = mapped_column(DictSourceEnum, nullable=False, default="seed")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("per_100g_kcal IS NULL OR per_100g_kcal >= 0", name="chk_dict_kcal_nonneg"),
+        Index("ix_food_dictionary_food_key", "food_key", unique=True),
+    )
+
+
+class UnitConversion(Base):
+    __tablename__ = "unit_conversions"
+
+    unit: Mapped[str] = mapped_column(String(32), primary_key=True)
+    grams_per_unit: Mapped[float] = mapped_column(Float, nullable=False)
+    notes: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("grams_per_unit > 0", name="chk_units_positive"),
+    )
@@ -1,32 +1,208 @@
+from __future__ import annotations
+
 import asyncio
-from datetime import datetime
+import logging
+import time
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
 import pytz
-from sqlalchemy import select
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from core import leader
+from core.config import settings
 from core.db import SessionLocal
-from core.models import User
+from core.models import SchedulerRun, User
 
-async def scheduler_loop():
-    while True:
-        now_utc = datetime.utcnow()
-        async with SessionLocal() as session:
-            users = (await session.execute(select(User))).scalars().all()
-            for u in users:
+log = logging.getLogger(__name__)
+
+DEFAULT_TZ = "Europe/Moscow"
+
+# handler(user_ids, local_now): пачка пользователей одного часового пояса, local_now — их местное время
+Handler = Callable[[List[int], datetime], Awaitable[None]]
+
+
+class Trigger:
+    """Событие в местное время пользователя: hour:minute, окно window_min минут
+    (если тик опоздал — событие всё равно сработает, но один раз за местные сутки).
+    where(now_utc) — дополнительное условие выборки пользователей (SQL).
+    """
+
+    __slots__ = ("name", "hour", "minute", "window_min", "where", "handlers")
+
+    def __init__(
+        self,
+        name: str,
+        hour: int,
+        minute: int = 0,
+        window_min: int = 5,
+        where: Optional[Callable[[datetime], Any]] = None,
+    ):
+        self.name = name
+        self.hour = hour
+        self.minute = minute
+        self.window_min = window_min
+        self.where = where
+        self.handlers: List[Handler] = []
+
+    def matches(self, local: datetime) -> bool:
+        delta = (local.hour * 60 + local.minute) - (self.hour * 60 + self.minute)
+        return 0 <= delta < self.window_min
+
+
+# Напоминания об окончании премиума — не здесь, а в очереди core.jobs (точное время на пользователя)
+TRIGGERS: Dict[str, Trigger] = {
+    # полночь: сводка за прошедший день и переход на новый
+    "day_start": Trigger("day_start", 0, 0),
+}
+
+
+def register(trigger: str, handler: Handler) -> None:
+    """Подписать обработчик на событие из TRIGGERS."""
+    TRIGGERS[trigger].handlers.append(handler)
+
+
+# ----------------------------- часовые пояса -----------------------------
+
+_tz_cache: Dict[str, tzinfo] = {}
+# (tz, число пользователей) — одна агрегирующая выборка раз в SCHEDULER_TZ_REFRESH_SEC
+_zones: List[Tuple[str, int]] = []
+_zones_loaded_at = 0.0
+# (событие, tz, местная дата) — уже отработавшие (или отработанные другой репликой)
+_fired: Set[Tuple[str, str, date]] = set()
+# UTC-дата последней чистки scheduler_runs
+_runs_pruned_on: Optional[date] = None
+_stats: Dict[str, float] = {
+    "ticks": 0, "standby": 0, "fired": 0, "already_fired": 0, "users": 0, "errors": 0, "last_tick_ms": 0.0,
+}
+
+
+def get_tz(name: Optional[str]) -> tzinfo:
+    """pytz-объект пояса с кэшем; неизвестный пояс — DEFAULT_TZ."""
+    key = name or DEFAULT_TZ
+    tz = _tz_cache.get(key)
+    if tz is None:
+        try:
+            tz = pytz.timezone(key)
+        except pytz.UnknownTimeZoneError:
+            log.warning("Scheduler: unknown timezone %r, using %s", key, DEFAULT_TZ)
+            tz = pytz.timezone(DEFAULT_TZ)
+        _tz_cache[key] = tz
+    return tz
+
+
+def local_today(name: Optional[str]) -> date:
+    """Сегодня в поясе пользователя. Этой датой датируются записи дневника (entries.date, daily_totals)
+    и её же читают сводки — «вчера» для события day_start совпадает с днём записей.
+    """
+    return datetime.now(get_tz(name)).date()
+
+
+async def _load_zones(force: bool = False) -> List[Tuple[str, int]]:
+    global _zones, _zones_loaded_at
+    if not force and _zones and time.monotonic() - _zones_loaded_at < settings.scheduler_tz_refresh_sec:
+        return _zones
+    async with SessionLocal() as session:
+        rows = (await session.execute(select(User.tz, func.count()).group_by(User.tz))).all()
+    _zones = [(tz, n) for tz, n in rows]
+    _zones_loaded_at = time.monotonic()
+    return _zones
+
+
+# ----------------------------- тик -----------------------------
+
+async def _claim_run(trigger: Trigger, tz_name: str, local_date: date) -> bool:
+    """Записать срабатывание в scheduler_runs; False — его уже записала другая реплика
+    (например, прежний лидер успел отработать окно до переключения).
+    """
+    async with SessionLocal() as session:
+        session.add(SchedulerRun(trigger=trigger.name, tz=tz_name, local_date=local_date, holder=leader.HOLDER))
+        try:
+            await session.commit()
+        except IntegrityError:
+            return False
+    return True
+
+
+async def _prune_runs(today: date) -> None:
+    global _runs_pruned_on
+    if _runs_pruned_on == today:
+        return
+    async with SessionLocal() as session:
+        await session.execute(delete(SchedulerRun).where(SchedulerRun.local_date < today - timedelta(days=7)))
+        await session.commit()
+    _runs_pruned_on = today
+
+
+async def _dispatch(trigger: Trigger, tz_name: str, local_now: datetime, now_utc: datetime) -> int:
+    """Выбрать пользователей пояса (индекс ix_users_tz) пачками и передать обработчикам."""
+    stmt = select(User.id).where(User.tz == tz_name).order_by(User.id)
+    if trigger.where is not None:
+        stmt = stmt.where(trigger.where(now_utc))
+    total = 0
+    async with SessionLocal() as session:
+        result = await session.stream_scalars(stmt.execution_options(yield_per=settings.scheduler_batch_size))
+        async for chunk in result.partitions():
+            ids = list(chunk)
+            total += len(ids)
+            for handler in trigger.handlers:
                 try:
-                    tz = pytz.timezone(u.tz or "Europe/Moscow")
+                    await handler(ids, local_now)
                 except Exception:
-                    tz = pytz.timezone("Europe/Moscow")
-                local = pytz.utc.localize(now_utc).astimezone(tz)
-                if local.hour == 0 and local.minute < 5:
-                    # сюда поместим отправку сводки и переход на новый день
-                    pass
-        await asyncio.sleep(60)
-
-if u.premium_until:
-    local = pytz.utc.localize(now_utc).astimezone(tz)
-    # за 3 дня
-    if 0 <= (u.premium_until - now_utc).days == 3 and local.hour == 10:
-        # отправить мягкое напоминание через бот
-        pass
-    # за 1 день
-    if 0 <= (u.premium_until - now_utc).days == 1 and local.hour == 10:
-        pass
\ No newline at end of file
+                    _stats["errors"] += 1
+                    log.exception("Scheduler: %s handler failed for %s", trigger.name, tz_name)
+    return total
+
+
+async def tick(now_utc: Optional[datetime] = None) -> int:
+    """Один проход: какие пояса сейчас в окне событий — только их пользователей и выбираем.
+    Стоимость — O(число поясов) плюс выборка по индексу для сработавших. Возвращает число пользователей.
+    """
+    now_utc = now_utc or datetime.utcnow()
+    aware = pytz.utc.localize(now_utc)
+    t0 = time.perf_counter()
+    active = [t for t in TRIGGERS.values() if t.handlers]
+    users = 0
+    if active:
+        for tz_name, _count in await _load_zones():
+            local = aware.astimezone(get_tz(tz_name))
+            for trigger in active:
+                key = (trigger.name, tz_name, local.date())
+                if key in _fired or not trigger.matches(local):
+                    continue
+                _fired.add(key)
+                if not await _claim_run(trigger, tz_name, local.date()):
+                    _stats["already_fired"] += 1
+                    continue
+                _stats["fired"] += 1
+                users += await _dispatch(trigger, tz_name, local, now_utc)
+        # местные даты отстают от UTC не больше чем на сутки
+        horizon = now_utc.date() - timedelta(days=2)
+        _fired.difference_update([k for k in _fired if k[2] < horizon])
+        await _prune_runs(now_utc.date())
+    _stats["ticks"] += 1
+    _stats["users"] += users
+    _stats["last_tick_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return users
+
+
+async def scheduler_loop() -> None:
+    """Тик раз в минуту, в начале минуты — только в реплике-лидере (core.leader)."""
+    while True:
+        await asyncio.sleep(60 - time.time() % 60)
+        if not leader.is_leader():
+            _stats["standby"] += 1
+            continue
+        try:
+            await tick()
+        except Exception:
+            _stats["errors"] += 1
+            log.exception("Scheduler tick failed")
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_stats)
+    out["zones"] = len(_zones)
+    out["handlers"] = {name: len(t.handlers) for name, t in TRIGGERS.items()}
+    return out
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.db import SessionLocal
+from core.models import User
+
+log = logging.getLogger(__name__)
+
+# tg_id -> (строка users, отсоединённая от сессии; момент устаревания)
+_lru: "OrderedDict[int, Tuple[User, float]]" = OrderedDict()
+# users.id -> tg_id: инвалидация из кода, который знает только user_id (премиум, платежи)
+_by_id: Dict[int, int] = {}
+# Один запрос в БД на tg_id, даже если апдейты пришли пачкой
+_loading: Dict[int, "asyncio.Future[User]"] = {}
+_stats: Dict[str, int] = {"hit": 0, "miss": 0, "invalidated": 0, "evicted": 0}
+
+
+def _put(user: User) -> None:
+    _lru[user.tg_id] = (user, time.monotonic() + max(1, settings.user_cache_ttl_sec))
+    _lru.move_to_end(user.tg_id)
+    _by_id[user.id] = user.tg_id
+    while len(_lru) > max(1, settings.user_cache_size):
+        old, _ = _lru.popitem(last=False)[1]
+        _by_id.pop(old.id, None)
+        _stats["evicted"] += 1
+
+
+def peek(tg_id: int) -> Optional[User]:
+    """Пользователь из кэша без обращения к БД; None — нет или устарел."""
+    item = _lru.get(tg_id)
+    if item is None or item[1] <= time.monotonic():
+        return None
+    return item[0]
+
+
+async def get(tg_id: int, session: Optional[AsyncSession] = None) -> User:
+    """Пользователь по tg_id: из кэша, иначе из БД (при отсутствии — создаётся).
+    session — сессия апдейта; без неё промах читается отдельной сессией.
+    Возвращаемый объект общий для всех хендлеров — только для чтения;
+    изменения пишутся в БД отдельным запросом с последующим invalidate().
+    """
+    user = peek(tg_id)
+    if user is not None:
+        _lru.move_to_end(tg_id)
+        _stats["hit"] += 1
+        return user
+
+    fut = _loading.get(tg_id)
+    if fut is not None:
+        _stats["hit"] += 1
+        return await asyncio.shield(fut)
+
+    _stats["miss"] += 1
+    fut = _loading[tg_id] = asyncio.get_running_loop().create_future()
+    try:
+        from core.crud import get_or_create_user
+
+        if session is None:
+            async with SessionLocal() as own:
+                user = await get_or_create_user(own, tg_id)
+        else:
+            user = await get_or_create_user(session, tg_id)
+            # отвязываем от сессии апдейта: её UPDATE по этой строке не должны менять общий объект
+            session.expunge(user)
+        _put(user)
+        fut.set_result(user)
+        return user
+    except BaseException as e:
+        fut.set_exception(e)
+        # исключение уже отдано ожидающим; без них future не должен ругаться в лог
+        fut.exception()
+        raise
+    finally:
+        _loading.pop(tg_id, None)
+
+
+def invalidate(*, tg_id: Optional[int] = None, user_id: Optional[int] = None) -> None:
+    """Сбросить запись после изменения профиля/премиума — следующий get() перечитает БД."""
+    if tg_id is None and user_id is not None:
+        tg_id = _by_id.get(user_id)
+    if tg_id is None:
+        return
+    item = _lru.pop(tg_id, None)
+    if item is not None:
+        _by_id.pop(item[0].id, None)
+        _stats["invalidated"] += 1
+
+
+def clear() -> None:
+    _lru.clear()
+    _by_id.clear()
+
+
+def stats() -> Dict[str, Any]:
+    total = _stats["hit"] + _stats["miss"]
+    out: Dict[str, Any] = dict(_stats)
+    out["size"] = len(_lru)
+    out["hit_rate"] = (_stats["hit"] / total) if total else 0.0
+    return out
@@ -4,13 +4,17 @@ from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
+from api import food_cache, http_client, local_index, translate_cache
+from core import jobs, leader, scheduler
 from core.config import settings
+from bot.utils import units
 from core.logging_config import setup_logging
 
-from bot.handlers import start, diary, premium, menu
+from bot.handlers import start, diary, premium, menu, summary
 from bot.handlers import admin as admin_handlers
 from bot.handlers import profile, diag
 from bot.handlers import manual_input  # подключим ПОСЛЕДНИМ для приоритета
+from bot.middlewares.db_session import DbSessionMiddleware
 from bot.middlewares.ensure_user import EnsureUserMiddleware
 
 
@@ -19,6 +23,8 @@ async def set_commands(bot: Bot):
         BotCommand(command="start", description="Запустить бота"),
         BotCommand(command="add", description="Добавить блюдо"),
         BotCommand(command="summary", description="Сводка за сегодня"),
+        BotCommand(command="week", description="Статистика за неделю"),
+        BotCommand(command="month", description="Статистика за 30 дней"),
         BotCommand(command="diag", description="Диагностика"),
     ]
     await bot.set_my_commands(commands)
@@ -34,6 +40,9 @@ async def main():
 
     dp = Dispatcher(storage=MemoryStorage())
 
+    # Одна сессия БД на апдейт (data["session"]) — снаружи, до остальных middleware
+    dp.update.outer_middleware(DbSessionMiddleware())
+
     # Глобально гарантируем существование пользователя перед любым хендлером
     dp.message.middleware(EnsureUserMiddleware())
     dp.callback_query.middleware(EnsureUserMiddleware())
@@ -48,8 +57,45 @@ async def main():
     dp.include_router(diag.router)
     dp.include_router(manual_input.router)  # важен порядок
 
+    # Словарь RU→EN синонимов как предзаполненный кэш переводов
+    if settings.use_ru_en_dictionary:
+        translate_cache.seed_from_file()
+
+    # Локальный индекс продуктов (словарь БД + static/*.json) — до первого апдейта
+    await local_index.load()
+    # Таблицы пересчёта порций в граммы (unit_conversions, вес штуки, плотность)
+    await units.load()
+
+    # Отложенные задачи (таблица jobs): напоминания об окончании премиума
+    jobs.register(jobs.PREMIUM_REMINDER, premium.premium_reminder_handler(bot))
+    # Полночь по поясу пользователя: итоги прошедшего дня
+    scheduler.register("day_start", summary.day_summary_handler(bot))
+
+    # Фоновые задачи: чистка food_cache / translation_cache, догрузка словаря, планировщик, очередь задач.
+    # Планировщик тикает только в реплике-лидере (leader_loop); очередь jobs безопасна и в нескольких
+    # репликах сразу (задачи забираются с SKIP LOCKED), апдейты обрабатывают все реплики
+    purge_tasks = [
+        asyncio.create_task(leader.leader_loop()),
+        asyncio.create_task(food_cache.purge_loop()),
+        asyncio.create_task(translate_cache.purge_loop()),
+        asyncio.create_task(local_index.refresh_loop()),
+        asyncio.create_task(units.reload_loop()),
+        asyncio.create_task(scheduler.scheduler_loop()),
+        asyncio.create_task(jobs.worker_loop()),
+    ]
+
+    # Заранее открываем keep-alive соединения к внешним провайдерам
+    await http_client.warmup()
+
     await set_commands(bot)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        for task in purge_tasks:
+            task.cancel()
+        # дождаться остановки: leader_loop отдаёт лидерство, чтобы другая реплика подхватила сразу
+        await asyncio.gather(*purge_tasks, return_exceptions=True)
+        await http_client.aclose_all()
 
 
 if __name__ == "__main__":
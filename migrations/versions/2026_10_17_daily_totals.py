@@ -0,0 +1,43 @@
+"""add daily_totals
+
+Revision ID: d41f7b2c8e90
+Revises: c3e8d1f05a27
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "d41f7b2c8e90"
+down_revision = "c3e8d1f05a27"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_totals",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("kcal", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("protein", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("fat", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("carbs", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("entries", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "date"),
+    )
+    # Заполняем по уже существующим записям дневника
+    op.execute(
+        """
+        INSERT INTO daily_totals (user_id, date, kcal, protein, fat, carbs, entries, updated_at)
+        SELECT user_id, date,
+               COALESCE(SUM(kcal), 0), COALESCE(SUM(protein), 0),
+               COALESCE(SUM(fat), 0), COALESCE(SUM(carbs), 0),
+               COUNT(*), CURRENT_TIMESTAMP
+        FROM entries
+        GROUP BY user_id, date
+        """
+    )
+
+def downgrade() -> None:
+    op.drop_table("daily_totals")
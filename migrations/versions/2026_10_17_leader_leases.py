@@ -0,0 +1,36 @@
+"""add leader_leases and scheduler_runs
+
+Revision ID: a7d4e2c9b315
+Revises: f2c6d8a41b73
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a7d4e2c9b315"
+down_revision = "f2c6d8a41b73"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "leader_leases",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("holder", sa.String(length=128), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.create_table(
+        "scheduler_runs",
+        sa.Column("trigger", sa.String(length=32), nullable=False),
+        sa.Column("tz", sa.String(length=64), nullable=False),
+        sa.Column("local_date", sa.Date(), nullable=False),
+        sa.Column("holder", sa.String(length=128), nullable=False),
+        sa.Column("fired_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("trigger", "tz", "local_date"),
+    )
+
+def downgrade() -> None:
+    op.drop_table("scheduler_runs")
+    op.drop_table("leader_leases")
@@ -0,0 +1,28 @@
+"""add translation_cache
+
+Revision ID: c3e8d1f05a27
+Revises: b1f2a7e4c9d0
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c3e8d1f05a27"
+down_revision = "b1f2a7e4c9d0"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "translation_cache",
+        sa.Column("direction", sa.String(length=8), nullable=False),
+        sa.Column("text_key", sa.String(length=255), nullable=False),
+        sa.Column("translated", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("direction", "text_key"),
+    )
+    op.create_index("ix_translation_cache_created_at", "translation_cache", ["created_at"], unique=False)
+
+def downgrade() -> None:
+    op.drop_index("ix_translation_cache_created_at", table_name="translation_cache")
+    op.drop_table("translation_cache")
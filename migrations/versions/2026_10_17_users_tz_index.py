@@ -0,0 +1,18 @@
+"""index users.tz for the timezone-bucketed scheduler
+
+Revision ID: e5b9a3d17c42
+Revises: d41f7b2c8e90
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "e5b9a3d17c42"
+down_revision = "d41f7b2c8e90"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_users_tz", "users", ["tz"], unique=False)
+
+def downgrade() -> None:
+    op.drop_index("ix_users_tz", table_name="users")
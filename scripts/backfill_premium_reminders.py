@@ -0,0 +1,54 @@
+"""
+Поставить напоминания об окончании премиума (таблица jobs) пользователям,
+у которых премиум уже был выдан до появления очереди задач.
+
+Обычно достаточно одного запуска после миграции: дальше задачи создаются
+в set_premium_until / grant_premium_days. Повторный запуск безопасен —
+незавершённые напоминания пользователя пересоздаются, дублей нет.
+
+Запуск:
+    python -m scripts.backfill_premium_reminders
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+
+from core import jobs
+from core.db import SessionLocal, engine
+from core.models import User
+
+log = logging.getLogger("backfill_premium_reminders")
+
+BATCH = 500
+
+
+async def main() -> None:
+    now = datetime.utcnow()
+    users = scheduled = 0
+    last_id = 0
+    while True:
+        async with SessionLocal() as session:
+            batch = (await session.execute(
+                select(User)
+                .where(User.premium_until > now, User.id > last_id)
+                .order_by(User.id)
+                .limit(BATCH)
+            )).scalars().all()
+            if not batch:
+                break
+            for user in batch:
+                scheduled += await jobs.schedule_premium_reminders(session, user, user.premium_until)
+            await session.commit()
+        users += len(batch)
+        last_id = batch[-1].id
+    await engine.dispose()
+    log.info("premium reminders: %d users, %d jobs scheduled", users, scheduled)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Стенд для рассылок (bot/utils/broadcast.py) на фейковом боте — без сети и без Telegram.
+
+FakeBot.send_message ведёт себя как Bot API под нагрузкой:
+- больше --server-limit сообщений за секунду (на бота) — 429, TelegramRetryAfter(retry_after=1);
+- два сообщения в один чат чаще раза в секунду — тоже 429;
+- каждый --blocked-every-й чат «заблокировал бота» — TelegramForbiddenError;
+- задержка ответа --latency-ms.
+
+Проверяется, что все незаблокированные получили сообщение, заблокированные отброшены,
+и что лимиты «сервера» не нарушались (если --rate не выше --server-limit, 429 быть не должно).
+
+Запуск:
+    python -m scripts.bench_broadcast --chats 300
+    python -m scripts.bench_broadcast --chats 300 --rate 40 --server-limit 30   # с 429
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from functools import partial
+from typing import Any, Deque, Dict, List
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.utils import broadcast
+from core.config import settings
+
+
+class FakeBot:
+    def __init__(self, server_limit: int, blocked_every: int, latency_ms: float):
+        self.server_limit = server_limit
+        self.blocked_every = blocked_every
+        self.latency = latency_ms / 1000
+        self.window: Deque[float] = deque()
+        self.last_in_chat: Dict[int, float] = {}
+        self.delivered: Dict[int, int] = {}
+        self.flood_429 = 0
+        self.chat_429 = 0
+        self.forbidden = 0
+        self.peak_per_sec = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        method = SendMessage(chat_id=chat_id, text=text)
+        now = time.monotonic()
+        while self.window and now - self.window[0] >= 1.0:
+            self.window.popleft()
+        if len(self.window) >= self.server_limit:
+            self.flood_429 += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+        if now - self.last_in_chat.get(chat_id, -10.0) < 1.0:
+            self.chat_429 += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+        if self.blocked_every and chat_id % self.blocked_every == 0:
+            self.forbidden += 1
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        self.window.append(now)
+        self.peak_per_sec = max(self.peak_per_sec, len(self.window))
+        self.last_in_chat[chat_id] = now
+        self.delivered[chat_id] = self.delivered.get(chat_id, 0) + 1
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+
+async def main(args: argparse.Namespace) -> int:
+    settings.broadcast_rate_per_sec = args.rate
+    settings.broadcast_concurrency = args.concurrency
+    settings.broadcast_max_retries = args.max_retries
+    broadcast.reset()
+
+    bot = FakeBot(args.server_limit, args.blocked_every, args.latency_ms)
+    chats = list(range(1, args.chats + 1))
+    # по --per-chat сообщений каждому: проверяем и паузу внутри чата
+    messages = [
+        (cid, partial(bot.send_message, cid, f"msg {k}"))
+        for k in range(args.per_chat) for cid in chats
+    ]
+    result = await broadcast.run("bench", messages)
+
+    expected_blocked = {cid for cid in chats if args.blocked_every and cid % args.blocked_every == 0}
+    missing: List[int] = [cid for cid in chats if cid not in expected_blocked and bot.delivered.get(cid, 0) < args.per_chat]
+    print(result)
+    print(
+        f"server: peak {bot.peak_per_sec} msg/s (limit {args.server_limit}), "
+        f"429 flood={bot.flood_429} per-chat={bot.chat_429}, forbidden={bot.forbidden}"
+    )
+    print(f"engine: {broadcast.stats()}")
+    ok = not missing and set(result.blocked) <= expected_blocked and result.failed == 0
+    if args.rate <= args.server_limit and (bot.flood_429 or bot.chat_429):
+        print("FAIL: 429 within the configured limit")
+        ok = False
+    if missing:
+        print(f"FAIL: {len(missing)} chats not delivered, e.g. {missing[:10]}")
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", type=int, default=300)
+    ap.add_argument("--per-chat", type=int, default=1, help="messages per chat")
+    ap.add_argument("--rate", type=int, default=30, help="BROADCAST_RATE_PER_SEC for the engine")
+    ap.add_argument("--server-limit", type=int, default=30, help="fake Bot API messages per second")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--max-retries", type=int, default=5)
+    ap.add_argument("--blocked-every", type=int, default=17, help="every N-th chat has blocked the bot (0 — none)")
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    sys.exit(asyncio.run(main(ap.parse_args())))
@@ -0,0 +1,145 @@
+"""
+Бенчмарк нечёткого поиска (bot/utils/fuzzy.py): латентность и recall на
+корпусе запросов с опечатками поверх синтетического словаря.
+
+Словарь: реальные базовые продукты + сгенерированные вариации
+(«<продукт> <уточнение> <бренд/жирность>») до --size записей.
+
+Запуск:
+    python -m scripts.bench_fuzzy --size 100000
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+from bot.utils.fuzzy import FuzzyIndex
+
+BASE_FOODS = [
+    "куриная грудка", "куриное бедро", "индейка филе", "говядина", "свинина", "баранина",
+    "гречка", "рис", "овсянка", "пшено", "булгур", "киноа", "макароны", "перловка",
+    "творог", "кефир", "молоко", "йогурт натуральный", "сметана", "сыр", "масло сливочное",
+    "яйцо куриное", "хлеб ржаной", "хлеб белый", "лаваш", "картофель", "морковь", "свекла",
+    "капуста белокочанная", "огурец", "помидор", "перец болгарский", "кабачок", "баклажан",
+    "яблоко", "банан", "апельсин", "груша", "виноград", "клубника", "черника",
+    "лосось", "тунец", "треска", "минтай", "креветки", "кальмар",
+    "фасоль", "чечевица", "нут", "горох", "арахис", "грецкий орех", "миндаль",
+    "шоколад молочный", "мед", "сахар", "оливковое масло", "подсолнечное масло",
+    "борщ", "щи", "плов", "пельмени", "сырники", "блины", "оладьи", "котлета куриная",
+]
+
+MODIFIERS = [
+    "домашний", "фермерский", "отборный", "классический", "диетический", "детский",
+    "в вакууме", "замороженный", "охлажденный", "копченый", "сушеный", "консервированный",
+    "с зеленью", "с чесноком", "с сыром", "с грибами", "с овощами", "без соли",
+    "органический", "постный", "пряный", "острый", "нежный", "сливочный",
+]
+
+BRANDS = [f"{w}{n}" for w, n in itertools.product(
+    ["агро", "вкусно", "село", "луг", "дом", "фуд", "нива", "эко", "био", "ферма"], range(1, 60)
+)]
+
+# (запрос с ошибкой, ожидаемое название)
+QUERIES: List[Tuple[str, str]] = [
+    ("курица грутка", "куриная грудка"),
+    ("куринная грудка", "куриная грудка"),
+    ("грудка куриная", "куриная грудка"),
+    ("гречька", "гречка"),
+    ("гречкка", "гречка"),
+    ("овсянко", "овсянка"),
+    ("творок", "творог"),
+    ("кифир", "кефир"),
+    ("малоко", "молоко"),
+    ("йогур натуральный", "йогурт натуральный"),
+    ("натуральный йогурт", "йогурт натуральный"),
+    ("смитана", "сметана"),
+    ("яйцо курино", "яйцо куриное"),
+    ("яицо куриное", "яйцо куриное"),
+    ("хлеп ржаной", "хлеб ржаной"),
+    ("ржаной хлеб", "хлеб ржаной"),
+    ("картошка", "картофель"),
+    ("картофил", "картофель"),
+    ("марковь", "морковь"),
+    ("свёкла", "свекла"),
+    ("капуста белокачанная", "капуста белокочанная"),
+    ("огурцы", "огурец"),
+    ("помидоры", "помидор"),
+    ("болгарский перец", "перец болгарский"),
+    ("бананы", "банан"),
+    ("апельсины", "апельсин"),
+    ("лососсь", "лосось"),
+    ("креветка", "креветки"),
+    ("чечевица красная", "чечевица"),
+    ("арахиз", "арахис"),
+    ("грецкие орехи", "грецкий орех"),
+    ("оливковое маслo", "оливковое масло"),
+    ("масло оливковое", "оливковое масло"),
+    ("пельмени домашние", "пельмени"),
+    ("сырнеки", "сырники"),
+    ("блинчики", "блины"),
+    ("котлеты куриные", "котлета куриная"),
+    ("индейка филе", "индейка филе"),
+    ("филе индейки", "индейка филе"),
+    ("булгур", "булгур"),
+]
+
+
+def build_corpus(size: int, seed: int = 42) -> List[str]:
+    rnd = random.Random(seed)
+    corpus = list(BASE_FOODS)
+    seen = set(corpus)
+    while len(corpus) < size:
+        title = f"{rnd.choice(BASE_FOODS)} {rnd.choice(MODIFIERS)} {rnd.choice(BRANDS)}"
+        if title not in seen:
+            seen.add(title)
+            corpus.append(title)
+    rnd.shuffle(corpus)
+    return corpus
+
+
+def main(size: int, k: int, repeat: int) -> None:
+    corpus = build_corpus(size)
+    t0 = time.perf_counter()
+    index = FuzzyIndex()
+    for title in corpus:
+        index.add(title)
+    print(f"index: {len(index)} docs, build {time.perf_counter() - t0:.2f} s")
+
+    hit1 = hit_k = 0
+    lat: List[float] = []
+    misses = []
+    for query, expected in QUERIES:
+        for _ in range(repeat):
+            t = time.perf_counter()
+            res = index.search(query, k=k)
+            lat.append((time.perf_counter() - t) * 1000)
+        titles = [corpus[doc_id] for _, doc_id in res]
+        if titles and titles[0] == expected:
+            hit1 += 1
+        if expected in titles:
+            hit_k += 1
+        else:
+            misses.append((query, expected, titles[:3]))
+
+    lat.sort()
+    n = len(QUERIES)
+    print(f"queries: {n}  recall@1={hit1 / n:.2%}  recall@{k}={hit_k / n:.2%}")
+    print(
+        f"latency: mean={statistics.mean(lat):.3f} ms  p50={statistics.median(lat):.3f} ms  "
+        f"p95={lat[int(len(lat) * 0.95) - 1]:.3f} ms  max={lat[-1]:.3f} ms"
+    )
+    for query, expected, got in misses:
+        print(f"  miss: {query!r} -> expected {expected!r}, got {got}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=100_000)
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    main(args.size, args.k, args.repeat)
@@ -0,0 +1,107 @@
+"""
+Бенчмарк: латентность одного поиска блюда с новым httpx.AsyncClient на каждый
+запрос («до») и с общим пулом api.http_client («после»).
+
+Один поиск = 1 перевод RU→EN + 1 запрос в провайдер + 5 переводов EN→RU,
+т.е. 7 последовательных HTTP-запросов. Запросы идут в локальный stub-сервер;
+стоимость установки соединения (DNS + TCP + TLS до реального провайдера)
+имитируется задержкой --connect-ms при каждом новом подключении.
+
+Запуск:
+    python -m scripts.bench_http_pool --searches 50 --connect-ms 60 --rtt-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from api import http_client
+
+_BODY = b'{"hints": [], "candidates": []}'
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, connect_s: float, rtt_s: float):
+    # «Рукопожатие» нового соединения
+    await asyncio.sleep(connect_s)
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(rtt_s)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(_BODY)).encode() + b"\r\n"
+                b"Connection: keep-alive\r\n\r\n"
+            )
+            if not head.startswith(b"HEAD "):
+                writer.write(_BODY)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _one_search_fresh(url: str) -> None:
+    for i in range(7):
+        async with httpx.AsyncClient(timeout=httpx.Timeout(8.0)) as client:
+            r = await (client.get(url) if i == 1 else client.post(url, json={"q": i}))
+            r.raise_for_status()
+
+
+async def _one_search_pooled(url: str) -> None:
+    client = http_client.get_client(url)
+    for i in range(7):
+        r = await (client.get(url) if i == 1 else client.post(url, json={"q": i}))
+        r.raise_for_status()
+
+
+async def _measure(name: str, fn: Callable[[str], Awaitable[None]], url: str, searches: int) -> List[float]:
+    samples: List[float] = []
+    for _ in range(searches):
+        t0 = time.perf_counter()
+        await fn(url)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{name:<8} mean={statistics.mean(samples):8.1f} ms  p50={statistics.median(samples):8.1f} ms  p95={p95:8.1f} ms")
+    return samples
+
+
+async def main(searches: int, connect_ms: float, rtt_ms: float) -> None:
+    server = await asyncio.start_server(
+        lambda r, w: _serve(r, w, connect_ms / 1000, rtt_ms / 1000), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/search"
+    print(f"stub: {url}  connect={connect_ms} ms  rtt={rtt_ms} ms  searches={searches}")
+
+    try:
+        before = await _measure("before", _one_search_fresh, url, searches)
+        # прогрев пула, как в main.main()
+        await http_client.warmup([url.rsplit("/", 1)[0]])
+        after = await _measure("after", _one_search_pooled, url, searches)
+        print(f"speedup: x{statistics.mean(before) / statistics.mean(after):.2f}")
+    finally:
+        await http_client.aclose_all()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--searches", type=int, default=30)
+    ap.add_argument("--connect-ms", type=float, default=60.0)
+    ap.add_argument("--rtt-ms", type=float, default=20.0)
+    args = ap.parse_args()
+    asyncio.run(main(args.searches, args.connect_ms, args.rtt_ms))
@@ -0,0 +1,126 @@
+"""
+Регрессия и микро-бенчмарк разбора строки блюда (bot/utils/parser.py).
+
+1) Регрессия: scripts/parser_corpus.json — ответы прежнего парсера
+   (цикл re.search по COOK_METHODS) на ~1400 поддерживаемых строк; новый
+   parse_line обязан выдавать то же самое поле в поле. Поле grams с тех пор
+   считает bot.utils.units (вес штуки, плотность) — в корпусе его значения
+   соответствуют static/*.json.
+2) Новые форматы (БЖУ «б 18 ж 5 у 3», «б/ж/у 18/5/3») — отдельные проверки.
+3) Скорость: прежний парсер (копия ниже) против нового на том же корпусе.
+
+Запуск:
+    python -m scripts.bench_parser
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from bot.utils.parser import COOK_METHODS, _UNITS, parse_line
+
+CORPUS = Path(__file__).resolve().parent / "parser_corpus.json"
+FIELDS = ("title", "amount_value", "amount_unit", "grams", "kcal", "p", "f", "c", "is_cal_only", "method")
+
+MACRO_CASES: List[Dict[str, Any]] = [
+    {"input": "творог 100 г б 18 ж 5 у 3", "title": "творог", "grams": 100.0, "p": 18.0, "f": 5.0, "c": 3.0},
+    {"input": "батончик б/ж/у 10/8/30 200 ккал", "title": "батончик", "kcal": 200.0, "p": 10.0, "f": 8.0, "c": 30.0},
+    {"input": "сырники 150 г белки 12 жиры 9 углеводы 20", "title": "сырники", "p": 12.0, "f": 9.0, "c": 20.0},
+    {"input": "хлеб б 1,5 ж 0.5 у 20", "title": "хлеб", "p": 1.5, "f": 0.5, "c": 20.0},
+    # «у» перед количеством — не углеводы
+    {"input": "яйца у 3 шт", "amount_value": 3.0, "amount_unit": "pcs", "c": None},
+]
+
+
+def _legacy_guess_grams(amount_value: Any, amount_unit: Any) -> Any:
+    if amount_value is None or amount_unit is None:
+        return None
+    factor = {"g": 1, "kg": 1000, "ml": 1, "l": 1000}.get(amount_unit.lower())
+    return amount_value * factor if factor else None
+
+
+def legacy_parse_line(text: str) -> Dict[str, Any]:
+    """Прежняя реализация parse_line — только для сравнения скорости."""
+    t = (text or "").strip().lower()
+    method = None
+    for k, v in COOK_METHODS.items():
+        if re.search(rf"\b{k}\b", t, flags=re.I):
+            method = v
+            t = re.sub(rf"\b{k}\b", "", t, flags=re.I).strip()
+            break
+    amount_value, amount_unit = None, None
+    m_qty = re.search(r"(\d+[.,]?\d*)\s*(г|гр|гр\.|грамм|кг|мл|л|шт|штука|штуки)\b", t)
+    if m_qty:
+        amount_value = float(m_qty.group(1).replace(",", "."))
+        amount_unit = _UNITS.get(m_qty.group(2), m_qty.group(2))
+        t = re.sub(m_qty.group(0), "", t).strip()
+    kcal = None
+    is_cal_only = False
+    m_kcal = re.search(r"(\d+[.,]?\d*)\s*(ккал|кал|cal)\b", t)
+    if m_kcal:
+        kcal = float(m_kcal.group(1).replace(",", "."))
+        is_cal_only = True
+        t = re.sub(m_kcal.group(0), "", t).strip()
+    return {
+        "title": t or "", "amount_value": amount_value, "amount_unit": amount_unit,
+        "grams": _legacy_guess_grams(amount_value, amount_unit), "kcal": kcal,
+        "p": None, "f": None, "c": None, "is_cal_only": is_cal_only, "method": method,
+    }
+
+
+def check_regression(corpus: List[Dict[str, Any]]) -> int:
+    failed = 0
+    for row in corpus:
+        parsed = parse_line(row["input"])
+        diff = {k: (row[k], getattr(parsed, k)) for k in FIELDS if row[k] != getattr(parsed, k)}
+        if diff:
+            failed += 1
+            if failed <= 10:
+                print(f"  regression: {row['input']!r}: {diff}")
+    print(f"regression: {len(corpus) - failed}/{len(corpus)} identical")
+    return failed
+
+
+def check_macros() -> int:
+    failed = 0
+    for case in MACRO_CASES:
+        parsed = parse_line(case["input"])
+        diff = {k: (v, getattr(parsed, k)) for k, v in case.items() if k != "input" and getattr(parsed, k) != v}
+        if diff:
+            failed += 1
+            print(f"  macros: {case['input']!r}: {diff}")
+    print(f"macros: {len(MACRO_CASES) - failed}/{len(MACRO_CASES)} ok")
+    return failed
+
+
+def bench(name: str, fn: Callable[[str], Any], inputs: List[str], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for s in inputs:
+            fn(s)
+    per_call_us = (time.perf_counter() - t0) / (repeat * len(inputs)) * 1e6
+    print(f"{name:>8}: {per_call_us:.2f} µs/line")
+    return per_call_us
+
+
+def main(repeat: int) -> int:
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    failed = check_regression(corpus) + check_macros()
+
+    inputs = [row["input"] for row in corpus]
+    old = bench("legacy", legacy_parse_line, inputs, repeat)
+    new = bench("new", parse_line, inputs, repeat)
+    print(f"speedup: x{old / new:.1f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    sys.exit(main(args.repeat))
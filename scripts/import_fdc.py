@@ -0,0 +1,263 @@
+"""
+Офлайн-импорт выгрузок USDA FoodData Central в food_dictionary.
+
+Поддерживаются полные выгрузки Foundation Foods / SR Legacy
+(https://fdc.nal.usda.gov/download-datasets):
+- CSV: каталог с food.csv, food_nutrient.csv, food_category.csv;
+- JSON: один файл вида {"FoundationFoods": [...]} / {"SRLegacyFoods": [...]}.
+
+Файлы читаются потоково: JSON разбирается по одному объекту продукта,
+из food_nutrient.csv в памяти остаются только 4 числа на продукт.
+Загрузка — пачками: COPY во временную таблицу + INSERT ... ON CONFLICT DO NOTHING
+на PostgreSQL, executemany INSERT OR IGNORE на SQLite. Повторный импорт
+не создаёт дублей (food_key = "fdc_<fdc_id>").
+
+После импорта бот находит эти продукты в локальном индексе
+(api/local_index.py подтягивает новые строки сам, раз в LOCAL_INDEX_REFRESH_SEC),
+и FDC-провайдер отвечает по ним без API-ключа и сети.
+
+Запуск:
+    python -m scripts.import_fdc path/to/FoodData_Central_sr_legacy_food_csv_2018-04
+    python -m scripts.import_fdc path/to/FoodData_Central_foundation_food_json_2024-10-31.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from core.db import engine
+
+log = logging.getLogger("import_fdc")
+
+# nutrient.id в FDC -> поле food_dictionary (значения в выгрузке — на 100 г)
+NUTRIENT_FIELDS = {
+    1008: "per_100g_kcal",  # Energy, KCAL
+    1003: "per_100g_p",     # Protein
+    1004: "per_100g_f",     # Total lipid (fat)
+    1005: "per_100g_c",     # Carbohydrate, by difference
+}
+# Запасные источники, если основного нутриента у продукта нет (часто в Foundation)
+NUTRIENT_FALLBACKS = {
+    2047: "per_100g_kcal",  # Energy (Atwater General Factors)
+    2048: "per_100g_kcal",  # Energy (Atwater Specific Factors)
+    1050: "per_100g_c",     # Carbohydrate, by summation
+}
+_FIELD_POS = {"per_100g_kcal": 0, "per_100g_p": 1, "per_100g_f": 2, "per_100g_c": 3}
+
+DEFAULT_DATA_TYPES = ("foundation_food", "sr_legacy_food")
+_JSON_DATA_TYPES = {"Foundation": "foundation_food", "SR Legacy": "sr_legacy_food"}
+
+COLUMNS = (
+    "food_key", "title_ru", "category",
+    "per_100g_kcal", "per_100g_p", "per_100g_f", "per_100g_c",
+    "density_g_per_ml", "source", "created_at",
+)
+
+Row = Tuple[Any, ...]
+
+
+# ----------------------------- parsing -----------------------------
+
+def _make_row(fdc_id: Any, description: str, category: Optional[str], macros: List[Optional[float]], now: datetime) -> Optional[Row]:
+    kcal, p, f, c = macros
+    if not description or kcal is None:
+        return None
+    return (
+        f"fdc_{fdc_id}", description[:255], (category or None) and category[:64],
+        round(kcal, 2), round(p or 0.0, 2), round(f or 0.0, 2), round(c or 0.0, 2),
+        None, "seed", now,
+    )
+
+
+def _apply_nutrient(macros: List[Optional[float]], nutrient_id: int, amount: Any, fallback: bool) -> None:
+    field = (NUTRIENT_FALLBACKS if fallback else NUTRIENT_FIELDS).get(nutrient_id)
+    if field is None or amount in (None, ""):
+        return
+    pos = _FIELD_POS[field]
+    if fallback and macros[pos] is not None:
+        return
+    macros[pos] = float(amount)
+
+
+def iter_csv(folder: Path, data_types: Tuple[str, ...]) -> Iterator[Row]:
+    """Продукты из CSV-выгрузки (food.csv + food_nutrient.csv + food_category.csv)."""
+    now = datetime.utcnow()
+
+    categories: Dict[str, str] = {}
+    cat_path = folder / "food_category.csv"
+    if cat_path.exists():
+        with cat_path.open(encoding="utf-8", newline="") as fh:
+            for r in csv.DictReader(fh):
+                categories[r["id"]] = r["description"]
+
+    macros: Dict[str, List[Optional[float]]] = {}
+    wanted = set(NUTRIENT_FIELDS) | set(NUTRIENT_FALLBACKS)
+    with (folder / "food_nutrient.csv").open(encoding="utf-8", newline="") as fh:
+        for r in csv.DictReader(fh):
+            nid = int(r["nutrient_id"])
+            if nid not in wanted:
+                continue
+            m = macros.setdefault(r["fdc_id"], [None, None, None, None])
+            _apply_nutrient(m, nid, r["amount"], fallback=nid in NUTRIENT_FALLBACKS)
+
+    with (folder / "food.csv").open(encoding="utf-8", newline="") as fh:
+        for r in csv.DictReader(fh):
+            if r.get("data_type") not in data_types:
+                continue
+            m = macros.pop(r["fdc_id"], None)
+            if m is None:
+                continue
+            row = _make_row(r["fdc_id"], r["description"], categories.get(r.get("food_category_id") or ""), m, now)
+            if row:
+                yield row
+
+
+def _iter_json_objects(path: Path, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Потоково отдать элементы верхнеуровневого массива продуктов из JSON-выгрузки."""
+    decoder = json.JSONDecoder()
+    with path.open(encoding="utf-8") as fh:
+        buf = ""
+        # пропускаем '{"FoundationFoods": [' — до начала массива
+        while "[" not in buf:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                return
+            buf += chunk
+        buf = buf[buf.index("[") + 1:]
+        eof = False
+        while True:
+            buf = buf.lstrip().lstrip(",").lstrip()
+            if buf.startswith("]"):
+                return
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = fh.read(chunk_size)
+                eof = not chunk
+                buf += chunk
+                continue
+            yield obj
+            buf = buf[end:]
+
+
+def iter_json(path: Path, data_types: Tuple[str, ...]) -> Iterator[Row]:
+    """Продукты из JSON-выгрузки (FoundationFoods / SRLegacyFoods)."""
+    now = datetime.utcnow()
+    for food in _iter_json_objects(path):
+        if _JSON_DATA_TYPES.get(food.get("dataType") or "") not in data_types:
+            continue
+        m: List[Optional[float]] = [None, None, None, None]
+        for n in food.get("foodNutrients") or []:
+            nid = (n.get("nutrient") or {}).get("id")
+            if nid is not None:
+                _apply_nutrient(m, int(nid), n.get("amount"), fallback=int(nid) in NUTRIENT_FALLBACKS)
+        category = (food.get("foodCategory") or {}).get("description")
+        row = _make_row(food.get("fdcId"), food.get("description") or "", category, m, now)
+        if row:
+            yield row
+
+
+def iter_rows(path: Path, data_types: Tuple[str, ...]) -> Iterator[Row]:
+    return iter_csv(path, data_types) if path.is_dir() else iter_json(path, data_types)
+
+
+def _batches(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    batch: List[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ----------------------------- loading -----------------------------
+
+_PG_TMP = """
+CREATE TEMP TABLE IF NOT EXISTS tmp_fdc_import (
+    food_key varchar(255), title_ru varchar(255), category varchar(64),
+    per_100g_kcal double precision, per_100g_p double precision,
+    per_100g_f double precision, per_100g_c double precision,
+    density_g_per_ml double precision, source text, created_at timestamp
+)
+"""
+
+_PG_MERGE = f"""
+INSERT INTO food_dictionary ({", ".join(COLUMNS)})
+SELECT food_key, title_ru, category, per_100g_kcal, per_100g_p, per_100g_f, per_100g_c,
+       density_g_per_ml, CAST(source AS dict_source_enum), created_at
+FROM tmp_fdc_import
+ON CONFLICT (food_key) DO NOTHING
+"""
+
+
+async def _load_postgres(batches: Iterator[List[Row]]) -> Tuple[int, int]:
+    read = inserted = 0
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection  # asyncpg.Connection
+        await pg.execute(_PG_TMP)
+        for batch in batches:
+            async with pg.transaction():
+                await pg.execute("TRUNCATE tmp_fdc_import")
+                await pg.copy_records_to_table("tmp_fdc_import", records=batch, columns=list(COLUMNS))
+                status = await pg.execute(_PG_MERGE)  # "INSERT 0 <n>"
+            read += len(batch)
+            inserted += int(status.rsplit(" ", 1)[-1])
+        await pg.execute("DROP TABLE IF EXISTS tmp_fdc_import")
+    return read, inserted
+
+
+_SQLITE_INSERT = text(
+    f"INSERT OR IGNORE INTO food_dictionary ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join(':' + c for c in COLUMNS)})"
+)
+
+
+async def _load_sqlite(batches: Iterator[List[Row]]) -> Tuple[int, int]:
+    read = inserted = 0
+    for batch in batches:
+        async with engine.begin() as conn:
+            res = await conn.execute(_SQLITE_INSERT, [dict(zip(COLUMNS, r)) for r in batch])
+        read += len(batch)
+        inserted += max(0, res.rowcount or 0)
+    return read, inserted
+
+
+async def main(path: Path, data_types: Tuple[str, ...], batch_size: int) -> None:
+    t0 = time.perf_counter()
+    batches = _batches(iter_rows(path, data_types), batch_size)
+    if engine.dialect.name == "postgresql":
+        read, inserted = await _load_postgres(batches)
+    else:
+        read, inserted = await _load_sqlite(batches)
+    await engine.dispose()
+    dt = time.perf_counter() - t0
+    log.info(
+        "FDC import: %d foods read, %d inserted, %d already present in %.1f s (%.0f rows/s)",
+        read, inserted, read - inserted, dt, read / dt if dt else 0,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    ap = argparse.ArgumentParser(description="Import USDA FDC dataset into food_dictionary")
+    ap.add_argument("path", type=Path, help="CSV dataset folder or JSON dump file")
+    ap.add_argument("--data-types", default=",".join(DEFAULT_DATA_TYPES),
+                    help="FDC data_type values to import (comma separated)")
+    ap.add_argument("--batch-size", type=int, default=5000)
+    args = ap.parse_args()
+    types = tuple(t.strip() for t in args.data_types.split(",") if t.strip())
+    asyncio.run(main(args.path, types, args.batch_size))
@@ -0,0 +1,113 @@
+"""
+Пересборка daily_totals из entries (заполнение после миграции, ремонт после ручных правок БД).
+
+Суммы пересчитываются одним INSERT ... SELECT ... GROUP BY user_id, date
+в одной транзакции вместе с удалением старых строк выбранного диапазона —
+бот в это время видит либо старые, либо новые суммы.
+
+Запуск:
+    python -m scripts.rebuild_daily_totals                  # все пользователи, все дни
+    python -m scripts.rebuild_daily_totals --since 2026-01-01 --user-id 42
+    python -m scripts.rebuild_daily_totals --check          # только сверить, без записи
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select
+
+from core.db import engine
+from core.models import DailyTotal, Entry
+
+log = logging.getLogger("rebuild_daily_totals")
+
+# Расхождение сумм, которое считаем ошибкой (float-суммы в разном порядке слегка отличаются)
+_EPS = 1e-6
+_COLUMNS = ("kcal", "protein", "fat", "carbs")
+
+
+def _filters(model: Any, user_id: Optional[int], since: Optional[date], until: Optional[date]) -> List[Any]:
+    out = []
+    if user_id is not None:
+        out.append(model.user_id == user_id)
+    if since is not None:
+        out.append(model.date >= since)
+    if until is not None:
+        out.append(model.date <= until)
+    return out
+
+
+def _aggregate(user_id: Optional[int], since: Optional[date], until: Optional[date]):
+    return (
+        select(
+            Entry.user_id,
+            Entry.date,
+            *(func.coalesce(func.sum(getattr(Entry, c)), 0).label(c) for c in _COLUMNS),
+            func.count().label("entries"),
+        )
+        .where(*_filters(Entry, user_id, since, until))
+        .group_by(Entry.user_id, Entry.date)
+    )
+
+
+async def check(user_id: Optional[int], since: Optional[date], until: Optional[date]) -> int:
+    """Число дней, где daily_totals не совпадает с entries (включая отсутствующие и лишние строки)."""
+    agg = _aggregate(user_id, since, until).subquery()
+    joined = and_(DailyTotal.user_id == agg.c.user_id, DailyTotal.date == agg.c.date)
+    differs = or_(
+        DailyTotal.user_id.is_(None),
+        DailyTotal.entries != agg.c.entries,
+        *(func.abs(getattr(DailyTotal, c) - agg.c[c]) > _EPS for c in _COLUMNS),
+    )
+    stale = select(func.count()).select_from(agg.outerjoin(DailyTotal, joined)).where(differs)
+    orphans = (
+        select(func.count())
+        .select_from(DailyTotal)
+        .outerjoin(agg, joined)
+        .where(agg.c.user_id.is_(None), *_filters(DailyTotal, user_id, since, until))
+    )
+    async with engine.connect() as conn:
+        bad = (await conn.execute(stale)).scalar_one()
+        extra = (await conn.execute(orphans)).scalar_one()
+    log.info("daily_totals check: %d days differ from entries, %d rows without entries", bad, extra)
+    return bad + extra
+
+
+async def rebuild(user_id: Optional[int], since: Optional[date], until: Optional[date]) -> int:
+    agg = _aggregate(user_id, since, until).add_columns(literal(datetime.utcnow()).label("updated_at"))
+    async with engine.begin() as conn:
+        removed = (await conn.execute(delete(DailyTotal).where(*_filters(DailyTotal, user_id, since, until)))).rowcount
+        written = (await conn.execute(
+            insert(DailyTotal).from_select(
+                ["user_id", "date", *_COLUMNS, "entries", "updated_at"], agg,
+            )
+        )).rowcount
+    log.info("daily_totals rebuilt: %d rows removed, %d rows written", removed, written)
+    return written
+
+
+async def main(args: argparse.Namespace) -> int:
+    t0 = time.perf_counter()
+    try:
+        if args.check:
+            return 1 if await check(args.user_id, args.since, args.until) else 0
+        await rebuild(args.user_id, args.since, args.until)
+        return 0
+    finally:
+        await engine.dispose()
+        log.info("done in %.1f s", time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    ap = argparse.ArgumentParser(description="Rebuild daily_totals from entries")
+    ap.add_argument("--user-id", type=int, default=None)
+    ap.add_argument("--since", type=date.fromisoformat, default=None, help="YYYY-MM-DD, inclusive")
+    ap.add_argument("--until", type=date.fromisoformat, default=None, help="YYYY-MM-DD, inclusive")
+    ap.add_argument("--check", action="store_true", help="only compare, exit 1 on mismatch")
+    raise SystemExit(asyncio.run(main(ap.parse_args())))